@@ -1,10 +1,19 @@
+import math
+
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.forms import AuthenticationForm
+from django.forms import ModelForm
+from django.utils.translation import gettext_lazy as _
 
 
 from .models import CustomUser
+from .throttling import login_throttle
 
 from common.django_utils import AsyncFormMixin, AsyncModelFormMixin
+from common.executors import ExecutorSaturated
+from common.hashing import SATURATED_MESSAGE, aauthenticate, amake_password
+
+THROTTLED_MESSAGE = _('Too many login attempts. Please try again in %(seconds)d seconds.')
 
 class CustomUserCreationForm(UserCreationForm, AsyncModelFormMixin):
     class Meta:
@@ -18,5 +27,51 @@ class CustomUserCreationForm(UserCreationForm, AsyncModelFormMixin):
             'is_writer',
         )
 
+    async def ais_valid(self) -> bool:
+        if not await super().ais_valid():
+            return False
+        # Hashed here, on the hashing executor, so a saturated executor is
+        # reported as a form error
+        try:
+            self._encoded_password = await amake_password(self.cleaned_data['password1'])
+        except ExecutorSaturated:
+            self.add_error(None, SATURATED_MESSAGE)
+            return False
+        return True
+
+    async def asave(self) -> CustomUser:
+        # ModelForm.save, not UserCreationForm.save: that one would hash the
+        # password again, on this thread
+        user = ModelForm.save(self, commit = False)
+        user.password = self._encoded_password
+        await user.asave()
+        return user
+
 class CustomAuthenticationForm(AuthenticationForm, AsyncFormMixin):
-    pass
\ No newline at end of file
+    def clean(self):
+        # Credentials are checked in `ais_valid`, with the hashing on the
+        # hashing executor instead of the shared sync_to_async thread
+        return self.cleaned_data
+
+    retry_after: float | None = None
+
+    async def ais_valid(self) -> bool:
+        # Field validation only: no database access, no hashing
+        if not self.is_valid():
+            return False
+        email = self.cleaned_data['username']
+        # Throttled attempts are turned away before the password is hashed
+        self.retry_after = await login_throttle.ahit(self.request, email)
+        if self.retry_after is not None:
+            self.add_error(None, THROTTLED_MESSAGE % {'seconds': math.ceil(self.retry_after)})
+            return False
+        try:
+            self.user_cache = await aauthenticate(self.request, email, self.cleaned_data['password'])
+        except ExecutorSaturated:
+            self.add_error(None, SATURATED_MESSAGE)
+            return False
+        if self.user_cache is None:
+            self.add_error(None, self.get_invalid_login_error())
+            return False
+        await login_throttle.asucceeded(email)
+        return True
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+import account.models
+
+
+def give_each_user_a_secret(apps, schema_editor):
+    # AddField computes a callable default once, for every existing row
+    CustomUser = apps.get_model('account', 'CustomUser')
+    for user in CustomUser.objects.only('pk').iterator():
+        CustomUser.objects.filter(pk = user.pk).update(feed_secret = account.models.new_feed_secret())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_alter_customuser_first_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='feed_secret',
+            field=models.CharField(default=account.models.new_feed_secret, editable=False, max_length=32),
+        ),
+        migrations.RunPython(give_each_user_a_secret, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import secrets
+
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils import timezone
@@ -8,6 +10,11 @@ from .managers import CustomUserManager
 FIRST_NAME_MAXLEN = 100
 LAST_NAME_MAXLEN = 160
 
+
+def new_feed_secret() -> str:
+    return secrets.token_urlsafe(16)
+
+
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True, verbose_name = _t('Email address'))
     first_name = models.CharField(max_length=FIRST_NAME_MAXLEN, verbose_name = _t('First name'))
@@ -18,6 +25,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     
     is_writer = models.BooleanField(default=False, verbose_name=_t('User is a writer?'))
 
+    # Part of the key that signs the user's feed token (client.feeds);
+    # replacing it revokes the feed URLs handed out so far
+    feed_secret = models.CharField(max_length=32, default=new_feed_secret, editable=False)
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
@@ -1,3 +1,202 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from common.hashing import CLEANSED_PASSWORD, aauthenticate, hashing_executor
+
+from .models import CustomUser
+from .throttling import CacheWindowStore, LocalWindowStore, LoginThrottle, login_throttle
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@override_settings(
+    LOGIN_THROTTLE_ENABLED = True,
+    LOGIN_THROTTLE_IP_LIMIT = 8, LOGIN_THROTTLE_IP_WINDOW = 60,
+    LOGIN_THROTTLE_EMAIL_LIMIT = 3, LOGIN_THROTTLE_EMAIL_WINDOW = 300,
+    LOGIN_THROTTLE_IP_HEADER = 'REMOTE_ADDR',
+)
+class LoginThrottleBurstTests(TestCase):
+    """A burst of login POSTs: over the limit they get a 429 and no hashing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('reader@example.com', 'right-passwd')
+
+    def setUp(self):
+        login_throttle.clear()
+        self.addCleanup(login_throttle.clear)
+
+    def post(self, email = 'reader@example.com', password = 'wrong-passwd', ip = '10.0.0.1'):
+        return self.client.post(
+            reverse('login'), {'username': email, 'password': password}, REMOTE_ADDR = ip,
+        )
+
+    def hashes(self) -> int:
+        return hashing_executor.stats()['submitted']
+
+    def test_email_burst_is_rejected_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.post().status_code, 200)
+        hashes = self.hashes()
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            response = self.post(ip = ip)
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+            self.assertContains(response, 'Too many login attempts', status_code = 429)
+        self.assertEqual(self.hashes(), hashes)
+        # Even the right password waits for the window
+        self.assertEqual(self.post(password = 'right-passwd').status_code, 429)
+
+    def test_ip_burst_is_rejected_across_emails(self):
+        for i in range(8):
+            self.assertEqual(self.post(email = f'user{i}@example.com').status_code, 200)
+        hashes = self.hashes()
+        self.assertEqual(self.post(email = 'other@example.com').status_code, 429)
+        self.assertEqual(self.hashes(), hashes)
+        self.assertEqual(self.post(email = 'other@example.com', ip = '10.0.0.9').status_code, 200)
+
+    def test_successful_login_clears_email_count(self):
+        for _ in range(2):
+            self.post()
+        self.assertEqual(self.post(password = 'right-passwd').status_code, 302)
+        self.client.logout()
+        for _ in range(3):
+            self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(self.post().status_code, 429)
+
+    @override_settings(LOGIN_THROTTLE_ENABLED = False)
+    def test_disabled(self):
+        for _ in range(5):
+            self.assertEqual(self.post().status_code, 200)
+
+    @override_settings(LOGIN_THROTTLE_IP_HEADER = 'HTTP_X_FORWARDED_FOR', LOGIN_THROTTLE_TRUSTED_PROXIES = 2)
+    def test_forwarded_client_ip(self):
+        request = RequestFactory().post('/', HTTP_X_FORWARDED_FOR = '203.0.113.7, 10.0.0.1')
+        self.assertEqual(LoginThrottle.client_ip(request), '203.0.113.7')
+
+    @override_settings(LOGIN_THROTTLE_IP_HEADER = 'HTTP_X_FORWARDED_FOR', LOGIN_THROTTLE_TRUSTED_PROXIES = 1)
+    def test_spoofed_forwarded_entries_are_ignored(self):
+        for spoofed in ('1.1.1.1', '2.2.2.2, 3.3.3.3', ''):
+            header = f'{spoofed}, 198.51.100.9' if spoofed else '198.51.100.9'
+            request = RequestFactory().post('/', HTTP_X_FORWARDED_FOR = header)
+            self.assertEqual(LoginThrottle.client_ip(request), '198.51.100.9')
+
+
+class SlidingWindowStoreTests(TestCase):
+    def test_local_window_slides(self):
+        clock = FakeClock()
+        store = LocalWindowStore(clock = clock)
+        for _ in range(3):
+            self.assertIsNone(store.hit('k', 3, 60))
+            clock.now += 10
+        self.assertAlmostEqual(store.hit('k', 3, 60), 30)
+        # The first hit leaves the window, making room for exactly one more
+        clock.now += 30
+        self.assertIsNone(store.hit('k', 3, 60))
+        self.assertIsNotNone(store.hit('k', 3, 60))
+
+    def test_local_store_evicts_least_recently_used_keys(self):
+        store = LocalWindowStore(max_keys = 2)
+        for key in ('a', 'b', 'a', 'c'):
+            store.hit(key, 1, 60)
+        self.assertEqual(list(store._hits), ['a', 'c'])
+
+    @override_settings(
+        LOGIN_THROTTLE_ENABLED = True,
+        LOGIN_THROTTLE_IP_LIMIT = 100, LOGIN_THROTTLE_IP_WINDOW = 60,
+        LOGIN_THROTTLE_EMAIL_LIMIT = 3, LOGIN_THROTTLE_EMAIL_WINDOW = 60,
+    )
+    def test_cache_store_is_shared(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        clock = FakeClock(60 * 1000)
+        # Two throttles stand for two worker processes sharing one cache
+        workers = [LoginThrottle(CacheWindowStore('default', clock = clock)) for _ in range(2)]
+        request = RequestFactory().post('/', REMOTE_ADDR = '10.0.0.1')
+
+        @async_to_sync
+        async def hit(worker: LoginThrottle) -> float | None:
+            return await worker.ahit(request, 'Reader@Example.com')
+
+        self.assertEqual([hit(workers[i % 2]) for i in range(3)], [None] * 3)
+        self.assertIsNotNone(hit(workers[0]))
+        self.assertIsNotNone(hit(workers[1]))
+        # Half a window later the previous window still weighs 3 * 0.5
+        clock.now += 90
+        self.assertIsNone(hit(workers[0]))
+        self.assertIsNone(hit(workers[1]))
+        self.assertIsNotNone(hit(workers[0]))
+        # Successful login clears the email on every worker
+        async_to_sync(workers[0].asucceeded)('reader@example.com')
+        self.assertIsNone(hit(workers[1]))
+
+    def test_clearing_a_cache_backed_throttle_leaves_the_cache_alone(self):
+        cache = caches['default']
+        cache.set('unrelated', 'kept')
+        self.addCleanup(cache.delete, 'unrelated')
+        LoginThrottle(CacheWindowStore('default')).clear()
+        self.assertEqual(cache.get('unrelated'), 'kept')
+
+
+class StaffOnlyBackend:
+    """Lets staff in with a shared passphrase; stops anyone using 'banned'."""
+
+    def authenticate(self, request, username = None, password = None):
+        if password == 'banned':
+            raise PermissionDenied
+        if password == 'staff-passphrase':
+            return CustomUser.objects.filter(email = username, is_staff = True).first()
+        return None
+
+    def get_user(self, user_id):
+        return CustomUser.objects.filter(pk = user_id).first()
+
+
+@override_settings(AUTHENTICATION_BACKENDS = [
+    'account.tests.StaffOnlyBackend',
+    'django.contrib.auth.backends.ModelBackend',
+])
+class AuthenticateBackendsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('staff@example.com', 'model-passwd', is_staff = True)
+        cls.inactive = CustomUser.objects.create_user('gone@example.com', 'model-passwd', is_active = False)
+        CustomUser.objects.create_user('banned@example.com', 'banned')
+
+    def authenticate(self, username, password):
+        return async_to_sync(aauthenticate)(None, username, password)
+
+    def test_configured_backends_are_tried_in_order(self):
+        user = self.authenticate('staff@example.com', 'staff-passphrase')
+        self.assertEqual((user, user.backend), (self.staff, 'account.tests.StaffOnlyBackend'))
+        hashes = hashing_executor.stats()['submitted']
+        user = self.authenticate('staff@example.com', 'model-passwd')
+        self.assertEqual(user.backend, 'django.contrib.auth.backends.ModelBackend')
+        # ModelBackend's hashing still goes through the hashing pool
+        self.assertGreater(hashing_executor.stats()['submitted'], hashes)
+
+    def test_failure_sends_user_login_failed(self):
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.assertIsNone(self.authenticate('staff@example.com', 'wrong'))
+        self.assertIsNone(self.authenticate('gone@example.com', 'model-passwd'))
+        # PermissionDenied stops before ModelBackend gets a try
+        self.assertIsNone(self.authenticate('banned@example.com', 'banned'))
+        self.assertEqual(len(failures), 3)
+        self.assertEqual(failures[0], {'username': 'staff@example.com', 'password': CLEANSED_PASSWORD})
 
-# Create your tests here.
@@ -0,0 +1,183 @@
+"""
+Sliding-window throttling of login attempts, by client IP and by email.
+
+Every login POST is counted against both keys before the password is
+checked, so once a key is over its limit further attempts are turned
+away without costing a password hash. A successful login clears the
+email's count.
+
+Counts live in process memory by default (`LocalWindowStore`, an exact
+sliding log per key). With LOGIN_THROTTLE_CACHE_ALIAS set they go to
+that cache instead (`CacheWindowStore`, a sliding-window counter), so all
+workers share them.
+"""
+
+__all__ = (
+    'ThrottleRule',
+    'LocalWindowStore',
+    'CacheWindowStore',
+    'LoginThrottle',
+    'login_throttle',
+)
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest
+
+
+@dataclass(frozen = True)
+class ThrottleRule:
+    scope: str
+    limit: int
+    window: float
+
+
+class LocalWindowStore:
+    """Timestamps of the recent hits of every key, in process memory."""
+
+    def __init__(self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._hits: dict[str, deque[float]] = {}
+
+    async def ahit(self, key: str, limit: int, window: float) -> float | None:
+        return self.hit(key, limit, window)
+
+    def hit(self, key: str, limit: int, window: float) -> float | None:
+        """
+        Records a hit on `key` unless it already had `limit` hits in the
+        last `window` seconds; then returns how long until one expires.
+        """
+        now = self.clock()
+        with self._lock:
+            hits = self._hits.pop(key, None) or deque()
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            # Re-inserted last, so the dict stays in least recently used order
+            self._hits[key] = hits
+            if len(hits) >= limit:
+                return hits[0] + window - now
+            hits.append(now)
+            while len(self._hits) > self.max_keys:
+                del self._hits[next(iter(self._hits))]
+        return None
+
+    async def areset(self, key: str, window: float):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._hits.clear()
+
+
+class CacheWindowStore:
+    """
+    Per-window hit counters in a Django cache. The count over the sliding
+    window is estimated from the current and previous fixed windows, the
+    latter weighted by how much of it the sliding window still covers.
+    """
+
+    def __init__(self, alias: str, prefix: str = 'login-throttle', clock: Callable[[], float] = time.time):
+        self.alias = alias
+        self.prefix = prefix
+        self.clock = clock
+
+    async def ahit(self, key: str, limit: int, window: float) -> float | None:
+        cache = caches[self.alias]
+        now = self.clock()
+        bucket, offset = divmod(now, window)
+        current_key = f'{self.prefix}:{key}:{int(bucket)}'
+        previous_key = f'{self.prefix}:{key}:{int(bucket) - 1}'
+        counts = await cache.aget_many([current_key, previous_key])
+        estimate = counts.get(previous_key, 0) * (1 - offset / window) + counts.get(current_key, 0)
+        if estimate >= limit:
+            return window - offset
+        if not await cache.aadd(current_key, 1, timeout = 2 * window):
+            try:
+                await cache.aincr(current_key)
+            except ValueError:
+                # Expired between add and incr
+                await cache.aset(current_key, 1, timeout = 2 * window)
+        return None
+
+    async def areset(self, key: str, window: float):
+        bucket = int(self.clock() // window)
+        await caches[self.alias].adelete_many([
+            f'{self.prefix}:{key}:{bucket}',
+            f'{self.prefix}:{key}:{bucket - 1}',
+        ])
+
+
+class LoginThrottle:
+    def __init__(self, store: LocalWindowStore | CacheWindowStore | None = None):
+        self._store = store
+
+    @property
+    def store(self) -> LocalWindowStore | CacheWindowStore:
+        if self._store is None:
+            alias = settings.LOGIN_THROTTLE_CACHE_ALIAS
+            self._store = CacheWindowStore(alias) if alias else LocalWindowStore()
+        return self._store
+
+    @staticmethod
+    def rules() -> tuple[ThrottleRule, ThrottleRule]:
+        return (
+            ThrottleRule('ip', settings.LOGIN_THROTTLE_IP_LIMIT, settings.LOGIN_THROTTLE_IP_WINDOW),
+            ThrottleRule('email', settings.LOGIN_THROTTLE_EMAIL_LIMIT, settings.LOGIN_THROTTLE_EMAIL_WINDOW),
+        )
+
+    @staticmethod
+    def client_ip(request: HttpRequest) -> str:
+        value = request.META.get(settings.LOGIN_THROTTLE_IP_HEADER) or request.META.get('REMOTE_ADDR', '')
+        # X-Forwarded-For: <whatever the client sent>, client, proxy1, ...
+        # Each of our proxies appends the address it got the request from, so
+        # only the last LOGIN_THROTTLE_TRUSTED_PROXIES entries can be trusted;
+        # the entries to their left are the client's to choose
+        entries = [entry.strip() for entry in value.split(',') if entry.strip()]
+        if not entries:
+            return ''
+        hops = max(settings.LOGIN_THROTTLE_TRUSTED_PROXIES, 1)
+        return entries[max(len(entries) - hops, 0)]
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f'email:{email.strip().casefold()}'
+
+    async def ahit(self, request: HttpRequest, email: str) -> float | None:
+        """
+        Counts a login attempt. Returns None if it may go ahead, or the
+        number of seconds to wait if the IP or the email is over its limit.
+        """
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return None
+        ip_rule, email_rule = self.rules()
+        keys = ((ip_rule, f'ip:{self.client_ip(request)}'), (email_rule, self._email_key(email)))
+        for rule, key in keys:
+            if (retry_after := await self.store.ahit(key, rule.limit, rule.window)) is not None:
+                return retry_after
+        return None
+
+    async def asucceeded(self, email: str):
+        """Clears the email's count after a successful login."""
+        if settings.LOGIN_THROTTLE_ENABLED:
+            await self.store.areset(self._email_key(email), settings.LOGIN_THROTTLE_EMAIL_WINDOW)
+
+    def clear(self):
+        """
+        Forgets the counts kept in process memory. Counts in a cache are
+        left to expire: the cache may be shared with other data, and
+        Django caches can't delete by key prefix.
+        """
+        if isinstance(self._store, LocalWindowStore):
+            self._store.clear()
+
+
+login_throttle = LoginThrottle()
@@ -1,12 +1,13 @@
+import math
+
 from django.shortcuts import render, redirect
 from django.http import HttpResponse, HttpRequest
 from django.contrib.auth.decorators import login_required
-import django.contrib.auth as auth
 from common.django_utils import arender, alogout
 
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
 from .models import CustomUser
-from common.auth import aanonymous_required
+from common.auth import aanonymous_required, alogin
 
 
 
@@ -36,21 +37,19 @@ async def register(request: HttpRequest) -> HttpResponse:
 async def login(request: HttpRequest) -> HttpResponse:
     if request.method == 'POST':
         form = CustomAuthenticationForm(request, data=request.POST)
+        # Validating the form authenticates the user (just once)
         if await form.ais_valid():
-            email = request.POST['username']
-            passwd = request.POST['password']
-            user: CustomUser | None = await auth.aauthenticate(
-                request, 
-                username=email, 
-                password=passwd
-            ) # type: ignore
-            
-            if user:
-                await auth.alogin(request, user)
-                return redirect(
-                    'writer-dashboard' if user.is_writer else
-                    'client-dashboard'
-                )
+            user: CustomUser = form.get_user() # type: ignore
+            await alogin(request, user)
+            return redirect(
+                'writer-dashboard' if user.is_writer else
+                'client-dashboard'
+            )
+
+        if form.retry_after is not None:
+            response = await arender(request, 'account/login.html', {'login_form' : form}, status = 429)
+            response['Retry-After'] = str(math.ceil(form.retry_after))
+            return response
 
     else:
         form = CustomAuthenticationForm()
@@ -0,0 +1,166 @@
+"""
+Read-only JSON API (v1) over the article feed, for the mobile app and
+partner integrations.
+
+Rows are read with `.values_list()` and serialized straight from the
+tuples; no Article instances are built. Readers pick the fields they
+want with `?fields=a,b,c` and page through the feed with the same
+cursors as the HTML pages (`?after=` / `?before=`, `?limit=`).
+"""
+
+import json
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Sequence
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.http import require_safe
+
+from common.auth import aget_user
+from common.django_utils import AsyncViewT
+from common.pagination import InvalidCursor, KeysetPaginator
+from writer.models import Article
+
+from .entitlements import aget_entitlement
+
+# Public field name -> columns read for it
+ARTICLE_FIELDS: dict[str, tuple[str, ...]] = {
+    'id': ('id',),
+    'title': ('title',),
+    'excerpt': ('excerpt',),
+    'content': ('content',),
+    'date_posted': ('date_posted',),
+    'date_updated': ('date_updated',),
+    'is_premium': ('is_premium',),
+    'author': ('user__first_name', 'user__last_name'),
+}
+FEED_FIELDS = tuple(name for name in ARTICLE_FIELDS if name != 'content')
+FEED_DEFAULT_FIELDS = ('id', 'title', 'excerpt', 'date_posted', 'is_premium', 'author')
+DETAIL_DEFAULT_FIELDS = tuple(ARTICLE_FIELDS)
+
+# Cursor columns, always read first so the paginator can find them
+KEY_COLUMNS = ('date_posted', 'id')
+
+
+class FieldError(ValueError):
+    pass
+
+
+def _json(payload: Any, status: int = 200) -> HttpResponse:
+    body = json.dumps(payload, separators = (',', ':'), ensure_ascii = False)
+    return HttpResponse(body, status = status, content_type = 'application/json')
+
+
+def _error(status: int, message: str) -> HttpResponse:
+    return _json({'error': message}, status = status)
+
+
+def _requested_fields(request: HttpRequest, allowed: Sequence[str], default: Sequence[str]) -> list[str]:
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default)
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown or not fields:
+        raise FieldError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return fields
+
+
+def _row_serializer(fields: list[str], columns: list[str]) -> Callable[[tuple], dict]:
+    """
+    Builds a function turning one values_list() tuple into the output dict,
+    resolving every field to its column positions once per request.
+    """
+    plan = []
+    for name in fields:
+        positions = [columns.index(c) for c in ARTICLE_FIELDS[name]]
+        plan.append((name, positions))
+
+    def serialize(row: tuple) -> dict:
+        item = {}
+        for name, positions in plan:
+            if len(positions) == 1:
+                value = row[positions[0]]
+                item[name] = value.isoformat() if isinstance(value, datetime) else value
+            else:
+                item[name] = ' '.join(row[p] for p in positions)
+        return item
+    return serialize
+
+
+def _columns_for(fields: list[str]) -> list[str]:
+    columns = list(KEY_COLUMNS)
+    for name in fields:
+        columns.extend(c for c in ARTICLE_FIELDS[name] if c not in columns)
+    return columns
+
+
+def api_client_required(view: AsyncViewT):
+    """
+    JSON flavour of `aclient_required`: answers 401/403 instead of
+    redirecting, and hands the view whether the reader may see premium
+    articles.
+    """
+    @wraps(view)
+    async def fun(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return _error(401, 'Authentication required')
+        if user.is_writer:
+            return _error(403, 'Only clients can read articles')
+        entitlement = await aget_entitlement(request)
+        if not entitlement.is_active:
+            return _error(403, 'An active subscription is required')
+        return await view(request, entitlement.include_premium, *args, **kwargs)
+    return fun
+
+
+@require_safe
+@api_client_required
+async def article_list(request: HttpRequest, include_premium: bool) -> HttpResponse:
+    try:
+        fields = _requested_fields(request, FEED_FIELDS, FEED_DEFAULT_FIELDS)
+        limit = int(request.GET.get('limit', settings.ARTICLES_PER_PAGE))
+    except FieldError as exc:
+        return _error(400, str(exc))
+    except ValueError:
+        return _error(400, "'limit' must be an integer")
+    limit = max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+    columns = _columns_for(fields)
+    rows = Article.objects.for_tier(include_premium).values_list(*columns)
+    paginator = KeysetPaginator(rows, per_page = limit, key = lambda row: row[:len(KEY_COLUMNS)])
+    try:
+        page = await paginator.aget_page(
+            after = request.GET.get('after'),
+            before = request.GET.get('before'),
+        )
+    except InvalidCursor:
+        return _error(400, 'Invalid cursor')
+
+    serialize = _row_serializer(fields, columns)
+    return _json({
+        'results': [serialize(row) for row in page.items],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+@require_safe
+@api_client_required
+async def article_detail(request: HttpRequest, include_premium: bool, id: int) -> HttpResponse:
+    try:
+        fields = _requested_fields(request, tuple(ARTICLE_FIELDS), DETAIL_DEFAULT_FIELDS)
+    except FieldError as exc:
+        return _error(400, str(exc))
+
+    columns = _columns_for(fields) + ['is_premium']
+    try:
+        row = await Article.objects.values_list(*columns).aget(id = id)
+    except ObjectDoesNotExist:
+        return _error(404, 'Article not found')
+    if row[-1] and not include_premium:
+        return _error(403, 'This article is only available to premium subscribers')
+    return _json(_row_serializer(fields, columns)(row))
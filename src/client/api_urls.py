@@ -0,0 +1,7 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('articles/', api.article_list, name='api-article-list'),
+    path('articles/<int:id>', api.article_detail, name='api-article-detail'),
+]
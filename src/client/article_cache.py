@@ -0,0 +1,62 @@
+"""
+Rendered article bodies, cached in the configured Django cache.
+
+Keys carry the article's version: its `date_updated` plus its author's
+name, which the body shows and which a rename changes without touching
+the article. An edit or a rename simply makes readers ask for a new key
+and the old body ages out; nothing is ever invalidated by hand.
+"""
+
+__all__ = (
+    'AUTHOR_FIELDS',
+    'article_version',
+    'body_cache_key',
+    'aget_article_body',
+    'article_etag',
+)
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.translation import get_language
+
+from common.executors import executors
+from writer.models import Article
+
+BODY_TEMPLATE = 'client/_article-body.html'
+# What `article_version` reads; load them with the article (select_related)
+AUTHOR_FIELDS = ('user__first_name', 'user__last_name')
+
+
+def article_version(article: Article) -> str:
+    """Changes whenever the rendered body does: an edit or an author rename."""
+    author = f'{article.user.first_name}\0{article.user.last_name}'
+    return f'{article.date_updated.timestamp()}:{hashlib.md5(author.encode()).hexdigest()[:12]}'
+
+
+def body_cache_key(article_id: int, version: str) -> str:
+    return f'article-body:{get_language()}:{article_id}:{version}'
+
+
+def article_etag(article: Article, *variant) -> str:
+    """
+    The body's version plus whatever else the page shows for this reader
+    (their plan label, their name in the navbar).
+    """
+    raw = ':'.join(str(part) for part in (article.id, article_version(article), *variant))
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+async def aget_article_body(article: Article) -> str:
+    """`article` needs only its id, `date_updated` and AUTHOR_FIELDS loaded."""
+    version = article_version(article)
+    body = await cache.aget(body_cache_key(article.id, version))
+    if body is None:
+        full = await Article.objects.select_related('user').aget(id = article.id)
+        # The user is already loaded: a database-free render, done off the loop
+        body = await executors.arun('cpu', render_to_string, BODY_TEMPLATE, {'article': full})
+        key = body_cache_key(full.id, article_version(full))
+        await cache.aset(key, body, settings.ARTICLE_BODY_CACHE_TIMEOUT)
+    return body
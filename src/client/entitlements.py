@@ -0,0 +1,129 @@
+"""
+What the current client is entitled to, resolved once per request.
+
+Client pages used to look the subscription up several times per request
+and then walk to its plan through lazy foreign key loads. The
+`Entitlement` built here is memoized on the request, so every view and
+decorator handling the request shares it.
+
+It is also kept in the session as a compact signed claim (user, plan
+code, active flag, subscription id, plus the signing timestamp). While
+the claim is younger than ENTITLEMENT_CLAIM_MAX_AGE seconds, browsing
+needs no subscription query at all; once it expires, or after
+`create_subscription`/`cancel_subscription` drop it, the next request
+reads the subscription again (one query, the plan comes from the plan
+registry) and signs a fresh claim.
+"""
+
+__all__ = (
+    'Entitlement',
+    'aget_entitlement',
+    'aforget_entitlement',
+)
+
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core import signing
+from django.http import HttpRequest
+
+from account.models import CustomUser
+from common.auth import aget_user
+
+from .models import PlanChoice, Subscription
+from .plans import plan_registry
+
+REQUEST_ATTR = '_client_entitlement'
+SESSION_KEY = '_client_entitlement'
+CLAIM_SALT = 'client.entitlements'
+PREMIUM_PLAN_CODE = 'PR'
+
+
+@dataclass(frozen = True)
+class Entitlement:
+    subscription_id: int | None
+    is_active: bool
+    # The subscribed plan, even if the subscription is inactive
+    plan: PlanChoice | None
+
+    @classmethod
+    async def afor_user(cls, user: CustomUser) -> 'Entitlement':
+        subscription = await Subscription.objects.filter(user = user).afirst()
+        if subscription is None:
+            return cls(None, False, None)
+        plan = await plan_registry.aget_by_id(subscription.plan_choice_id) # type: ignore
+        return cls(subscription.id, subscription.is_active, plan)
+
+    @classmethod
+    async def afrom_claim(cls, claim: str, user: CustomUser) -> 'Entitlement | None':
+        """The entitlement in a signed claim, or None if it is invalid or expired."""
+        try:
+            user_id, subscription_id, plan_code, is_active = signing.loads(
+                claim, salt = CLAIM_SALT, max_age = settings.ENTITLEMENT_CLAIM_MAX_AGE,
+            )
+            if user_id != user.pk:
+                return None
+            plan = await plan_registry.aget(plan_code) if plan_code else None
+        except (signing.BadSignature, ValueError, TypeError, PlanChoice.DoesNotExist):
+            return None
+        return cls(subscription_id, is_active, plan)
+
+    def claim_for(self, user: CustomUser) -> str:
+        plan_code = self.plan.plan_code if self.plan else ''
+        return signing.dumps(
+            [user.pk, self.subscription_id, plan_code, self.is_active],
+            salt = CLAIM_SALT,
+        )
+
+    @property
+    def has_subscription(self) -> bool:
+        """Whether there is a subscription at all, active or not."""
+        return self.subscription_id is not None
+
+    @property
+    def is_premium_plan(self) -> bool:
+        return self.plan is not None and self.plan.plan_code == PREMIUM_PLAN_CODE
+
+    @property
+    def include_premium(self) -> bool:
+        return self.is_active and self.is_premium_plan
+
+    @property
+    def tier(self) -> str:
+        """'premium', 'standard' or 'none', as the client templates expect."""
+        if not self.is_active:
+            return 'none'
+        return 'premium' if self.is_premium_plan else 'standard'
+
+    def plan_name(self, default: str) -> str:
+        """Name of the active plan, or `default`."""
+        return self.plan.name if self.is_active else default # type: ignore
+
+    async def asubscription(self) -> Subscription | None:
+        """The full Subscription row, for the few views that need it."""
+        if self.subscription_id is None:
+            return None
+        return await Subscription.objects.filter(id = self.subscription_id).afirst()
+
+
+async def aget_entitlement(request: HttpRequest) -> Entitlement:
+    entitlement = getattr(request, REQUEST_ATTR, None)
+    if entitlement is not None:
+        return entitlement
+
+    user = await aget_user(request)
+    claim = await request.session.aget(SESSION_KEY)
+    if claim is not None:
+        entitlement = await Entitlement.afrom_claim(claim, user)
+    if entitlement is None:
+        entitlement = await Entitlement.afor_user(user)
+        await request.session.aset(SESSION_KEY, entitlement.claim_for(user))
+    setattr(request, REQUEST_ATTR, entitlement)
+    return entitlement
+
+
+async def aforget_entitlement(request: HttpRequest):
+    """To be called after the request changes the user's subscription."""
+    if hasattr(request, REQUEST_ATTR):
+        delattr(request, REQUEST_ATTR)
+    await request.session.apop(SESSION_KEY, None)
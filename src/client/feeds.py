@@ -0,0 +1,140 @@
+"""
+RSS 2.0 and Atom feeds of the latest articles, one per subscription tier.
+
+Feed readers can't log in, so every subscriber gets a personal signed
+token that goes in the feed URL. It is signed with the user's
+`feed_secret`, so `arotate_feed_token` revokes it. The XML itself is per
+tier: it is built from the in-memory feed cache and stored in the Django
+cache under a version derived from the articles it lists, and its ETag
+is that same version, so a poll that finds nothing new costs one
+subscription lookup and a 304. Being shared, the cached XML holds a
+placeholder where the feed's own (tokenized) URL goes, filled in per
+request.
+"""
+
+__all__ = (
+    'feed_token_for',
+    'arotate_feed_token',
+    'article_feed',
+)
+
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseForbidden
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from account.models import CustomUser, new_feed_secret
+from writer.feed_cache import feed_cache
+
+from .models import Subscription
+
+TOKEN_SALT = 'client.feeds'
+# Stands for the token in the cached XML's self link (URL-safe, like tokens)
+TOKEN_PLACEHOLDER = 'feed-token-placeholder'
+FEED_KINDS = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+}
+
+
+def _signer(feed_secret: str) -> signing.Signer:
+    return signing.Signer(salt = f'{TOKEN_SALT}:{feed_secret}')
+
+
+def feed_token_for(user: CustomUser) -> str:
+    return _signer(user.feed_secret).sign(str(user.pk))
+
+
+async def arotate_feed_token(user: CustomUser) -> str:
+    """Gives the user a new feed token; the previous one stops working."""
+    user.feed_secret = new_feed_secret()
+    await user.asave(update_fields = ['feed_secret'])
+    return feed_token_for(user)
+
+
+def _user_id_from_token(token: str) -> int | None:
+    """The user id the token claims; check it with `_token_is_valid`."""
+    user_id, _, signature = token.partition(signing.Signer().sep)
+    try:
+        return int(user_id) if signature else None
+    except ValueError:
+        return None
+
+
+def _token_is_valid(token: str, user: CustomUser) -> bool:
+    try:
+        return _signer(user.feed_secret).unsign(token) == str(user.pk)
+    except signing.BadSignature:
+        return False
+
+
+def _build_feed(request: HttpRequest, kind: str, include_premium: bool, articles: list) -> str:
+    feed = FEED_KINDS[kind](
+        title = 'The Contrarian Report' + (' (Premium)' if include_premium else ''),
+        link = request.build_absolute_uri(reverse('browse-articles')),
+        description = 'Unique and profitable perspectives on the capital markets',
+        language = settings.LANGUAGE_CODE,
+        feed_url = request.build_absolute_uri(reverse(f'article-feed-{kind}', args = [TOKEN_PLACEHOLDER])),
+    )
+    for article in articles:
+        feed.add_item(
+            title = article.title,
+            link = request.build_absolute_uri(reverse('article-detail', args = [article.id])),
+            description = article.excerpt,
+            author_name = f'{article.user.first_name} {article.user.last_name}',
+            pubdate = article.date_posted,
+            updateddate = article.date_updated,
+            unique_id = f'article-{article.id}',
+        )
+    return feed.writeString('utf-8')
+
+
+@require_safe
+async def article_feed(request: HttpRequest, token: str, kind: str) -> HttpResponse:
+    if kind not in FEED_KINDS or (user_id := _user_id_from_token(token)) is None:
+        raise Http404('Unknown feed')
+    subscription = await (
+        Subscription.objects
+        .filter(user_id = user_id, user__is_active = True, is_active = True)
+        .select_related('user')
+        .afirst()
+    )
+    if subscription is None:
+        user = await CustomUser.objects.filter(pk = user_id).only('pk', 'feed_secret').afirst()
+        if user is None or not _token_is_valid(token, user):
+            raise Http404('Unknown feed')
+        return HttpResponseForbidden('An active subscription is required')
+    if not _token_is_valid(token, subscription.user):
+        raise Http404('Unknown feed')
+    include_premium = await subscription.ais_premium()
+
+    page = await feed_cache.aget_page(include_premium, settings.FEEDS_MAX_ITEMS)
+    articles = page.items
+    versions = ','.join(f'{a.id}:{a.date_updated.timestamp()}' for a in articles)
+    version = hashlib.md5(f'{kind}:{include_premium}:{request.get_host()}:{versions}'.encode()).hexdigest()
+    etag = f'"{version}"'
+    last_modified = max((int(a.date_updated.timestamp()) for a in articles), default = None)
+    if response := get_conditional_response(request, etag = etag, last_modified = last_modified):
+        return response
+
+    cache_key = f'article-feed:{version}'
+    xml = await cache.aget(cache_key)
+    if xml is None:
+        xml = _build_feed(request, kind, include_premium, articles)
+        await cache.aset(cache_key, xml, settings.FEED_XML_CACHE_TIMEOUT)
+
+    # The self link, in the feed's header, is its only per-subscriber part
+    xml = xml.replace(TOKEN_PLACEHOLDER, token, 1)
+    response = HttpResponse(xml, content_type = FEED_KINDS[kind].content_type)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private = True, no_cache = True)
+    return response
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from account.models import CustomUser
+from client.models import PlanChoice, Subscription
+from common.benchmark import benchmark_database, measure, read_body
+from writer.models import Article, make_excerpt
+
+PARAGRAPH = (
+    'Consensus positioning leaves markets fragile when the narrative turns. '
+    'Credit spreads, breadth and volatility rarely agree for long. '
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the JSON article feed (/api/v1/articles/) with the HTML "
+        "browse-articles page on a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type = int, default = 2000)
+        parser.add_argument('--requests', type = int, default = 200)
+        parser.add_argument('--page-size', type = int, default = 20)
+
+    def handle(self, *args, articles: int, requests: int, page_size: int, **options):
+        # Both pages show the same number of articles
+        with benchmark_database(), override_settings(ARTICLES_PER_PAGE = page_size):
+            client = self.seed(articles)
+            self.stdout.write(f'{articles} articles, {page_size} per page, {requests} requests each\n')
+
+            html = measure(
+                'HTML browse-articles',
+                lambda: read_body(client.get('/client/browse-articles/')),
+                requests,
+            )
+            api = measure(
+                'JSON feed',
+                lambda: read_body(client.get(f'/api/v1/articles/?limit={page_size}')),
+                requests,
+            )
+            sparse = measure(
+                'JSON feed ?fields=id,title',
+                lambda: read_body(client.get(f'/api/v1/articles/?limit={page_size}&fields=id,title')),
+                requests,
+            )
+            for timing in (html, api, sparse):
+                self.stdout.write(timing.summary())
+            self.stdout.write(f'\nJSON feed vs HTML page: {html.mean / api.mean:.1f}x faster (mean)')
+
+    def seed(self, articles: int) -> Client:
+        writer = CustomUser.objects.create_user(
+            'bench-writer@example.com', 'bench-passwd',
+            first_name = 'Bench', last_name = 'Writer', is_writer = True,
+        )
+        reader = CustomUser.objects.create_user(
+            'bench-reader@example.com', 'bench-passwd',
+            first_name = 'Bench', last_name = 'Reader',
+        )
+        plan = PlanChoice.from_plan_code('PR')
+        Subscription.objects.create(
+            user = reader, plan_choice = plan, cost = plan.cost,
+            external_subscription_id = 'BENCH', is_active = True,
+        )
+        now = timezone.now()
+        content = PARAGRAPH * 40
+        Article.objects.bulk_create(
+            Article(
+                title = f'Contrarian take #{i}', content = content,
+                excerpt = make_excerpt(content), is_premium = i % 3 == 0,
+                date_posted = now - timedelta(minutes = i), user = writer,
+            )
+            for i in range(articles)
+        )
+        client = Client()
+        client.force_login(reader)
+        return client
@@ -4,7 +4,6 @@ from django.utils.translation import gettext_lazy as _t
 from django.utils.translation import gettext as _t2
 from django.core.exceptions import ObjectDoesNotExist
 
-from asgiref.sync import sync_to_async
 
 from account.models import CustomUser
 
@@ -52,13 +51,17 @@ class PlanChoice(models.Model):
     def __str__(self) -> str:
         return f"{str(self.name)} subscription"
     
+    # Both read the process-local plan registry (client.plans); the plan
+    # returned is shared, don't modify it
     @classmethod
     def from_plan_code(cls, plan_code: str) -> 'PlanChoice':
-        return PlanChoice.objects.get(plan_code = plan_code)
+        from .plans import plan_registry
+        return plan_registry.get(plan_code)
     
     @classmethod
     async def afrom_plan_code(cls, plan_code: str) -> 'PlanChoice':
-        return await PlanChoice.objects.aget(plan_code = plan_code)
+        from .plans import plan_registry
+        return await plan_registry.aget(plan_code)
 
 
 class Subscription(models.Model):
@@ -80,10 +83,8 @@ class Subscription(models.Model):
         return f'{self.user.first_name} {self.user.last_name}: {plan_choice.name} {_t2("subscription")}'
 
     async def aplan_choice(self) -> PlanChoice:
-        @sync_to_async
-        def call_sync_fk() -> PlanChoice:
-            return self.plan_choice
-        return await call_sync_fk()
+        from .plans import plan_registry
+        return await plan_registry.aget_by_id(self.plan_choice_id) # type: ignore
 
 
     async def ais_premium(self) -> bool:
@@ -0,0 +1,114 @@
+"""
+Process-local registry of the subscription plans.
+
+The plan table holds a couple of rows and almost never changes, so every
+process reads it once and answers plan lookups from memory. The registry
+is dropped from the PlanChoice signals in `client.signals` and reloaded
+after PLAN_REGISTRY_TTL seconds in any case, to pick up changes made by
+other workers. A lookup that misses reloads before giving up, so a plan
+added elsewhere is found without waiting for the TTL; but only if the
+last load is older than PLAN_REGISTRY_MISS_RELOAD seconds, since plan
+codes come from URLs and made-up ones would otherwise reload the table
+on every request.
+
+The PlanChoice instances handed out are shared; treat them as read-only.
+"""
+
+__all__ = (
+    'PlanRegistry',
+    'plan_registry',
+)
+
+import threading
+import time
+
+from django.conf import settings
+
+from common.executors import executors
+
+from .models import PlanChoice
+
+
+class PlanRegistry:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_code: dict[str, PlanChoice] = {}
+        self._by_id: dict[int, PlanChoice] = {}
+        self._loaded_at: float | None = None
+        self._generation = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return (
+            self._loaded_at is not None and
+            time.monotonic() - self._loaded_at < settings.PLAN_REGISTRY_TTL
+        )
+
+    def get(self, plan_code: str) -> PlanChoice:
+        """The plan with `plan_code`; raises PlanChoice.DoesNotExist."""
+        return self._lookup('_by_code', plan_code)
+
+    async def aget(self, plan_code: str) -> PlanChoice:
+        return await self._alookup('_by_code', plan_code)
+
+    def get_by_id(self, plan_id: int) -> PlanChoice:
+        return self._lookup('_by_id', plan_id)
+
+    async def aget_by_id(self, plan_id: int) -> PlanChoice:
+        return await self._alookup('_by_id', plan_id)
+
+    def active(self) -> list[PlanChoice]:
+        if not self.is_loaded:
+            self.load()
+        return self._active()
+
+    async def aactive(self) -> list[PlanChoice]:
+        if not self.is_loaded:
+            await executors.arun('db', self.load)
+        return self._active()
+
+    def load(self):
+        with self._lock:
+            generation = self._generation
+        plans = list(PlanChoice.objects.order_by('id'))
+        with self._lock:
+            self._by_code = {plan.plan_code: plan for plan in plans}
+            self._by_id = {plan.id: plan for plan in plans}
+            changed_meanwhile = generation != self._generation
+            self._loaded_at = None if changed_meanwhile else time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+
+    def _lookup(self, index: str, key) -> PlanChoice:
+        if self._needs_load(index, key):
+            self.load()
+        return self._found(index, key)
+
+    async def _alookup(self, index: str, key) -> PlanChoice:
+        if self._needs_load(index, key):
+            await executors.arun('db', self.load)
+        return self._found(index, key)
+
+    def _needs_load(self, index: str, key) -> bool:
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            return True
+        age = time.monotonic() - loaded_at
+        return age >= settings.PLAN_REGISTRY_TTL or (
+            key not in getattr(self, index) and age >= settings.PLAN_REGISTRY_MISS_RELOAD
+        )
+
+    def _found(self, index: str, key) -> PlanChoice:
+        try:
+            return getattr(self, index)[key]
+        except KeyError:
+            raise PlanChoice.DoesNotExist(f'No plan {key!r}') from None
+
+    def _active(self) -> list[PlanChoice]:
+        return [plan for plan in self._by_id.values() if plan.is_active]
+
+
+plan_registry = PlanRegistry()
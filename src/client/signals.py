@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import PlanChoice
+from .plans import plan_registry
+
+
+@receiver(post_save, sender = PlanChoice)
+@receiver(post_delete, sender = PlanChoice)
+def plan_changed(sender, instance: PlanChoice, **kwargs):
+    transaction.on_commit(plan_registry.clear)
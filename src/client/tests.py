@@ -1,3 +1,402 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.sessions.backends.db import SessionStore
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.models import CustomUser
+from writer.feed_cache import feed_cache
+from writer.models import Article
+from writer.search import SearchIndex
+
+from . import entitlements
+from .feeds import feed_token_for
+from .models import PlanChoice, Subscription
+from .plans import plan_registry
+
+
+def make_plan(plan_code: str) -> PlanChoice:
+    # The plans are seeded by a data migration
+    plan, _ = PlanChoice.objects.get_or_create(plan_code = plan_code, defaults = {
+        'name': f'Plan {plan_code}', 'cost': 5, 'is_active': True,
+        'description1': '', 'description2': '', 'external_plan_id': f'P-{plan_code}',
+        'external_api_url': '', 'external_style_json': '',
+    })
+    return plan
+
+
+def make_subscriber(email: str, plan: PlanChoice) -> CustomUser:
+    user = CustomUser.objects.create_user(email, 'passwd', first_name = 'Ann', last_name = 'Reader')
+    Subscription.objects.create(
+        user = user, plan_choice = plan, cost = plan.cost, external_subscription_id = f'S-{email}', is_active = True,
+    )
+    return user
+
+
+class ArticleFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = make_plan('ST')
+        cls.first = make_subscriber('first@example.com', cls.plan)
+        cls.second = make_subscriber('second@example.com', cls.plan)
+        writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        Article.objects.create(title = 'Against the consensus', content = 'Body', user = writer)
+
+    def setUp(self):
+        cache.clear()
+        plan_registry.clear()
+
+    def get_feed(self, token: str, kind: str = 'atom'):
+        return self.client.get(reverse(f'article-feed-{kind}', args = [token]))
+
+    def test_cached_feed_does_not_leak_another_subscribers_token(self):
+        for kind in ('rss', 'atom'):
+            first_token, second_token = feed_token_for(self.first), feed_token_for(self.second)
+            self.assertContains(self.get_feed(first_token, kind), first_token)
+            response = self.get_feed(second_token, kind)
+            self.assertContains(response, second_token)
+            self.assertNotContains(response, first_token)
+
+    def test_rotated_token_is_revoked(self):
+        old_token = feed_token_for(self.first)
+        self.client.force_login(self.first)
+        self.client.post(reverse('reset-feed-token'))
+        self.first.refresh_from_db()
+        self.assertEqual(self.get_feed(old_token).status_code, 404)
+        self.assertEqual(self.get_feed(feed_token_for(self.first)).status_code, 200)
+
+    def test_token_signed_for_another_user_is_rejected(self):
+        user_id, _, signature = feed_token_for(self.first).partition(':')
+        self.assertEqual(self.get_feed(f'{self.second.pk}:{signature}').status_code, 404)
+
+
+class ArticleDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = make_subscriber('reader@example.com', make_plan('ST'))
+        cls.writer = CustomUser.objects.create_user(
+            'writer@example.com', 'passwd', is_writer = True, first_name = 'Jane', last_name = 'Doe',
+        )
+        cls.article = Article.objects.create(title = 'Against the consensus', content = 'Body', user = cls.writer)
+
+    def setUp(self):
+        cache.clear()
+        plan_registry.clear()
+        self.client.force_login(self.reader)
+
+    def get(self, **headers):
+        return self.client.get(reverse('article-detail', args = [self.article.id]), headers = headers)
+
+    def test_author_rename_changes_etag_and_body(self):
+        response = self.get()
+        self.assertContains(response, 'Written by Jane Doe')
+        self.assertEqual(self.get(if_none_match = response['ETag']).status_code, 304)
+
+        self.writer.last_name = 'Smith'
+        self.writer.save(update_fields = ['last_name'])
+        renamed = self.get(if_none_match = response['ETag'])
+        self.assertEqual(renamed.status_code, 200)
+        self.assertNotEqual(renamed['ETag'], response['ETag'])
+        self.assertContains(renamed, 'Written by Jane Smith')
+
+
+class ArticleApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.standard = make_subscriber('standard@example.com', make_plan('ST'))
+        cls.premium = make_subscriber('premium@example.com', make_plan('PR'))
+        cls.lapsed = make_subscriber('lapsed@example.com', make_plan('ST'))
+        Subscription.objects.filter(user = cls.lapsed).update(is_active = False)
+        cls.writer = CustomUser.objects.create_user(
+            'writer@example.com', 'passwd', is_writer = True, first_name = 'Jane', last_name = 'Doe',
+        )
+        cls.free = [
+            Article.objects.create(title = f'Free {i}', content = 'Body', user = cls.writer) for i in range(3)
+        ]
+        cls.paid = Article.objects.create(title = 'Paid', content = 'Secret', user = cls.writer, is_premium = True)
+
+    def setUp(self):
+        cache.clear()
+        plan_registry.clear()
+
+    def get(self, user, name = 'api-article-list', args = (), **params):
+        self.client.logout()
+        if user is not None:
+            self.client.force_login(user)
+        return self.client.get(reverse(name, args = args), params)
+
+    def ids(self, response) -> set[int]:
+        return {item['id'] for item in response.json()['results']}
+
+    def test_authentication_and_subscription_required(self):
+        self.assertEqual(self.get(None).status_code, 401)
+        self.assertEqual(self.get(self.writer).status_code, 403)
+        self.assertEqual(self.get(self.lapsed).status_code, 403)
+        self.assertEqual(self.get(None, 'api-article-detail', [self.paid.id]).status_code, 401)
+
+    def test_standard_subscribers_only_see_standard_articles(self):
+        self.assertEqual(self.ids(self.get(self.standard)), {a.id for a in self.free})
+        self.assertEqual(self.get(self.standard, 'api-article-detail', [self.paid.id]).status_code, 403)
+        self.assertEqual(self.get(self.standard, 'api-article-detail', [self.free[0].id]).status_code, 200)
+
+    def test_premium_subscribers_see_everything(self):
+        self.assertEqual(self.ids(self.get(self.premium)), {a.id for a in [*self.free, self.paid]})
+        response = self.get(self.premium, 'api-article-detail', [self.paid.id])
+        self.assertEqual(response.json()['content'], 'Secret')
+
+    def test_fields_selection(self):
+        response = self.get(self.standard, fields = 'title,author')
+        self.assertEqual(response.json()['results'][0], {'title': 'Free 2', 'author': 'Jane Doe'})
+        # The body is only served by the detail endpoint
+        self.assertEqual(self.get(self.standard, fields = 'content').status_code, 400)
+        self.assertEqual(self.get(self.standard, fields = 'title,bogus').status_code, 400)
+
+    def test_paging_with_cursors(self):
+        first = self.get(self.premium, limit = 3).json()
+        self.assertEqual(len(first['results']), 3)
+        self.assertIsNone(first['previous_cursor'])
+        rest = self.get(self.premium, limit = 3, after = first['next_cursor']).json()
+        self.assertEqual(len(rest['results']), 1)
+        self.assertIsNone(rest['next_cursor'])
+        self.assertEqual(self.get(self.premium, after = 'garbage').status_code, 400)
+        self.assertEqual(self.get(self.premium, limit = 'ten').status_code, 400)
+
+
+
+@override_settings(ENTITLEMENT_CLAIM_MAX_AGE = 300)
+class EntitlementClaimTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.plan = make_plan('PR')
+        cls.subscriber = make_subscriber('subscriber@example.com', cls.plan)
+        cls.other = CustomUser.objects.create_user('other@example.com', 'passwd')
+
+    def setUp(self):
+        plan_registry.clear()
+        # The plan registry loads outside the queries counted below
+        plan_registry.load()
+
+    def resolve(self, user: CustomUser, session: SessionStore):
+        """Resolves the entitlement for a new request; returns it and the Subscription queries run."""
+        request = RequestFactory().get('/')
+        request.session = session
+        request.user = request._cached_user = request._acached_user = user
+        with CaptureQueriesContext(connection) as queries:
+            entitlement = async_to_sync(entitlements.aget_entitlement)(request)
+        table = f'"{Subscription._meta.db_table}"'
+        return entitlement, sum(table in query['sql'] for query in queries)
+
+    def test_fresh_claim_needs_no_subscription_query(self):
+        session = SessionStore()
+        entitlement, queries = self.resolve(self.subscriber, session)
+        self.assertEqual((entitlement.tier, queries), ('premium', 1))
+        self.assertIn(entitlements.SESSION_KEY, session)
+        for _ in range(3):
+            entitlement, queries = self.resolve(self.subscriber, session)
+            self.assertEqual((entitlement.tier, queries), ('premium', 0))
+
+    def test_expired_claim_is_read_again(self):
+        session = SessionStore()
+        self.resolve(self.subscriber, session)
+        claim = session[entitlements.SESSION_KEY]
+        later = time.time() + 301
+        with mock.patch('django.core.signing.time.time', return_value = later):
+            entitlement, queries = self.resolve(self.subscriber, session)
+        self.assertEqual((entitlement.tier, queries), ('premium', 1))
+        self.assertNotEqual(session[entitlements.SESSION_KEY], claim)
+
+    def test_tampered_claim_is_read_again(self):
+        session = SessionStore()
+        self.resolve(self.subscriber, session)
+        Subscription.objects.filter(user = self.subscriber).update(is_active = False)
+        claim = session[entitlements.SESSION_KEY]
+        payload, _, signature = claim.rpartition(':')
+        session[entitlements.SESSION_KEY] = payload + ':' + signature[::-1]
+        entitlement, queries = self.resolve(self.subscriber, session)
+        self.assertEqual((entitlement.tier, queries), ('none', 1))
+
+    def test_claim_replayed_for_another_user_is_ignored(self):
+        session = SessionStore()
+        self.resolve(self.subscriber, session)
+        replayed = SessionStore()
+        replayed[entitlements.SESSION_KEY] = session[entitlements.SESSION_KEY]
+        entitlement, queries = self.resolve(self.other, replayed)
+        self.assertFalse(entitlement.has_subscription)
+        self.assertEqual(queries, 1)
+
+    def claimed(self) -> list:
+        """The claim signed into the test client's session: user, subscription, plan, active."""
+        return signing.loads(self.client.session[entitlements.SESSION_KEY], salt = entitlements.CLAIM_SALT)
+
+    def test_subscription_changes_drop_the_claim(self):
+        self.client.force_login(self.other)
+        self.client.get(reverse('client-dashboard'))
+        self.assertEqual(self.claimed(), [self.other.pk, None, '', False])
+
+        response = self.client.get(reverse('create-subscription', args = ['S-other', 'PR']))
+        self.assertRedirects(response, reverse('update-client'), fetch_redirect_response = False)
+        self.assertNotIn(entitlements.SESSION_KEY, self.client.session)
+        subscription = Subscription.objects.get(user = self.other)
+        self.client.get(reverse('client-dashboard'))
+        self.assertEqual(self.claimed(), [self.other.pk, subscription.id, 'PR', True])
+
+        paypal = mock.patch.multiple(
+            'client.views.sub_manager',
+            get_access_token = mock.AsyncMock(return_value = 'token'),
+            cancel_subscription = mock.AsyncMock(),
+        )
+        with paypal:
+            response = self.client.post(reverse('cancel-subscription', args = [subscription.id]))
+        self.assertRedirects(response, reverse('update-client'), fetch_redirect_response = False)
+        self.assertNotIn(entitlements.SESSION_KEY, self.client.session)
+        self.client.get(reverse('client-dashboard'))
+        self.assertEqual(self.claimed(), [self.other.pk, None, '', False])
+
+
+@override_settings(PLAN_REGISTRY_TTL = 900, PLAN_REGISTRY_MISS_RELOAD = 10)
+class PlanRegistryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.standard = make_plan('ST')
+        cls.premium = make_plan('PR')
+
+    def setUp(self):
+        self.registry = type(plan_registry)()
+        self.now = 1000.0
+        clock = mock.patch('client.plans.time.monotonic', lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_lookups_are_served_from_memory(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.registry.get('ST'), self.standard)
+            self.assertEqual(self.registry.get_by_id(self.premium.id), self.premium)
+            self.assertIs(async_to_sync(self.registry.aget)('PR'), self.registry.get('PR'))
+            self.assertIn(self.standard, self.registry.active())
+
+    def test_inactive_plans_are_found_but_not_listed(self):
+        self.premium.is_active = False
+        self.premium.save()
+        self.assertEqual(self.registry.get('PR'), self.premium)
+        self.assertNotIn(self.premium, self.registry.active())
+
+    def test_reloads_after_the_ttl(self):
+        self.registry.get('ST')
+        PlanChoice.objects.filter(id = self.standard.id).update(name = 'Renamed')
+        self.now += 899
+        self.assertNotEqual(self.registry.get('ST').name, 'Renamed')
+        self.now += 1
+        self.assertEqual(self.registry.get('ST').name, 'Renamed')
+
+    def test_unknown_codes_reload_at_most_once_per_interval(self):
+        self.registry.get('ST')
+        with self.assertNumQueries(0):
+            for code in ('XX', 'YY', 'ZZ'):
+                with self.assertRaises(PlanChoice.DoesNotExist):
+                    async_to_sync(self.registry.aget)(code)
+            self.now += 9
+            with self.assertRaises(PlanChoice.DoesNotExist):
+                self.registry.get('XX')
+        # A plan added by another process is found once the interval is up
+        make_plan('XX')
+        self.now += 1
+        with self.assertNumQueries(1):
+            self.assertEqual(self.registry.get('XX').plan_code, 'XX')
+            self.registry.get('XX')
+
+    def test_plan_changes_clear_the_registry(self):
+        self.assertEqual(plan_registry.get('ST').name, self.standard.name)
+        self.addCleanup(plan_registry.clear)
+        with self.captureOnCommitCallbacks(execute = True):
+            self.standard.name = 'Renamed'
+            self.standard.save()
+        self.assertEqual(plan_registry.get('ST').name, 'Renamed')
+        with self.captureOnCommitCallbacks(execute = True):
+            self.premium.delete()
+        with self.assertRaises(PlanChoice.DoesNotExist):
+            plan_registry.get('PR')
+
+
+class BrowseArticlesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = make_subscriber('reader@example.com', make_plan('ST'))
+        writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        Article.objects.create(title = 'Against the consensus', content = 'Contrarian body', user = writer)
+
+    def setUp(self):
+        cache.clear()
+        plan_registry.clear()
+        feed_cache.clear()
+        self.async_client.force_login(self.reader)
+
+    def test_list_pages_do_not_load_the_content(self):
+        async def get(params: dict) -> str:
+            response = await self.async_client.get(reverse('browse-articles'), params)
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        # Building the search index reads every body; the results page must not
+        index = SearchIndex()
+        index.load()
+        self.enterContext(mock.patch('client.views.search_index', index))
+        column = f'"{Article._meta.db_table}"."content"'
+        for params in ({}, {'q': 'consensus'}):
+            with self.subTest(**params):
+                # Sync, so the queries stay on this thread's connection
+                with CaptureQueriesContext(connection) as queries:
+                    html = async_to_sync(get)(params)
+                self.assertIn('Against the consensus', html)
+                self.assertIn('Contrarian body', html)
+                article_reads = [
+                    query['sql'] for query in queries
+                    if query['sql'].startswith('SELECT') and f'"{Article._meta.db_table}"' in query['sql']
+                ]
+                self.assertTrue(article_reads)
+                self.assertFalse([sql for sql in article_reads if column in sql])
+
+
+# browse-articles.html's article loop before the cards moved to a partial
+INLINE_ARTICLE_LOOP = """{% load i18n %}
+        {% for article in articles %}
+        <div class="container bg-white shadow p-5 mt-5 form-layout-article {% if article.is_premium %}premium-article{% endif %}">
+            <h3>{{ article.title }}</h3>
+            <p>
+                <strong>
+                    {% if article.is_premium %}
+                        <span class="text-article-premium">🌟 {% translate 'Premium Article' %}</span>
+                    {% else %}
+                        🗑️ {% translate 'Standard Article' %}
+                    {% endif %}
+                </strong>
+            </p>
+            <p>{{ article.excerpt }}</p>
+            <a href="{% url 'article-detail' article.id %}">{% translate 'Read article' %} &raquo;</a>
+            <hr>
+            <div class="d-flex justify-content-between align-items-center no-wrap">
+                <em>{{ article.date_posted }}</em>
+                <em>Written by {{ article.user.first_name }} {{ article.user.last_name }}</em>
+            </div>
+            </div>
+        {% endfor %}
+"""
+
+
+class ArticleCardTests(TestCase):
+    def test_card_partial_matches_the_inline_loop(self):
+        writer = CustomUser.objects.create_user(
+            'writer@example.com', 'passwd', is_writer = True, first_name = 'Jane', last_name = 'Doe',
+        )
+        Article.objects.create(title = 'Free <b>', content = 'Body & more', user = writer)
+        Article.objects.create(title = 'Paid', content = 'Secret', user = writer, is_premium = True)
+        articles = list(Article.objects.listing().newest_first())
+        inline = Template(INLINE_ARTICLE_LOOP).render(Context({'articles': articles}))
+        cards = ''.join(render_to_string('client/_article-card.html', {'article': a}) for a in articles)
+        self.assertEqual(cards.split(), inline.split())
@@ -1,9 +1,13 @@
 from django.urls import path
-from . import views
+from . import views, feeds
 
 urlpatterns = [
     path('dashboard/', views.dashboard, name='client-dashboard'),
     path('browse-articles/', views.browse_articles, name='browse-articles'),
+    path('article/<int:id>', views.article_detail, name='article-detail'),
+    path('feeds/reset/', views.reset_feed_token, name='reset-feed-token'),
+    path('feeds/<str:token>/rss.xml', feeds.article_feed, {'kind': 'rss'}, name='article-feed-rss'),
+    path('feeds/<str:token>/atom.xml', feeds.article_feed, {'kind': 'atom'}, name='article-feed-atom'),
     path('subscribe-plan/', views.subscribe_plan, name='subscribe-plan'),
     path('update-user/', views.update_user, name='update-client'),
     path('update-password/', views.update_password, name='update-password-client'),
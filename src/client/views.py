@@ -1,75 +1,132 @@
+from django.conf import settings
 from django.shortcuts import redirect, render
-from django.http import HttpResponse, HttpRequest
+from django.http import HttpResponse, HttpRequest, HttpResponseForbidden, Http404
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib import messages
 from django.utils.translation import gettext as _
-from django.contrib.auth import update_session_auth_hash
-from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
 
 from .models import Subscription, PlanChoice
 from writer.models import Article
-from common.django_utils import arender, add_message, alogout
-from common.auth import aclient_required, ensure_for_current_user # type: ignore
+from writer.feed_cache import feed_cache
+from writer.search import search_index
+from common.django_utils import arender, astream_render, add_message, alogout, aupdate_session_auth_hash
+from common.pagination import InvalidCursor
+from common.auth import aclient_required, aprofile_owner_required # type: ignore
 from common.auth import aget_user
 from . import paypal as sub_manager
+from .plans import plan_registry
+from .entitlements import aget_entitlement, aforget_entitlement
+from .article_cache import AUTHOR_FIELDS, aget_article_body, article_etag
+from .feeds import arotate_feed_token, feed_token_for
 from .forms import UpdateUserForm
 from common.forms import CustomPasswordChangeForm
 
-# Criar uma versão assíncrona da função update_session_auth_hash
-async_update_session_auth_hash = sync_to_async(update_session_auth_hash)
-
 @aclient_required
 async def dashboard(request: HttpRequest) -> HttpResponse:
     user = await aget_user(request)
+    entitlement = await aget_entitlement(request)
     subscription_plan = 'No subscription yet'
-    if subscription := await Subscription.afor_user(user):
-        subscription_plan = 'premium' if await subscription.ais_premium() else 'standard'
-        if not subscription.is_active:
+    if entitlement.has_subscription:
+        subscription_plan = 'premium' if entitlement.is_premium_plan else 'standard'
+        if not entitlement.is_active:
             subscription_plan += ' (inactive)'
-    try:
-        subscription = await Subscription.objects.aget(user = user, is_active = True)
-        has_subscription = True
-        subscription_name = (await subscription.aplan_choice()).name
-    except ObjectDoesNotExist:
-        has_subscription = False
-        subscription_name = 'No subscription yet'
 
     context = {
-        'has_subscription': has_subscription,
+        'has_subscription': entitlement.is_active,
         'subscription_plan': subscription_plan,
-        'subscription_name': subscription_name
+        'subscription_name': entitlement.plan_name('No subscription yet'),
+        'feed_token': feed_token_for(user) if entitlement.is_active else None,
     }
     return await arender(request, 'client/dashboard.html', context)
 
+@aclient_required
+async def reset_feed_token(request: HttpRequest) -> HttpResponse:
+    """Revokes the user's feed URLs and hands out new ones."""
+    if request.method == 'POST':
+        await arotate_feed_token(await aget_user(request))
+        await add_message(request, messages.INFO, _('Your feed links have been reset'))
+    return redirect('client-dashboard')
+
 @aclient_required
 async def browse_articles(request: HttpRequest) -> HttpResponse:
+    entitlement = await aget_entitlement(request)
+    query = request.GET.get('q', '').strip()
+    page = None
+    articles = []
+    if entitlement.is_active:
+        include_premium = entitlement.include_premium
+        if query:
+            found_ids = await search_index.asearch(query, include_premium, settings.SEARCH_MAX_RESULTS)
+            found = await Article.objects.listing().ain_bulk(found_ids)
+            articles = [found[i] for i in found_ids if i in found]
+        else:
+            try:
+                page = await feed_cache.aget_page(
+                    include_premium,
+                    settings.ARTICLES_PER_PAGE,
+                    after = request.GET.get('after'),
+                    before = request.GET.get('before'),
+                )
+            except InvalidCursor:
+                page = await feed_cache.aget_page(include_premium, settings.ARTICLES_PER_PAGE)
+            articles = page.items
+
+    context = {
+        'has_subscription': entitlement.is_active,
+        'articles': articles,
+        'page': page,
+        'query': query,
+        'subscription_plan': entitlement.tier,
+    }
+    return await astream_render(
+        request, 'client/browse-articles.html', context,
+        items = articles, item_template = 'client/_article-card.html', item_name = 'article',
+    )
+
+@aclient_required
+async def article_detail(request: HttpRequest, id: int) -> HttpResponse:
     user = await aget_user(request)
+    entitlement = await aget_entitlement(request)
+    if not entitlement.is_active:
+        return redirect('subscribe-plan')
     try:
-        subscription = await Subscription.objects.aget(user = user, is_active = True)
-        has_subscription = True
-        subscription_plan = 'premium' if await subscription.ais_premium() else 'standard'
-        if not await subscription.ais_premium():
-            articles = Article.objects.filter(is_premium = False).select_related('user')
-        else:
-            articles = Article.objects.all().select_related('user')
+        # Only what the entitlement and freshness checks need; the body is
+        # read (and rendered) only when the cached copy is missing
+        article = await (
+            Article.objects.select_related('user')
+            .only('id', 'is_premium', 'date_updated', *AUTHOR_FIELDS)
+            .aget(id = id)
+        )
     except ObjectDoesNotExist:
-        has_subscription = False
-        subscription_plan = 'none'
-        articles = []
+        raise Http404(_('Article not found'))
+    if article.is_premium and not entitlement.include_premium:
+        return HttpResponseForbidden(_('This article is only available to premium subscribers'))
+
+    subscription_plan = entitlement.tier
+    etag = article_etag(article, user.pk, user.first_name, subscription_plan)
+    last_modified = int(article.date_updated.timestamp())
+    if response := get_conditional_response(request, etag = etag, last_modified = last_modified):
+        return response
 
     context = {
-        'has_subscription': has_subscription, 
-        'articles': articles,
+        'article': article,
+        'article_body': mark_safe(await aget_article_body(article)),
         'subscription_plan': subscription_plan,
     }
-    return await arender(request, 'client/browse-articles.html', context)
+    response = await arender(request, 'client/article-detail.html', context)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private = True, no_cache = True)
+    return response
 
 @aclient_required
 async def subscribe_plan(request: HttpRequest) -> HttpResponse:
-    user = await aget_user(request)
-    if await Subscription.afor_user(user):
+    if (await aget_entitlement(request)).has_subscription:
         return redirect('client-dashboard')
-    context = {'plan_choices': PlanChoice.objects.filter(is_active = True)}
+    context = {'plan_choices': await plan_registry.aactive()}
     return await arender(request, 'client/subscribe-plan.html', context)
 
 @aclient_required
@@ -90,22 +147,13 @@ async def update_user(request: HttpRequest) -> HttpResponse:
             # Adiciona mensagem de erro usando a função auxiliar
             await add_message(request, messages.ERROR, _('Error updating user information'))
             form = UpdateUserForm(instance = user)
-    try:
-        subscription = await Subscription.objects.aget(user = user, is_active = True)
-        has_subscription = True
-        subscription_plan = 'premium' if await subscription.ais_premium() else 'standard'
-        subscription_name = (await subscription.aplan_choice()).name
-    except ObjectDoesNotExist:
-        subscription = None
-        has_subscription = False
-        subscription_plan = 'none'
-        subscription_name = 'No subscription yet'
+    entitlement = await aget_entitlement(request)
 
     context = {
-        'has_subscription': has_subscription,
-        'subscription_plan': subscription_plan,
-        'subscription_name': subscription_name,
-        'subscription': subscription,
+        'has_subscription': entitlement.is_active,
+        'subscription_plan': entitlement.tier,
+        'subscription_name': entitlement.plan_name('No subscription yet'),
+        'subscription_id': entitlement.subscription_id if entitlement.is_active else None,
         'update_user_form': form,
     }
     return await arender(request, 'client/update-user.html', context)
@@ -118,7 +166,7 @@ async def create_subscription(
 ) -> HttpResponse:
     user = await aget_user(request)
 
-    if await Subscription.afor_user(user):
+    if (await aget_entitlement(request)).has_subscription:
         return redirect('client-dashboard')
 
     plan_choice = await PlanChoice.afrom_plan_code(plan_code)
@@ -129,6 +177,7 @@ async def create_subscription(
         is_active = True,
         user = user,
     )
+    await aforget_entitlement(request)
 
     # Adicionar mensagem de sucesso
     await add_message(request, messages.SUCCESS, _('Your subscription has been successfully activated'))
@@ -137,8 +186,7 @@ async def create_subscription(
     return redirect('update-client')
 
 
-@aclient_required
-@ensure_for_current_user(Subscription, redirect_if_missing = 'client-dashboard')
+@aprofile_owner_required('client', Subscription, redirect_if_missing = 'client-dashboard')
 async def cancel_subscription(request: HttpRequest, id: int) -> HttpResponse:
     subscription = id
 
@@ -150,6 +198,7 @@ async def cancel_subscription(request: HttpRequest, id: int) -> HttpResponse:
 
         # Update the subscription in the database
         await subscription.adelete()
+        await aforget_entitlement(request)
         
         # Adicionar mensagem de informação
         await add_message(request, messages.INFO, _('Your subscription has been successfully canceled'))
@@ -157,24 +206,20 @@ async def cancel_subscription(request: HttpRequest, id: int) -> HttpResponse:
         # Redirecionar para a página de atualização do usuário
         return redirect('update-client')
 
-    context = {'subscription_plan': (await subscription.aplan_choice()).name}
+    context = {'subscription_plan': (await aget_entitlement(request)).plan.name} # type: ignore
     return await arender(request, 'client/cancel-subscription.html', context)
 
 
 @aclient_required
 async def delete_account(request: HttpRequest) -> HttpResponse:
     current_user = await aget_user(request)
-    try:
-        subscription = await Subscription.objects.aget(user=current_user, is_active=True)
-        subscription_plan_name = (await subscription.aplan_choice()).name
-    except ObjectDoesNotExist:
-        subscription = None
-        subscription_plan_name = "No subscription"
+    entitlement = await aget_entitlement(request)
+    subscription_plan_name = entitlement.plan_name("No subscription")
     
     if request.method == 'POST':
         # Verificar se o usuário tem uma assinatura ativa
         try:
-            if subscription:
+            if entitlement.is_active and (subscription := await entitlement.asubscription()):
                 # Cancelar a assinatura no PayPal primeiro
                 access_token = await sub_manager.get_access_token()
                 sub_id = subscription.external_subscription_id
@@ -247,25 +292,20 @@ async def delete_account(request: HttpRequest) -> HttpResponse:
                 await add_message(request, messages.ERROR, _('Error deleting account. Please contact support.'))
                 # Continua para mostrar a página delete-account novamente
         
-    context = {'user': current_user, 'subscription_plan': subscription_plan_name if subscription else "No subscription"}
+    context = {'user': current_user, 'subscription_plan': subscription_plan_name}
     return await arender(request, 'client/delete-account.html', context)
 
 @aclient_required
 async def update_password(request: HttpRequest) -> HttpResponse:
     user = await aget_user(request)
-    
-    try:
-        subscription = await Subscription.objects.aget(user=user, is_active=True)
-        subscription_plan = (await subscription.aplan_choice()).name
-    except ObjectDoesNotExist:
-        subscription_plan = "No subscription"
+    subscription_plan = (await aget_entitlement(request)).plan_name("No subscription")
 
     if request.method == 'POST':
         form = CustomPasswordChangeForm(user, request.POST)
         if await form.ais_valid():
             user = await form.asave()
             # Usar a versão assíncrona da função
-            await async_update_session_auth_hash(request, user)
+            await aupdate_session_auth_hash(request, user)
             
             # Adiciona mensagem de sucesso
             await add_message(request, messages.SUCCESS, _('Your password has been updated successfully'))
@@ -0,0 +1,62 @@
+"""
+ASGI lifespan support for the Django application.
+
+Django's ASGIHandler ignores lifespan events, so a worker starts taking
+requests cold: the first ones import views, compile templates, read the
+plan table and connect to the database. `LifespanApplication` wraps it
+and, when the server announces startup, runs `common.warmup.warm_up` on
+the sync thread before the server starts accepting connections. On
+shutdown it drains the executor pools and closes the connection pools
+of common.db.pool (idle connections right away, lent ones as they are
+given back). Connections outside a pool belong to the thread that opened
+them, so only the shutdown thread's own are closed here; request and
+executor threads close theirs as Django always does, at the end of each
+request or job (or when CONN_MAX_AGE runs out).
+
+Servers that don't speak lifespan (or run with it off) simply never send
+the events; requests are passed through untouched either way.
+"""
+
+__all__ = (
+    'LifespanApplication',
+)
+
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+from .db.pool import close_pools
+from .executors import executors
+from .warmup import warm_up
+
+logger = logging.getLogger(__name__)
+
+
+def _shutdown():
+    executors.shutdown(wait = True)
+    # This thread's connections only (the warm-up's, say)
+    connections.close_all()
+    close_pools()
+
+
+class LifespanApplication:
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'lifespan':
+            return await self.application(scope, receive, send)
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Steps that fail are logged inside warm_up; the worker starts anyway
+                await sync_to_async(warm_up)()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                try:
+                    await sync_to_async(_shutdown)()
+                except Exception:
+                    logger.exception('Error while shutting down')
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -2,10 +2,11 @@ from functools import wraps
 
 
 from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
-from django.contrib.auth.decorators import login_required
-from django.contrib.auth import aget_user # type: ignore
+from django.contrib import auth
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.views import redirect_to_login
 from django.core.exceptions import ObjectDoesNotExist
-from django.shortcuts import redirect
+from django.shortcuts import redirect, resolve_url
 from django.urls import reverse
 from django.urls import reverse_lazy
 
@@ -13,10 +14,15 @@ from account.models import CustomUser
 from common.django_utils import AsyncViewT
 
 __all__ = [
+    'aget_user',
+    'alogin',
+    'alogout',
+    'logout',
     'aclient_required',
     'awriter_required',
     'aanonymous_required',
     'aprofile_required',
+    'aprofile_owner_required',
     'ensure_for_current_user',
 ]
 
@@ -25,28 +31,73 @@ USER_PROFILES = {
     'writer': lambda user: user.is_writer,
 }
 
+async def aget_user(request: HttpRequest) -> CustomUser | AnonymousUser:
+    """
+    The request's user, loaded at most once per request. The instance is
+    shared with `request.user` and `request.auser()` (same cache attributes
+    as Django's AuthenticationMiddleware), so stacked decorators, the view
+    and the templates all reuse one load.
+    """
+    if hasattr(request, '_acached_user'):
+        return request._acached_user # type: ignore
+    if hasattr(request, '_cached_user'):
+        user = request._cached_user # type: ignore
+    else:
+        user = await auth.aget_user(request)
+        request._cached_user = user # type: ignore
+    request._acached_user = user # type: ignore
+    return user
+
+def _remember_user(request: HttpRequest, user: CustomUser | AnonymousUser):
+    request.user = request._cached_user = request._acached_user = user # type: ignore
+
+async def alogin(request: HttpRequest, user: CustomUser, backend: str | None = None):
+    """`django.contrib.auth.alogin`, after which `aget_user` returns `user`."""
+    await auth.alogin(request, user, backend)
+    _remember_user(request, user)
+
+async def alogout(request: HttpRequest):
+    """
+    `django.contrib.auth.alogout`. Django only replaces `request.user`, so
+    without this the rest of the request would still get the logged-out
+    user from `aget_user` (and `request.auser()`).
+    """
+    await auth.alogout(request)
+    _remember_user(request, AnonymousUser())
+
+def logout(request: HttpRequest):
+    """`django.contrib.auth.logout`, like `alogout`."""
+    auth.logout(request)
+    _remember_user(request, AnonymousUser())
+
+def _redirect_to_login(request: HttpRequest, login_url: str) -> HttpResponse:
+    return redirect_to_login(request.get_full_path(), resolve_url(login_url))
+
 def aclient_required(client_view: AsyncViewT):
-    @login_required(login_url='login') # type: ignore
     @wraps(client_view)
     async def fun(request: HttpRequest, *args, **kwargs) -> HttpResponse:
         user = await aget_user(request)
-        if user.is_authenticated and not user.is_writer:
+        if not user.is_authenticated:
+            return _redirect_to_login(request, 'login')
+        if not user.is_writer:
             return await client_view(request, *args, **kwargs)
         return HttpResponseForbidden("You are not authorized to access this page")
     return fun
 
 def awriter_required(writer_view: AsyncViewT):
-    @login_required(login_url='login') # type: ignore
     @wraps(writer_view)
     async def fun(request: HttpRequest, *args, **kwargs) -> HttpResponse:
         user = await aget_user(request)
-        if user.is_authenticated and user.is_writer:
+        if not user.is_authenticated:
+            return _redirect_to_login(request, 'login')
+        if user.is_writer:
             return await writer_view(request, *args, **kwargs)
         return HttpResponseForbidden("You are not authorized to access this page")
     return fun
 
 def ensure_for_current_user(model: type, *, id_in_url: str = 'id', redirect_if_missing: str):
     def decorator(view: AsyncViewT):
+        @wraps(view)
         async def async_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
             obj_id = kwargs[id_in_url]
             current_user = await aget_user(request)
@@ -78,12 +129,45 @@ def aprofile_required(profile: str, login_url: str = 'login'):
         raise ValueError(f"Unknown profile: {profile}")
     is_of_profile = USER_PROFILES[profile]
     def decorator(original_view: AsyncViewT):
-        @login_required(login_url=login_url) # type: ignore
         @wraps(original_view)
         async def decorated_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
-            user: CustomUser = await aget_user(request)
-            if user.is_authenticated and is_of_profile(user):
+            user = await aget_user(request)
+            if not user.is_authenticated:
+                return _redirect_to_login(request, login_url)
+            if is_of_profile(user):
                 return await original_view(request, *args, **kwargs)
             return HttpResponseForbidden(f"Only members of '{profile}' can access this page")
         return decorated_view
+    return decorator
+
+def aprofile_owner_required(
+    profile: str,
+    model: type,
+    *,
+    id_in_url: str = 'id',
+    redirect_if_missing: str,
+    login_url: str = 'login',
+):
+    """
+    `aprofile_required` and `ensure_for_current_user` in one: one user
+    load, one ownership query, and the view gets the owned object in place
+    of its id.
+    """
+    if profile not in USER_PROFILES:
+        raise ValueError(f"Unknown profile: {profile}")
+    is_of_profile = USER_PROFILES[profile]
+    def decorator(original_view: AsyncViewT):
+        @wraps(original_view)
+        async def decorated_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            user = await aget_user(request)
+            if not user.is_authenticated:
+                return _redirect_to_login(request, login_url)
+            if not is_of_profile(user):
+                return HttpResponseForbidden(f"Only members of '{profile}' can access this page")
+            try:
+                obj = await model.objects.aget(id = kwargs.pop(id_in_url), user = user)
+            except ObjectDoesNotExist:
+                return redirect(redirect_if_missing)
+            return await original_view(request, obj, *args, **kwargs)
+        return decorated_view
     return decorator
\ No newline at end of file
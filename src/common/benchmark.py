@@ -0,0 +1,99 @@
+"""
+Small helpers shared by the `bench_*` management commands.
+
+Benchmarks run against a throwaway test database (created and dropped the
+same way the test runner does it), so they never touch real data and can
+seed whatever volume they need.
+"""
+
+__all__ = (
+    'Timing',
+    'benchmark_database',
+    'measure',
+    'read_body',
+)
+
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.http import HttpResponseBase
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@dataclass
+class Timing:
+    label: str
+    samples: list[float] = field(default_factory = list)
+    response_bytes: int = 0
+    # Wall-clock time of the whole run, for samples taken concurrently
+    wall_seconds: float = 0.0
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+        return ordered[index]
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.samples)
+
+    @property
+    def per_second(self) -> float:
+        return len(self.samples) / (self.wall_seconds or sum(self.samples))
+
+    def summary(self) -> str:
+        ms = lambda seconds: f'{seconds * 1000:8.2f}ms'
+        line = (
+            f'{self.label:<32} n={len(self.samples):<5} mean={ms(self.mean)} '
+            f'p50={ms(self.percentile(50))} p99={ms(self.percentile(99))} '
+            f'{self.per_second:9.1f}/s'
+        )
+        if self.response_bytes:
+            line += f' {self.response_bytes:>8} bytes'
+        return line
+
+
+@contextmanager
+def benchmark_database(verbosity: int = 0):
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity = verbosity, autoclobber = True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity = verbosity)
+        teardown_test_environment()
+
+
+def measure(label: str, call: Callable[[], object], repeat: int, warmup: int = 5) -> Timing:
+    """
+    Times `repeat` calls of `call`. Calls that return a body (see
+    `read_body`) also get its size reported.
+    """
+    for _ in range(warmup):
+        call()
+    timing = Timing(label)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        timing.samples.append(time.perf_counter() - started)
+    if isinstance(result, bytes):
+        timing.response_bytes = len(result)
+    return timing
+
+
+def read_body(response: HttpResponseBase) -> bytes:
+    """The full body of a regular or (sync or async) streaming response."""
+    if not response.streaming:
+        return response.content # type: ignore
+
+    async def collect() -> bytes:
+        return b''.join([chunk async for chunk in response.streaming_content]) # type: ignore
+
+    if response.is_async: # type: ignore
+        return async_to_sync(collect)()
+    return b''.join(response.streaming_content) # type: ignore
@@ -0,0 +1,97 @@
+"""
+MySQL backend (over PyMySQL) whose connections come from a pool shared
+by every thread of the process (see common.db.pool).
+
+Enabled per database with a 'pool' entry in OPTIONS, like Django's own
+PostgreSQL pool:
+
+    'ENGINE': 'common.db.mysql',
+    'OPTIONS': {'pool': {'min_size': 1, 'max_size': 10, 'recycle': 1800,
+                         'health_check_after': 30, 'timeout': 5}},
+    'CONN_MAX_AGE': 0,
+
+`connect()` borrows a connection and `close()` gives it back, so
+CONN_MAX_AGE must be 0: a thread returns its connection at the end of
+each request or executor job, where Django would otherwise close it.
+Without 'pool' the backend behaves like django.db.backends.mysql.
+"""
+
+import pymysql
+
+# django.db.backends.mysql imports MySQLdb
+pymysql.install_as_MySQLdb()
+
+from django.core.exceptions import ImproperlyConfigured  # noqa: E402
+from django.db.backends.mysql import base as mysql_base  # noqa: E402
+from django.db.backends.mysql.base import Database  # noqa: E402
+from django.utils.asyncio import async_unsafe  # noqa: E402
+
+from ..pool import ConnectionPool, PoolTimeout, get_pool  # noqa: E402
+
+
+def _connect(conn_params: dict):
+    connection = Database.connect(**conn_params)
+    # Same workaround as django.db.backends.mysql's get_new_connection
+    if connection.encoders.get(bytes) is bytes:
+        connection.encoders.pop(bytes)
+    return connection
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.pool_options is not None and self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured(
+                f"Database '{self.alias}' uses a connection pool: set CONN_MAX_AGE to 0."
+            )
+        # The pool the current connection was borrowed from
+        self._connection_pool: ConnectionPool | None = None
+
+    @property
+    def pool_options(self) -> dict | None:
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if options is True:
+            return {}
+        return options or None
+
+    @property
+    def pool(self) -> ConnectionPool | None:
+        options = self.pool_options
+        if options is None:
+            return None
+        conn_params = self.get_connection_params()
+        return get_pool(
+            self.alias, repr(sorted(conn_params.items())),
+            lambda: ConnectionPool(lambda: _connect(conn_params), name = self.alias, **options),
+        )
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as e:
+            raise Database.OperationalError(str(e)) from e
+        self._connection_pool = pool
+        return connection
+
+    def _close(self):
+        pool, self._connection_pool = self._connection_pool, None
+        if pool is None or self.connection is None:
+            return super()._close()
+        # Hand back only connections in a known state: autocommit on, no
+        # transaction left open, no error since the last commit/rollback
+        discard = (
+            self.in_atomic_block
+            or self.errors_occurred
+            or self.autocommit != self.settings_dict['AUTOCOMMIT']
+        )
+        with self.wrap_database_errors:
+            pool.release(self.connection, discard = discard)
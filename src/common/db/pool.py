@@ -0,0 +1,283 @@
+"""
+A thread-safe pool of DB-API connections.
+
+Django keeps one connection per thread: under ASGI every request thread
+and every executor pool thread opens its own, and with CONN_MAX_AGE each
+one stays open (or is reopened, with a TCP and auth handshake) on its
+own schedule. A `ConnectionPool` is shared by all the threads of a
+process instead: a thread borrows a connection for as long as Django
+would have kept it open (a request, an executor job) and gives it back.
+
+- `min_size` connections are opened up front (on first use, or by the
+  'database' warm-up step) and kept;
+- at most `max_size` are open at once; when all of them are lent out a
+  borrower waits up to `timeout` seconds, then gets `PoolTimeout`;
+- a connection idle for `health_check_after` seconds is pinged before
+  it's lent out, and replaced if the ping fails;
+- a connection older than `recycle` seconds is closed instead of reused
+  (keep it below the server's wait_timeout).
+
+The driver is only seen through `connect()` and the connections' `ping`
+and `close` methods, so tests can use a fake one.
+
+`get_pool` keeps one pool per database alias and connection parameters.
+"""
+
+__all__ = (
+    'PoolTimeout',
+    'ConnectionPool',
+    'get_pool',
+    'pool_stats',
+    'close_pools',
+)
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+@dataclass
+class _Entry:
+    connection: Any
+    created_at: float
+    released_at: float
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 0,
+        max_size: int = 10,
+        recycle: float = 1800,
+        health_check_after: float = 30,
+        timeout: float = 5,
+        name: str = 'default',
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f'Invalid pool size: min_size={min_size}, max_size={max_size}')
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.recycle = recycle
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self.name = name
+        self.clock = clock
+        self._cond = threading.Condition()
+        # Last in, first out: the most recently used connections are the
+        # ones least likely to have been dropped by the server
+        self._idle: deque[_Entry] = deque()
+        self._lent: dict[int, _Entry] = {}
+        # Open connections, lent or idle, plus the ones being opened
+        self._size = 0
+        self._filled = False
+        self._closed = False
+        self._opened = 0
+        self._discarded = 0
+        self._recycled = 0
+        self._health_failures = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self) -> Any:
+        """Lends a connection, waiting up to `timeout` seconds for one."""
+        if not self._filled:
+            self.fill()
+        started = self.clock()
+        waited = False
+        while True:
+            stale = []
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout(f"'{self.name}' connection pool is closed")
+                    while self._idle:
+                        candidate = self._idle.pop()
+                        if self._expired(candidate):
+                            stale.append(candidate)
+                            self._size -= 1
+                            self._recycled += 1
+                        else:
+                            entry = candidate
+                            break
+                    if entry is not None or self._size < self.max_size:
+                        break
+                    remaining = started + self.timeout - self.clock()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._close_all(stale)
+                        raise PoolTimeout(
+                            f"No connection available in '{self.name}' pool after {self.timeout}s "
+                            f'({self.max_size} in use)'
+                        )
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    self._cond.wait(remaining)
+                if entry is None:
+                    # Reserve the slot; the handshake happens outside the lock
+                    self._size += 1
+            self._close_all(stale)
+            if entry is None:
+                entry = self._open()
+            elif not self._healthy(entry):
+                continue
+            with self._cond:
+                self._lent[id(entry.connection)] = entry
+                self._checkouts += 1
+                if waited:
+                    wait = self.clock() - started
+                    self._wait_total += wait
+                    self._wait_max = max(self._wait_max, wait)
+            return entry.connection
+
+    def release(self, connection: Any, discard: bool = False):
+        """
+        Takes back a connection lent by `acquire`. One in an unknown state
+        (an open transaction, a failed query) should be discarded instead.
+        """
+        with self._cond:
+            entry = self._lent.pop(id(connection), None)
+            if entry is None:
+                raise ValueError(f"Connection wasn't lent by '{self.name}' pool")
+            expired = self._expired(entry)
+            if not (discard or expired or self._closed):
+                entry.released_at = self.clock()
+                self._idle.append(entry)
+                self._cond.notify()
+                return
+            self._size -= 1
+            self._discarded += discard
+            self._recycled += expired and not discard
+            self._cond.notify()
+        self._close_all([entry])
+
+    def fill(self):
+        """Opens connections until `min_size` are open."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    # Not before: if the server is down, the next acquire tries again
+                    self._filled = True
+                    return
+                self._size += 1
+            entry = self._open()
+            with self._cond:
+                self._idle.appendleft(entry)
+                self._cond.notify()
+
+    def close(self):
+        """Closes the idle connections; lent ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def stats(self) -> dict:
+        with self._cond:
+            waited = self._waits - self._timeouts
+            return {
+                'name': self.name,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._lent),
+                'checkouts': self._checkouts,
+                'opened': self._opened,
+                'discarded': self._discarded,
+                'recycled': self._recycled,
+                'health_failures': self._health_failures,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'avg_wait_ms': 1000 * self._wait_total / waited if waited > 0 else 0.0,
+                'max_wait_ms': 1000 * self._wait_max,
+            }
+
+    def _open(self) -> _Entry:
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        now = self.clock()
+        with self._cond:
+            self._opened += 1
+        return _Entry(connection, now, now)
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.clock() - entry.created_at >= self.recycle
+
+    def _healthy(self, entry: _Entry) -> bool:
+        if self.clock() - entry.released_at < self.health_check_after:
+            return True
+        try:
+            entry.connection.ping(reconnect = False)
+            return True
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._health_failures += 1
+                self._cond.notify()
+            self._close_all([entry])
+            return False
+
+    @staticmethod
+    def _close_all(entries: list[_Entry]):
+        for entry in entries:
+            try:
+                entry.connection.close()
+            except Exception:
+                # Already broken or closed by the server; nothing to give back
+                pass
+
+
+_pools_lock = threading.Lock()
+_pools: dict[str, tuple[str, ConnectionPool]] = {}
+
+
+def get_pool(alias: str, key: str, factory: Callable[[], ConnectionPool]) -> ConnectionPool:
+    """
+    The pool of database `alias`. `key` identifies its connection
+    parameters: when they change (the test runner renames the database,
+    say) the old pool is closed and `factory` builds a new one.
+    """
+    with _pools_lock:
+        current = _pools.get(alias)
+        if current is not None and current[0] == key:
+            return current[1]
+        pool = factory()
+        _pools[alias] = (key, pool)
+    if current is not None:
+        current[1].close()
+    return pool
+
+
+def pool_stats() -> list[dict]:
+    with _pools_lock:
+        pools = [pool for _, pool in _pools.values()]
+    return [pool.stats() for pool in pools]
+
+
+def close_pools():
+    with _pools_lock:
+        pools = [pool for _, pool in _pools.values()]
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -8,20 +8,29 @@ __all__ = (
     'AsyncModelFormMixin',
     'AsyncViewT',
     'arender',
+    'astream_render',
     'alogout',
+    'aupdate_session_auth_hash',
 )
 
-from typing import Protocol
+import secrets
+from typing import AsyncIterator, Iterable, Protocol
 
 from django import forms
 
 from asgiref.sync import sync_to_async
-from django.http import HttpResponse, HttpRequest
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import HttpResponse, HttpRequest, StreamingHttpResponse
 from django.shortcuts import render
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
 
 import django.contrib.auth as auth
 from django.contrib import messages
 
+from .executors import executors
+
 class AsyncViewT(Protocol):
     async def __call__(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         ...
@@ -29,27 +38,108 @@ class AsyncViewT(Protocol):
 
 
 class AsyncFormMixin():
-    @sync_to_async
-    def ais_valid(self: forms.BaseForm): # type: ignore
-        return self.is_valid()
-    
-    @sync_to_async
-    def arender(self: forms.BaseForm): # type: ignore
-        return self.render()
+    # Validation and rendering may query (unique checks, model choices)
+    async def ais_valid(self: forms.BaseForm): # type: ignore
+        return await executors.arun('db', self.is_valid)
+
+    async def arender(self: forms.BaseForm): # type: ignore
+        return await executors.arun('db', self.render)
     
 
 class AsyncModelFormMixin(AsyncFormMixin):
     async def asave(self: forms.ModelForm, *args, **kwargs): # type: ignore
-        @sync_to_async
-        def sync_call_save():
-            return self.save(*args, **kwargs)
-        return await sync_call_save()
+        return await executors.arun('db', self.save, *args, **kwargs)
 
-async def arender(*render_args, **render_kargs) -> HttpResponse:
-    @sync_to_async
-    def sync_call_render() -> HttpResponse:
-        return render(*render_args, **render_kargs)
-    return await sync_call_render()
+RENDER_MODES = ('shared', 'pool', 'inline')
+
+async def _arun_template(render_fn, request: HttpRequest, *args, render_mode: str | None = None, **kwargs):
+    mode = render_mode or settings.RENDER_MODE
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode {mode!r}; expected one of {RENDER_MODES}")
+    if mode == 'shared':
+        return await sync_to_async(render_fn)(request, *args, **kwargs)
+    from common.auth import aget_user
+    if hasattr(request, 'session'):
+        await aget_user(request)
+    if mode == 'inline':
+        return render_fn(request, *args, **kwargs)
+    return await executors.arun('render', render_fn, request, *args, **kwargs)
+
+async def arender(request: HttpRequest, *render_args, render_mode: str | None = None, **render_kargs) -> HttpResponse:
+    """
+    `render` for async views. Where the template runs depends on
+    `render_mode` (RENDER_MODE by default):
+
+    - 'shared': on the sync_to_async thread, one render at a time per
+      process, in line with every ORM call;
+    - 'pool': on the 'render' pool of `executors` (RENDER_WORKERS
+      threads), or on the shared thread when its queue is full;
+    - 'inline': on the event loop, with no thread hop at all. Only for
+      templates that don't touch the database: if one does, Django raises
+      SynchronousOnlyOperation.
+
+    Off the shared thread the request's user is loaded beforehand, so the
+    `auth` context processor doesn't query for it. Templates are Python
+    code holding the GIL, so more render threads don't add CPU: what the
+    pool buys is renders no longer waiting behind ORM calls (and each
+    other's database access) on the shared thread.
+    """
+    return await _arun_template(render, request, *render_args, render_mode = render_mode, **render_kargs)
+
+STREAM_SLOT = 'streamed_items'
+STREAM_CHUNK_SIZE = 20
+
+async def astream_render(
+    request: HttpRequest,
+    template_name: str,
+    context: dict | None = None,
+    *,
+    items: Iterable | QuerySet,
+    item_template: str,
+    item_name: str = 'object',
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> StreamingHttpResponse:
+    """
+    Streaming counterpart of `arender` for long listings.
+
+    `template_name` is rendered once with `{{ streamed_items }}` standing in
+    for the list; everything before that slot is sent right away and
+    `items` follow, rendered with `item_template` in chunks of `chunk_size`
+    as they come out of the database. A queryset is read with `aiterator`,
+    so it is never loaded whole. If the page doesn't output the slot (an
+    empty-state branch, say) `items` are not touched at all.
+    """
+    marker = f'<!--{secrets.token_hex(8)}-->'
+    page_context = {**(context or {}), STREAM_SLOT: mark_safe(marker)}
+    page = await _arun_template(
+        lambda request: render_to_string(template_name, page_context, request), request,
+    )
+    head, found, tail = page.partition(marker)
+
+    async def stream() -> AsyncIterator[str]:
+        yield head
+        if not found:
+            return
+        card = get_template(item_template)
+        chunk: list[str] = []
+        async for item in _aiter_chunked(items, chunk_size):
+            chunk.append(card.render({item_name: item}))
+            if len(chunk) >= chunk_size:
+                yield ''.join(chunk)
+                chunk.clear()
+        if chunk:
+            yield ''.join(chunk)
+        yield tail
+
+    return StreamingHttpResponse(stream())
+
+async def _aiter_chunked(items: Iterable | QuerySet, chunk_size: int):
+    if isinstance(items, QuerySet):
+        async for item in items.aiterator(chunk_size = chunk_size):
+            yield item
+    else:
+        for item in items:
+            yield item
 
 async def alogout(request, *args, **kwargs):
     """
@@ -57,32 +147,31 @@ async def alogout(request, *args, **kwargs):
     
     Esta função:
     1. Executa o logout padrão do Django
-    2. Limpa explicitamente o cookie de sessão
-    3. Invalida a sessão atual
-    4. Cria uma nova sessão vazia para evitar erros
+    2. Apaga a sessão atual do armazenamento e limpa os seus dados
+
+    Com a sessão vazia, o SessionMiddleware apaga o cookie na resposta. Não se
+    cria uma sessão nova com expiração negativa: os motores de sessão em cache
+    não a conseguem guardar.
     """
-    @sync_to_async
     def sync_call_logout():
         # Logout padrão do Django
         auth.logout(request, *args, **kwargs)
         
-        # Limpar explicitamente o cookie de sessão
+        # Limpar explicitamente a sessão (remove os dados e o registo)
         if hasattr(request, 'session'):
-            request.session.flush()  # Remove todos os dados da sessão
-            
-            # Definir o cookie de sessão para expirar imediatamente
-            request.session.set_expiry(-1)
-            
-            # Forçar a remoção do cookie de sessão
-            request.session.delete()
-            
-            # Criar uma nova sessão vazia para evitar erros
-            request.session.create()
+            request.session.flush()
     
-    await sync_call_logout()
+    await executors.arun('db', sync_call_logout)
+    # O utilizador em cache (common.auth.aget_user) também passa a anónimo
+    request._cached_user = request._acached_user = request.user
+
+async def aupdate_session_auth_hash(request, user):
+    await executors.arun('db', auth.update_session_auth_hash, request, user)
 
 async def add_message(request, level, message, extra_tags=''):
-    @sync_to_async
-    def sync_add_message():
-        messages.add_message(request, level, message, extra_tags=extra_tags)
-    await sync_add_message()
\ No newline at end of file
+    """
+    Adding a message only queues it on the request's message storage (it
+    is written out by MessageMiddleware), so there's no I/O here and no
+    need for a thread hop.
+    """
+    messages.add_message(request, level, message, extra_tags=extra_tags)
\ No newline at end of file
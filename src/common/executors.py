@@ -0,0 +1,223 @@
+"""
+Bounded thread pools for blocking work called from async views.
+
+`sync_to_async` runs everything on one shared thread (thread_sensitive),
+so a slow call there holds up every other ORM call in the process. Work
+that is slow but self-contained, like password hashing, gets its own
+`BoundedExecutor` instead: a fixed number of worker threads plus a limit
+on how many jobs may wait for one. A job submitted to a full queue fails
+right away with `ExecutorSaturated` rather than piling up.
+
+Each executor keeps counters (queue depth, running jobs, rejections,
+time spent waiting for a worker), readable with `stats()`. A job whose
+caller goes away (a cancelled task, e.g. a client that disconnected)
+while it's still queued is dropped and gives its queue slot back.
+
+`executors` holds the named pools of EXECUTOR_POOLS ('db', 'render',
+'cpu', 'hashing'), built on first use, so each kind of work queues on its
+own. A pool with no workers runs its jobs on the shared sync_to_async
+thread, still counted in its stats. `executors.arun` falls back to that
+thread when a pool is full; hashing, which should rather fail fast, uses
+its executor directly.
+"""
+
+__all__ = (
+    'ExecutorSaturated',
+    'BoundedExecutor',
+    'ExecutorRegistry',
+    'executors',
+)
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+class ExecutorSaturated(RuntimeError):
+    pass
+
+
+class _Job:
+    """
+    One admitted call. It leaves the queue exactly once: by starting, or by
+    being withdrawn because its caller was cancelled, in which case it
+    never runs.
+    """
+
+    def __init__(self, executor: 'BoundedExecutor', fn: Callable[..., Any], args: tuple, kwargs: dict):
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued_at = time.perf_counter()
+        # Guarded by the executor's lock
+        self.queued = True
+
+    def __call__(self) -> Any:
+        executor = self.executor
+        waited = time.perf_counter() - self.enqueued_at
+        with executor._lock:
+            if not self.queued:
+                return None
+            self.queued = False
+            executor._queued -= 1
+            executor._running += 1
+            executor._wait_total += waited
+            executor._wait_max = max(executor._wait_max, waited)
+        ok = False
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+            ok = True
+            return result
+        finally:
+            with executor._lock:
+                executor._running -= 1
+                executor._completed += 1
+                executor._failed += not ok
+            if executor.close_connections and executor.workers:
+                # Pool threads aren't request threads, so the
+                # request_finished handler never closes their connections
+                close_old_connections()
+
+    def withdraw(self):
+        executor = self.executor
+        with executor._lock:
+            if not self.queued:
+                return
+            self.queued = False
+            executor._queued -= 1
+            executor._cancelled += 1
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, workers: int, queue_limit: int, close_connections: bool = False):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.close_connections = close_connections
+        self._lock = threading.Lock()
+        self._pool: ThreadPoolExecutor | None = None
+        self._queued = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._max_queued = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs `fn(*args, **kwargs)` on a worker and waits for its result."""
+        self._admit()
+        job = self._job(fn, args, kwargs)
+        if self.workers:
+            # Through sync_to_async so the job sees the caller's context
+            # (the active language, for one), as on the shared thread
+            call = sync_to_async(job, thread_sensitive = False, executor = self._executor())
+        else:
+            call = sync_to_async(job)
+        try:
+            return await call()
+        except asyncio.CancelledError:
+            # The caller went away (e.g. the client disconnected); a job that
+            # hasn't started is dropped and must give its queue slot back
+            job.withdraw()
+            raise
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix = self.name)
+            return self._pool
+
+    def _admit(self):
+        with self._lock:
+            if self._queued >= self.queue_limit:
+                self._rejected += 1
+                raise ExecutorSaturated(f"'{self.name}' executor queue is full ({self.queue_limit} waiting)")
+            self._queued += 1
+            self._submitted += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+    def _job(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> _Job:
+        return _Job(self, fn, args, kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                'name': self.name,
+                'workers': self.workers or 'shared',
+                'queue_limit': self.queue_limit,
+                'queued': self._queued,
+                'running': self._running,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'cancelled': self._cancelled,
+                'max_queued': self._max_queued,
+                'avg_wait_ms': 1000 * self._wait_total / started if started else 0.0,
+                'max_wait_ms': 1000 * self._wait_max,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait = wait)
+
+
+class ExecutorRegistry:
+    """The named pools of EXECUTOR_POOLS, each built on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executors: dict[str, BoundedExecutor] = {}
+
+    def __getitem__(self, name: str) -> BoundedExecutor:
+        with self._lock:
+            if name not in self._executors:
+                try:
+                    options = settings.EXECUTOR_POOLS[name]
+                except KeyError:
+                    raise KeyError(f"No executor pool named {name!r} in EXECUTOR_POOLS") from None
+                self._executors[name] = BoundedExecutor(name, **options)
+            return self._executors[name]
+
+    def configure(self, name: str, workers: int, queue_limit: int, close_connections: bool = False) -> BoundedExecutor:
+        """Replaces the pool `name` (benchmarks compare pool sizes this way)."""
+        executor = BoundedExecutor(name, workers, queue_limit, close_connections)
+        with self._lock:
+            previous, self._executors[name] = self._executors.get(name), executor
+        if previous is not None:
+            previous.shutdown(wait = False)
+        return executor
+
+    async def arun(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs `fn` on the pool `name` or, if that one is full, on the shared thread."""
+        try:
+            return await self[name].run(fn, *args, **kwargs)
+        except ExecutorSaturated:
+            return await sync_to_async(fn)(*args, **kwargs)
+
+    def stats(self) -> list[dict]:
+        return [self[name].stats() for name in settings.EXECUTOR_POOLS]
+
+    def shutdown(self, wait: bool = True):
+        """Stops every pool's threads; a pool used again starts new ones."""
+        with self._lock:
+            executors = list(self._executors.values())
+        for executor in executors:
+            executor.shutdown(wait = wait)
+
+
+executors = ExecutorRegistry()
@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth.forms import PasswordChangeForm
 from django.utils.translation import gettext_lazy as _
 from common.django_utils import AsyncFormMixin
+from common.executors import ExecutorSaturated
+from common.hashing import SATURATED_MESSAGE, acheck_password, amake_password
 
 class CustomPasswordChangeForm(PasswordChangeForm, AsyncFormMixin):
     """
@@ -23,12 +25,39 @@ class CustomPasswordChangeForm(PasswordChangeForm, AsyncFormMixin):
         widget=forms.PasswordInput(attrs={'autocomplete': 'new-password', 'class': 'form-control'}),
     )
     
+    def clean_old_password(self):
+        # Checked in `ais_valid`, on the hashing executor
+        return self.cleaned_data["old_password"]
+
+    async def ais_valid(self):
+        """
+        Validates the form, then checks the current password and hashes the
+        new one on the hashing executor (not the shared sync_to_async thread)
+        """
+        is_valid = await super().ais_valid()
+        try:
+            if "old_password" in self.cleaned_data and not await acheck_password(
+                self.user, self.cleaned_data["old_password"]
+            ):
+                self.add_error("old_password", forms.ValidationError(
+                    self.error_messages["password_incorrect"], code="password_incorrect",
+                ))
+                is_valid = False
+            if is_valid:
+                self._encoded_password = await amake_password(self.cleaned_data["new_password1"])
+        except ExecutorSaturated:
+            self.add_error(None, SATURATED_MESSAGE)
+            is_valid = False
+        return is_valid
+
     async def asave(self, commit=True):
         """
         Async version of save method for password change form
         """
         user = self.user
-        user.set_password(self.cleaned_data["new_password1"])
+        # What set_password does, with the hash made in `ais_valid`
+        user.password = self._encoded_password
+        user._password = self.cleaned_data["new_password1"]
         if commit:
             await user.asave()
         return user 
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Password hashing on a dedicated `BoundedExecutor`.
+
+Checking or setting a password costs tens of milliseconds of CPU. Done
+inside `sync_to_async` (as form validation, `authenticate` and
+`set_password` are) it blocks the thread every other ORM call in the
+process waits on, so a burst of logins stalls unrelated pages. These
+helpers run the hashing on the 'hashing' pool of `executors`:
+HASHING_WORKERS threads of its own, with at most HASHING_QUEUE_LIMIT jobs
+waiting. The hashers in use (PBKDF2 and
+friends) release the GIL while they work, so threads do run in parallel.
+
+When the queue is full the helpers raise `ExecutorSaturated`; the forms
+turn that into a "try again" error.
+"""
+
+__all__ = (
+    'SATURATED_MESSAGE',
+    'hashing_executor',
+    'amake_password',
+    'acheck_password',
+    'aauthenticate',
+)
+
+import inspect
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, load_backend
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.auth.models import AbstractBaseUser
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
+from django.http import HttpRequest
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.debug import sensitive_variables
+
+from .executors import executors
+
+CLEANSED_PASSWORD = '********************'
+SATURATED_MESSAGE = _('The server is busy right now. Please try again in a moment.')
+
+hashing_executor = executors['hashing']
+
+
+async def amake_password(raw_password: str) -> str:
+    return await hashing_executor.run(make_password, raw_password)
+
+
+def _verify(raw_password: str, encoded: str) -> tuple[bool, str | None]:
+    """Whether the password matches and, if its hash is outdated, the new one."""
+    is_correct, must_update = verify_password(raw_password, encoded)
+    return is_correct, (make_password(raw_password) if is_correct and must_update else None)
+
+
+async def acheck_password(user: AbstractBaseUser, raw_password: str) -> bool:
+    """
+    `user.check_password()` with the hashing off the shared thread. A hash
+    made with outdated settings is upgraded in the same job and saved.
+    """
+    is_correct, upgraded = await hashing_executor.run(_verify, raw_password, user.password)
+    if upgraded is not None:
+        user.password = upgraded
+        await user.asave(update_fields = ['password'])
+    return is_correct
+
+
+def _hashes_like_model_backend(backend) -> bool:
+    return isinstance(backend, ModelBackend) and type(backend).authenticate is ModelBackend.authenticate
+
+
+async def _amodel_authenticate(backend: ModelBackend, username: str, password: str) -> AbstractBaseUser | None:
+    """What ModelBackend.authenticate does, hashing included, minus the thread it runs on."""
+    UserModel = get_user_model()
+    try:
+        user = await UserModel._default_manager.aget(**{UserModel.USERNAME_FIELD: username})
+    except UserModel.DoesNotExist:
+        # Same work as for a real user, so timing doesn't reveal the account
+        await amake_password(password)
+        return None
+    if not await acheck_password(user, password) or not backend.user_can_authenticate(user):
+        return None
+    return user
+
+
+@sensitive_variables('password')
+async def aauthenticate(request: HttpRequest | None, username: str, password: str) -> AbstractBaseUser | None:
+    """
+    `django.contrib.auth.authenticate` over AUTHENTICATION_BACKENDS: for
+    ModelBackend (and subclasses that keep its authenticate) the hashing
+    runs on the hashing pool; other backends run as they are, on the 'db'
+    pool. When every backend refuses, user_login_failed is sent. The
+    returned user is ready for `alogin`.
+    """
+    credentials = {'username': username, 'password': password}
+    for backend_path in settings.AUTHENTICATION_BACKENDS:
+        backend = load_backend(backend_path)
+        try:
+            inspect.signature(backend.authenticate).bind(request, **credentials)
+        except TypeError:
+            # Doesn't take a username and password
+            continue
+        try:
+            if _hashes_like_model_backend(backend):
+                user = await _amodel_authenticate(backend, username, password)
+            else:
+                user = await executors.arun('db', backend.authenticate, request, **credentials)
+        except PermissionDenied:
+            # The backend says this user must not get in at all
+            break
+        if user is not None:
+            user.backend = backend_path
+            return user
+    await user_login_failed.asend(
+        sender = __name__,
+        credentials = {'username': username, 'password': CLEANSED_PASSWORD},
+        request = request,
+    )
+    return None
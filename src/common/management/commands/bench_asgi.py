@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import socket
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from account.models import CustomUser
+from client.models import PlanChoice, Subscription
+from common.benchmark import Timing, benchmark_database
+from contra.middleware import DatabaseFixMiddleware, SessionManagementMiddleware
+
+
+class SyncOnlyDatabaseFixMiddleware(DatabaseFixMiddleware):
+    """The middleware as it was before: Django runs it on a thread."""
+    async_capable = False
+
+
+class SyncOnlySessionManagementMiddleware(SessionManagementMiddleware):
+    async_capable = False
+
+
+# The middleware list as it was: stock Django and WhiteNoise classes, and
+# the project's own middleware sync-only
+PREVIOUS_MIDDLEWARE = {
+    'common.middleware.SecurityMiddleware': 'django.middleware.security.SecurityMiddleware',
+    'common.middleware.WhiteNoiseMiddleware': 'whitenoise.middleware.WhiteNoiseMiddleware',
+    'common.middleware.CommonMiddleware': 'django.middleware.common.CommonMiddleware',
+    'common.middleware.CsrfViewMiddleware': 'django.middleware.csrf.CsrfViewMiddleware',
+    'common.middleware.AuthenticationMiddleware': 'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'common.middleware.MessageMiddleware': 'django.contrib.messages.middleware.MessageMiddleware',
+    'common.middleware.XFrameOptionsMiddleware': 'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'contra.middleware.DatabaseFixMiddleware': f'{__name__}.SyncOnlyDatabaseFixMiddleware',
+    'contra.middleware.SessionManagementMiddleware': f'{__name__}.SyncOnlySessionManagementMiddleware',
+}
+
+
+class AdaptationCounter(logging.Handler):
+    """Collects the 'handler adapted for middleware' notes Django logs at load time."""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.adapted: list[str] = []
+
+    def emit(self, record: logging.LogRecord):
+        message = record.getMessage()
+        if 'adapted for middleware' in message:
+            self.adapted.append(message)
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves the ASGI application with uvicorn (or drives it in process "
+        "with --in-process) on a throwaway database and compares latency "
+        "percentiles for a logged-in page with the middleware list as it was "
+        "(sync-only project middleware), with only the project middleware "
+        "made sync/async, and as it is now."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type = int, default = 2000)
+        parser.add_argument('--concurrency', type = int, default = 16)
+        parser.add_argument('--path', default = '/client/dashboard/')
+        parser.add_argument(
+            '--in-process', action = 'store_true',
+            help = "Call the ASGI application directly instead of through uvicorn over HTTP",
+        )
+
+    def handle(self, *args, requests: int, concurrency: int, path: str, in_process: bool, **options):
+        if not in_process:
+            try:
+                import uvicorn # noqa: F401
+            except ImportError:
+                raise CommandError("uvicorn is not installed; install it or use --in-process")
+
+        with benchmark_database():
+            cookie = self.seed()
+            transport = 'in process' if in_process else 'uvicorn, HTTP/1.1 keep-alive'
+            self.stdout.write(f'{requests} GET {path} from {concurrency} concurrent clients ({transport})\n')
+            previous = [PREVIOUS_MIDDLEWARE.get(m, m) for m in settings.MIDDLEWARE]
+            # Dual project middleware alone make the chain async, paying the
+            # stock middleware's per-hook thread switches
+            dual_only = [
+                m if m.startswith('contra.') else PREVIOUS_MIDDLEWARE.get(m, m)
+                for m in settings.MIDDLEWARE
+            ]
+            variants = (
+                ('previous (sync tail)', previous),
+                ('dual project only', dual_only),
+                ('current (async chain)', list(settings.MIDDLEWARE)),
+            )
+            for label, middleware in variants:
+                with override_settings(MIDDLEWARE = middleware):
+                    app, adapted = self.load_application()
+                    run = self.run_in_process if in_process else self.run_uvicorn
+                    timing = run(app, label, path, cookie, requests, concurrency)
+                self.stdout.write(f'{timing.summary()}  thread switches at load: {len(adapted)}')
+                for name in adapted:
+                    self.stdout.write(f'    {name}')
+
+    def load_application(self) -> tuple[ASGIHandler, list[str]]:
+        logger = logging.getLogger('django.request')
+        counter = AdaptationCounter()
+        level = logger.level
+        logger.addHandler(counter)
+        logger.setLevel(logging.DEBUG)
+        try:
+            app = ASGIHandler()
+        finally:
+            logger.removeHandler(counter)
+            logger.setLevel(level)
+        return app, counter.adapted
+
+    def run_in_process(self, app, label: str, path: str, cookie: str, requests: int, concurrency: int) -> Timing:
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+
+        async def request() -> int:
+            status = 0
+            received = False
+
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # No disconnect: wait until Django cancels its listener
+                await asyncio.Future()
+
+            async def send(message):
+                nonlocal status
+                if message['type'] == 'http.response.start':
+                    status = message['status']
+
+            await app(dict(scope), receive, send)
+            return status
+
+        return async_to_sync(self.load)(label, request, requests, concurrency)
+
+    def run_uvicorn(self, app, label: str, path: str, cookie: str, requests: int, concurrency: int) -> Timing:
+        import uvicorn
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(
+            app, host = '127.0.0.1', port = port, lifespan = 'off', log_level = 'warning',
+        ))
+        thread = threading.Thread(target = server.run, daemon = True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+        raw = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: {cookie}\r\n\r\n'.encode()
+        try:
+            async def connect():
+                return await asyncio.open_connection('127.0.0.1', port)
+
+            async def run() -> Timing:
+                connections = [await connect() for _ in range(concurrency)]
+                idle = asyncio.Queue()
+                for connection in connections:
+                    idle.put_nowait(connection)
+
+                async def request() -> int:
+                    reader, writer = await idle.get()
+                    try:
+                        return await self.http_get(reader, writer, raw)
+                    finally:
+                        idle.put_nowait((reader, writer))
+
+                try:
+                    return await self.load(label, request, requests, concurrency)
+                finally:
+                    for _, writer in connections:
+                        writer.close()
+
+            return async_to_sync(run)()
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    @staticmethod
+    async def http_get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, raw: bytes) -> int:
+        writer.write(raw)
+        await writer.drain()
+        head = await reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = dict(
+            (name.strip().lower(), value.strip())
+            for name, _, value in (line.partition(':') for line in header_lines if line)
+        )
+        if 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while size := int((await reader.readline()).split(b';')[0], 16):
+                await reader.readexactly(size + 2)
+            await reader.readline()
+        return int(status_line.split()[1])
+
+    async def load(self, label: str, request, requests: int, concurrency: int) -> Timing:
+        timing = Timing(label)
+        remaining = requests
+
+        async def client():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                status = await request()
+                timing.samples.append(time.perf_counter() - started)
+                if status != 200:
+                    raise CommandError(f'Got HTTP {status}')
+
+        # Warm up caches and connections before timing
+        for _ in range(concurrency):
+            await request()
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        timing.wall_seconds = time.perf_counter() - started
+        return timing
+
+    def seed(self) -> str:
+        user = CustomUser.objects.create_user(
+            'bench-reader@example.com', 'bench-passwd',
+            first_name = 'Bench', last_name = 'Reader',
+        )
+        plan = PlanChoice.from_plan_code('ST')
+        Subscription.objects.create(
+            user = user, plan_choice = plan, cost = plan.cost,
+            external_subscription_id = 'BENCH', is_active = True,
+        )
+        client = Client()
+        client.force_login(user)
+        return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
@@ -0,0 +1,85 @@
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from account.models import CustomUser
+from common.benchmark import benchmark_database, measure, read_body
+from common.django_utils import add_message
+
+SESSION_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
+FALLBACK_STORAGE = 'django.contrib.messages.storage.fallback.FallbackStorage'
+
+
+async def executor_add_message(request, level, message, extra_tags = ''):
+    """The previous `common.django_utils.add_message`, for comparison."""
+    @sync_to_async
+    def sync_add_message():
+        messages.add_message(request, level, message, extra_tags = extra_tags)
+    await sync_add_message()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares flash message handling on a throwaway database: session "
+        "storage with add_message behind sync_to_async versus cookie-first "
+        "storage with the direct add_message. Each round posts the client "
+        "profile form (one message) and follows the redirect that shows it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type = int, default = 200)
+
+    def handle(self, *args, requests: int, **options):
+        with benchmark_database():
+            user = CustomUser.objects.create_user(
+                'bench-reader@example.com', 'bench-passwd',
+                first_name = 'Bench', last_name = 'Reader',
+            )
+            self.stdout.write(f'{requests} rounds (POST + redirected GET) each\n')
+            variants = (
+                ('session storage, executor hop', SESSION_STORAGE, executor_add_message),
+                ('cookie storage, direct', FALLBACK_STORAGE, None),
+            )
+            for label, storage, replacement in variants:
+                patch = mock.patch('client.views.add_message', replacement) if replacement else nullcontext()
+                with override_settings(MESSAGE_STORAGE = storage), patch:
+                    client = Client()
+                    client.force_login(user)
+                    round_trip = lambda: self.round_trip(client, user)
+                    timing = measure(label, round_trip, requests)
+                    with CaptureQueriesContext(connection) as queries:
+                        for _ in range(requests):
+                            round_trip()
+                writes = sum(
+                    q['sql'].startswith(('UPDATE', 'INSERT')) and 'django_session' in q['sql']
+                    for q in queries
+                )
+                self.stdout.write(f'{timing.summary()}  django_session writes/round: {writes / requests:.2f}')
+
+            self.stdout.write('\nadd_message alone, from a coroutine:')
+            for label, call in (('executor hop', executor_add_message), ('direct', add_message)):
+                per_call = async_to_sync(self.time_add_message)(call, requests * 10)
+                self.stdout.write(f'  {label:<14} {per_call * 1e6:8.1f}us per message')
+
+    async def time_add_message(self, call, repeat: int) -> float:
+        request = RequestFactory().get('/')
+        request._messages = CookieStorage(request)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await call(request, messages.INFO, 'Saved')
+        return (time.perf_counter() - started) / repeat
+
+    def round_trip(self, client: Client, user: CustomUser) -> bytes:
+        form = {'email': user.email, 'first_name': user.first_name, 'last_name': user.last_name}
+        client.post('/client/update-user/', form)
+        body = read_body(client.get('/client/update-user/'))
+        assert b'User updated successfully' in body
+        return body
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.utils.safestring import mark_safe
+
+from account.models import CustomUser
+from common.benchmark import Timing, benchmark_database
+from common.django_utils import arender
+from common.executors import executors
+from writer.models import Article
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders a page from many concurrent coroutines with each arender "
+        "mode (shared thread, render pools of several sizes, inline) on a "
+        "throwaway database. Reports renders per second and how long a "
+        "trivial ORM call waits for the shared sync_to_async thread meanwhile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type = int, default = 400)
+        parser.add_argument('--concurrency', type = int, default = 32)
+        parser.add_argument('--workers', type = int, nargs = '+', default = [1, 2, 4, 8])
+        parser.add_argument('--paragraphs', type = int, default = 200, help = "Size of the rendered article body")
+
+    def handle(self, *args, renders: int, concurrency: int, workers: list[int], paragraphs: int, **options):
+        with benchmark_database():
+            request, context = self.seed(paragraphs)
+            self.stdout.write(
+                f'{renders} renders of client/article-detail.html from {concurrency} coroutines\n'
+            )
+            variants = [('shared', 'shared thread', None)]
+            variants += [('pool', f'pool, {n} workers', n) for n in workers]
+            variants += [('inline', 'inline (event loop)', None)]
+            for mode, label, pool_size in variants:
+                executors.configure('render', pool_size or 1, renders)
+                with override_settings(RENDER_MODE = mode):
+                    rate, probe = async_to_sync(self.run)(request, context, renders, concurrency)
+                render_stats = executors['render'].stats()
+                self.stdout.write(
+                    f'{label:<22} {rate:9.1f} renders/s   ORM call on shared thread: '
+                    f'p50={probe.percentile(50) * 1000:7.2f}ms p99={probe.percentile(99) * 1000:7.2f}ms'
+                    + (f'   pool wait avg={render_stats["avg_wait_ms"]:.2f}ms' if mode == 'pool' else '')
+                )
+            executors.shutdown()
+            self.stdout.write(
+                '\nTemplates hold the GIL, so pool threads mostly stop renders from '
+                'queueing with ORM calls; pure CPU throughput stays near one core.'
+            )
+
+    async def run(self, request, context: dict, renders: int, concurrency: int) -> tuple[float, Timing]:
+        remaining = renders
+        done = asyncio.Event()
+        probe = Timing('orm probe')
+
+        async def renderer():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await arender(request, 'client/article-detail.html', context)
+
+        async def orm_probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await sync_to_async(CustomUser.objects.count)()
+                probe.samples.append(time.perf_counter() - started)
+                await asyncio.sleep(0.001)
+
+        probe_task = asyncio.create_task(orm_probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(renderer() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+        return renders / elapsed, probe
+
+    def seed(self, paragraphs: int):
+        user = CustomUser.objects.create_user(
+            'bench-reader@example.com', 'bench-passwd',
+            first_name = 'Bench', last_name = 'Reader',
+        )
+        writer = CustomUser.objects.create_user('bench-writer@example.com', 'bench-passwd', is_writer = True)
+        article = Article.objects.create(title = 'Bench', content = 'Bench', user = writer)
+        body = ''.join(f'<p>Paragraph {i} of the benchmark article.</p>' for i in range(paragraphs))
+        request = RequestFactory().get(f'/client/article/{article.id}')
+        # What the auth middleware and aget_user leave behind
+        request.user = request._cached_user = request._acached_user = user
+        context = {'article': article, 'article_body': mark_safe(body), 'subscription_plan': 'standard'}
+        return request, context
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from account.models import CustomUser
+from client.models import PlanChoice, Subscription
+from common.benchmark import benchmark_database, measure, read_body
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'common.sessions.tiered',
+    'signed_cookies': 'common.sessions.signed_cookies',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the session engines on a logged-in client page, on a "
+        "throwaway database: latency and django_session queries per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type = int, default = 300)
+        parser.add_argument('--path', default = '/client/dashboard/')
+        parser.add_argument('--engines', nargs = '+', choices = ENGINES, default = list(ENGINES))
+
+    def handle(self, *args, requests: int, path: str, engines: list[str], **options):
+        with benchmark_database():
+            user = self.seed()
+            self.stdout.write(
+                f'{requests} requests to {path} per engine '
+                f'(SESSION_SAVE_EVERY_REQUEST={settings.SESSION_SAVE_EVERY_REQUEST})\n'
+            )
+            for name in engines:
+                with override_settings(SESSION_ENGINE = ENGINES[name]):
+                    # A new Client builds its middleware with the engine above
+                    client = Client()
+                    client.force_login(user)
+                    timing = measure(name, lambda: read_body(client.get(path)), requests)
+                    reads, writes = self.count_session_queries(client, path, requests)
+                self.stdout.write(
+                    f'{timing.summary()}  django_session/request: '
+                    f'{reads / requests:.2f} reads {writes / requests:.2f} writes'
+                )
+
+    def count_session_queries(self, client: Client, path: str, requests: int) -> tuple[int, int]:
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(requests):
+                read_body(client.get(path))
+        session_sql = [q['sql'] for q in queries if 'django_session' in q['sql']]
+        reads = sum(sql.startswith('SELECT') for sql in session_sql)
+        return reads, len(session_sql) - reads
+
+    def seed(self) -> CustomUser:
+        user = CustomUser.objects.create_user(
+            'bench-reader@example.com', 'bench-passwd',
+            first_name = 'Bench', last_name = 'Reader',
+        )
+        plan = PlanChoice.from_plan_code('ST')
+        Subscription.objects.create(
+            user = user, plan_choice = plan, cost = plan.cost,
+            external_subscription_id = 'BENCH', is_active = True,
+        )
+        return user
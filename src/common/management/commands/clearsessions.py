@@ -1 +1,33 @@
- 
\ No newline at end of file
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from common.sessions.purge import PurgeResult, purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired sessions from django_session in small batches, "
+        "pausing between them so the table is never locked for long. "
+        "Replaces Django's clearsessions; can be run as a cronjob."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type = int, default = settings.SESSION_PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type = float, default = settings.SESSION_PURGE_PAUSE,
+                            help = 'Seconds to sleep between batches.')
+        parser.add_argument('--max-batches', type = int, default = None,
+                            help = 'Stop after this many batches (default: until done).')
+
+    def handle(self, *args, batch_size: int, pause: float, max_batches: int | None, **options):
+        def report(progress: PurgeResult):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'batch {progress.batches}: {progress.rows} rows '
+                    f'({progress.rows_per_second:.0f} rows/s)'
+                )
+
+        result = purge_expired_sessions(batch_size, pause, max_batches, on_batch = report)
+        self.stdout.write(
+            f'Deleted {result.rows} expired sessions in {result.batches} batches, '
+            f'{result.seconds:.2f}s ({result.rows_per_second:.0f} rows/s)'
+        )
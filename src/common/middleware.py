@@ -0,0 +1,129 @@
+"""
+Django's stock middleware with async hooks that don't hop threads.
+
+Under ASGI a middleware in async mode gets `MiddlewareMixin.__acall__`,
+which runs process_request and process_response through sync_to_async:
+two thread switches per middleware per request, even for hooks that only
+set headers. The classes here run those hooks on the event loop instead,
+which is safe because they do no I/O. The few that sometimes do (saving
+the session, storing flash messages, finding a static file) hop only when
+that I/O is actually due.
+
+In sync mode (WSGI) they behave exactly like the originals.
+"""
+
+__all__ = (
+    'InlineHooksMixin',
+    'SecurityMiddleware',
+    'WhiteNoiseMiddleware',
+    'CommonMiddleware',
+    'CsrfViewMiddleware',
+    'AuthenticationMiddleware',
+    'MessageMiddleware',
+    'XFrameOptionsMiddleware',
+)
+
+import whitenoise.middleware
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.middleware import clickjacking, common, csrf, security
+
+
+class InlineHooksMixin:
+    """For MiddlewareMixin subclasses whose hooks do no I/O."""
+
+    async def __acall__(self, request):
+        response = None
+        if hasattr(self, 'process_request'):
+            response = self.process_request(request)
+        response = response or await self.get_response(request)
+        if hasattr(self, 'process_response'):
+            response = self.process_response(request, response)
+        return response
+
+
+class SecurityMiddleware(InlineHooksMixin, security.SecurityMiddleware):
+    pass
+
+
+class CommonMiddleware(InlineHooksMixin, common.CommonMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(InlineHooksMixin, csrf.CsrfViewMiddleware):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.async_mode:
+            # The handler adapts process_view on its own; a coroutine is
+            # awaited as is
+            self.process_view = self._aprocess_view
+
+    async def _aprocess_view(self, request, callback, callback_args, callback_kwargs):
+        if self._parses_upload(request, callback):
+            # The token is looked up in request.POST first, and parsing a
+            # multipart body writes large uploads to temporary files
+            return await sync_to_async(super().process_view)(request, callback, callback_args, callback_kwargs)
+        # A urlencoded body is capped at DATA_UPLOAD_MAX_MEMORY_SIZE, which
+        # ASGI keeps in memory (up to FILE_UPLOAD_MAX_MEMORY_SIZE)
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+    @staticmethod
+    def _parses_upload(request, callback) -> bool:
+        return (
+            request.method == 'POST'
+            and request.content_type == 'multipart/form-data'
+            and not hasattr(request, '_post')
+            and not getattr(callback, 'csrf_exempt', False)
+        )
+
+
+class AuthenticationMiddleware(InlineHooksMixin, auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(InlineHooksMixin, messages_middleware.MessageMiddleware):
+    async def __acall__(self, request):
+        self.process_request(request)
+        response = await self.get_response(request)
+        storage = request._messages
+        if storage.used or storage.added_new:
+            # Storing may write to the session, which may need loading
+            return await sync_to_async(self.process_response)(request, response)
+        return self.process_response(request, response)
+
+
+class XFrameOptionsMiddleware(InlineHooksMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
+
+
+class WhiteNoiseMiddleware(whitenoise.middleware.WhiteNoiseMiddleware):
+    """
+    WhiteNoise is sync-only, so at the top of the list it used to put the
+    whole chain below it on a thread. Here requests for anything but a
+    static file carry on in async mode; only the disk lookup (with
+    autorefresh) and serving a file switch threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response = None, settings = settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,207 @@
+"""
+Keyset (a.k.a. cursor) pagination shared by the article listings.
+
+Instead of an OFFSET, every page is addressed by the ordering key of the
+row that bounds it. Fetching page 500 is then the same index range scan
+as fetching page 1, and rows inserted while a reader is paging do not
+shift the pages under them.
+
+Cursors are opaque, URL-safe tokens. They are not signed: a tampered
+cursor can only move the reader to some other position of a listing they
+are already allowed to see.
+"""
+
+__all__ = (
+    'InvalidCursor',
+    'KeysetPage',
+    'KeysetPaginator',
+    'encode_cursor',
+    'decode_cursor',
+)
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import reduce
+from typing import Any, Callable, Sequence
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+DEFAULT_ORDERING = ('-date_posted', '-id')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded for the listing."""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators = (',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(token) from exc
+    if not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+    per_page: int = field(default = 0, repr = False)
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+
+class KeysetPaginator:
+    """
+    Paginates `queryset` over `ordering`, which must end with a unique
+    column (normally the primary key) so that every row has a distinct key.
+
+    `after` returns the page that follows the row encoded in the cursor,
+    `before` the page that precedes it. With neither, the first page is
+    returned.
+
+    Rows may be model instances or `.values()` dicts; for `.values_list()`
+    tuples pass `key`, a function returning the row's ordering values.
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        per_page: int,
+        ordering: Sequence[str] = DEFAULT_ORDERING,
+        key: Callable[[Any], Sequence] | None = None,
+    ):
+        if per_page < 1:
+            raise ValueError(f"per_page must be positive, got {per_page}")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.keys = tuple(o.lstrip('-') for o in self.ordering)
+        self.descending = tuple(o.startswith('-') for o in self.ordering)
+        self.key = key
+
+    def get_page(self, after: str | None = None, before: str | None = None) -> KeysetPage:
+        rows = list(self.page_queryset(after, before))
+        return self._make_page(rows, after, before)
+
+    async def aget_page(self, after: str | None = None, before: str | None = None) -> KeysetPage:
+        rows = [row async for row in self.page_queryset(after, before)]
+        return self._make_page(rows, after, before)
+
+    def page_queryset(self, after: str | None = None, before: str | None = None) -> QuerySet:
+        """
+        The query that fetches the requested page plus one lookahead row.
+        Rows come in reverse listing order when paging `before` a cursor.
+        """
+        if after and before:
+            raise InvalidCursor("Use either 'after' or 'before', not both")
+        queryset = self.queryset
+        if after or before:
+            values = self.decode(after or before) # type: ignore
+            queryset = queryset.filter(self._seek(values, backwards = bool(before)))
+        ordering = self._reversed_ordering() if before else self.ordering
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def key_of(self, row: Any) -> tuple:
+        if self.key is not None:
+            return tuple(self.key(row))
+        if isinstance(row, dict):
+            return tuple(row[k] for k in self.keys)
+        return tuple(getattr(row, k) for k in self.keys)
+
+    def cursor_for(self, row: Any) -> str:
+        return encode_cursor(self.key_of(row))
+
+    def _make_page(self, rows: list, after: str | None, before: str | None) -> KeysetPage:
+        backwards = bool(before)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return KeysetPage([], per_page = self.per_page)
+
+        first, last = self.cursor_for(rows[0]), self.cursor_for(rows[-1])
+        if backwards:
+            return KeysetPage(rows, last, first if has_more else None, self.per_page)
+        return KeysetPage(rows, last if has_more else None, first if after else None, self.per_page)
+
+    def decode(self, token: str) -> list:
+        values = decode_cursor(token)
+        if len(values) != len(self.keys):
+            raise InvalidCursor(token)
+        model = self.queryset.model
+        try:
+            values = [
+                self._aware(model._meta.get_field(key).to_python(value))
+                for key, value in zip(self.keys, values)
+            ]
+        except (ValidationError, LookupError, ValueError, OverflowError) as exc:
+            raise InvalidCursor(token) from exc
+        # Keys are compared with the rows' (e.g. bisected in the feed cache),
+        # so every value must be comparable with them
+        if any(value is None for value in values):
+            raise InvalidCursor(token)
+        return values
+
+    @staticmethod
+    def _aware(value: Any) -> Any:
+        # Cursors we issue carry the offset; a hand-made one may not
+        if isinstance(value, datetime) and settings.USE_TZ and timezone.is_naive(value):
+            return timezone.make_aware(value)
+        return value
+
+    def _seek(self, values: list, backwards: bool) -> Q:
+        """
+        Builds the row-value comparison `(k1, k2, ...) < (v1, v2, ...)`
+        (or `>`, per column direction) as an OR of equality prefixes, which
+        every backend supports. The redundant `k1 <= v1` in front is what
+        lets the planner turn the comparison into an index range scan.
+        """
+        clauses = []
+        for i, (key, value) in enumerate(zip(self.keys, values)):
+            op = self._seek_op(i, backwards)
+            prefix = {k: v for k, v in zip(self.keys[:i], values[:i])}
+            clauses.append(Q(**prefix, **{f'{key}__{op}': value}))
+        leading = Q(**{f'{self.keys[0]}__{self._seek_op(0, backwards)}e': values[0]})
+        return leading & reduce(lambda a, b: a | b, clauses)
+
+    def _seek_op(self, index: int, backwards: bool) -> str:
+        return 'lt' if self.descending[index] != backwards else 'gt'
+
+    def _reversed_ordering(self) -> tuple[str, ...]:
+        return tuple(o[1:] if o.startswith('-') else f'-{o}' for o in self.ordering)
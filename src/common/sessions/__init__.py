@@ -0,0 +1,43 @@
+"""
+Session engines selectable with the SESSION_BACKEND setting:
+
+- `common.sessions.tiered`: a process-local memory tier in front of the
+  shared cache in SESSION_CACHE_ALIAS;
+- `common.sessions.signed_cookies`: the whole session, signed, in the
+  cookie.
+
+Both keep sessions started under the database engine alive: a session
+key they don't know is looked up in `django_session` and moved over (see
+`take_from_database`), so switching engines logs nobody out. Once
+SESSION_COOKIE_AGE has passed since the switch no live database session
+is left and SESSION_DATABASE_FALLBACK can be turned off.
+"""
+
+__all__ = (
+    'take_from_database',
+)
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+DATABASE_KEY_LEN = 32
+
+
+def take_from_database(session_key: str | None) -> tuple[dict, int] | None:
+    """
+    Data and remaining lifetime (in seconds) of a live database session,
+    whose row is deleted so the session can't come back from there after
+    it is flushed in the new engine.
+    """
+    if not (
+        settings.SESSION_DATABASE_FALLBACK and session_key and
+        len(session_key) == DATABASE_KEY_LEN and session_key.isalnum()
+    ):
+        return None
+    now = timezone.now()
+    row = Session.objects.filter(session_key = session_key, expire_date__gt = now).first()
+    if row is None:
+        return None
+    Session.objects.filter(session_key = session_key).delete()
+    return row.get_decoded(), max(1, int((row.expire_date - now).total_seconds()))
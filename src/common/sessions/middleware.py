@@ -0,0 +1,55 @@
+"""
+Session middleware that slides the session expiry without rewriting the
+session on every request.
+
+With SESSION_SAVE_EVERY_REQUEST each request stores the session again just
+to push its expiry forward. Here a session that was read but not changed
+is only stored again once SESSION_REFRESH_FRACTION of its lifetime has
+passed since it was last stored, so an idle timeout of SESSION_COOKIE_AGE
+becomes one between (1 - fraction) * age and age. Sessions whose data
+changed are saved right away, as usual.
+"""
+
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.middleware import SessionMiddleware
+
+REFRESHED_AT_KEY = '_session_refreshed_at'
+
+
+def refresh_if_due(session: SessionBase):
+    """Marks `session` to be saved if its expiry is due for a refresh."""
+    if not session.accessed or session.is_empty():
+        return
+    now = int(time.time())
+    if session.modified:
+        # Being saved anyway: restart the refresh window
+        session[REFRESHED_AT_KEY] = now
+        return
+    refreshed_at = session.get(REFRESHED_AT_KEY, 0)
+    if now - refreshed_at >= settings.SESSION_REFRESH_FRACTION * session.get_expiry_age():
+        session[REFRESHED_AT_KEY] = now
+
+
+class CoalescedSessionMiddleware(SessionMiddleware):
+    def process_response(self, request, response):
+        if hasattr(request, 'session') and not settings.SESSION_SAVE_EVERY_REQUEST:
+            refresh_if_due(request.session)
+        return super().process_response(request, response)
+
+    async def __acall__(self, request):
+        # Creating the (lazy) store and setting the cookie need no I/O; only
+        # a save does, so only then does the response hop threads
+        self.process_request(request)
+        response = await self.get_response(request)
+        session = request.session
+        if not settings.SESSION_SAVE_EVERY_REQUEST:
+            refresh_if_due(session)
+        # SessionMiddleware's, not ours: the refresh is decided already
+        process_response = super().process_response
+        if (session.modified or settings.SESSION_SAVE_EVERY_REQUEST) and not session.is_empty():
+            return await sync_to_async(process_response)(request, response)
+        return process_response(request, response)
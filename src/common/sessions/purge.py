@@ -0,0 +1,124 @@
+"""
+Deletes expired rows from `django_session` in small batches.
+
+Django's `clear_expired()` is one `DELETE ... WHERE expire_date < now`,
+which on a big table holds locks for as long as it takes to scan and
+delete every expired row. Here each batch selects at most `batch_size`
+expired keys (through the expire_date index) and deletes them by primary
+key in its own short transaction, sleeping `pause` seconds between
+batches so other writers get the table back.
+
+The scheduled purge is the `clearsessions` command, run from cron. On a
+long-running server SESSION_PURGE_INTERVAL can be set instead (it is 0,
+off, by default): `SessionManagementMiddleware` then calls
+`session_purger.maybe_start()`, which runs a bounded purge in a
+background thread at most once every SESSION_PURGE_INTERVAL seconds per
+process. Leave it off where a process can be frozen or killed between
+requests (serverless) and in short-lived ones (tests, shells).
+"""
+
+__all__ = (
+    'PurgeResult',
+    'purge_expired_sessions',
+    'SessionPurger',
+    'session_purger',
+)
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PurgeResult:
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def purge_expired_sessions(
+    batch_size: int,
+    pause: float,
+    max_batches: int | None = None,
+    on_batch: Callable[[PurgeResult], None] | None = None,
+) -> PurgeResult:
+    result = PurgeResult()
+    started = time.perf_counter()
+    # Sessions expiring while the purge runs are left for the next one
+    now = timezone.now()
+    while max_batches is None or result.batches < max_batches:
+        with transaction.atomic():
+            keys = list(
+                Session.objects
+                .filter(expire_date__lt = now)
+                .values_list('session_key', flat = True)[:batch_size]
+            )
+            if not keys:
+                break
+            deleted, _ = Session.objects.filter(session_key__in = keys, expire_date__lt = now).delete()
+        result.rows += deleted
+        result.batches += 1
+        result.seconds = time.perf_counter() - started
+        if on_batch is not None:
+            on_batch(result)
+        if len(keys) < batch_size:
+            break
+        time.sleep(pause)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+class SessionPurger:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_started: float | None = None
+        self._running = False
+
+    def maybe_start(self) -> bool:
+        """Starts a background purge if one is due; True if it did."""
+        interval = settings.SESSION_PURGE_INTERVAL
+        if interval <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._running or (self._last_started is not None and now - self._last_started < interval):
+                return False
+            self._running = True
+            self._last_started = now
+        threading.Thread(target = self._run, name = 'session-purge', daemon = True).start()
+        return True
+
+    def _run(self):
+        try:
+            result = purge_expired_sessions(
+                settings.SESSION_PURGE_BATCH_SIZE,
+                settings.SESSION_PURGE_PAUSE,
+                max_batches = settings.SESSION_PURGE_MAX_BATCHES,
+            )
+            if result.rows:
+                logger.info(
+                    'Purged %d expired sessions in %.2fs (%.0f rows/s)',
+                    result.rows, result.seconds, result.rows_per_second,
+                )
+        except Exception:
+            logger.exception('Expired session purge failed')
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._running = False
+
+
+session_purger = SessionPurger()
@@ -0,0 +1,17 @@
+"""
+Django's signed-cookie session engine, plus the move of live database
+sessions described in `common.sessions`.
+"""
+
+from django.contrib.sessions.backends.signed_cookies import SessionStore as SignedCookieSessionStore
+
+from . import take_from_database
+
+
+class SessionStore(SignedCookieSessionStore):
+    def load(self):
+        if moved := take_from_database(self.session_key):
+            # Reissued as a signed cookie at the end of the request
+            self.modified = True
+            return moved[0]
+        return super().load()
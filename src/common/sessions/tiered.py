@@ -0,0 +1,119 @@
+"""
+Cache session engine with a process-local tier in front of the shared
+cache.
+
+Reads are served from process memory for up to SESSION_L1_TTL seconds,
+then from the shared cache (SESSION_CACHE_ALIAS); writes go to both. A
+session changed by another worker can therefore look stale here for at
+most SESSION_L1_TTL seconds, so keep it short.
+"""
+
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cache import SessionStore as CacheSessionStore
+
+from ..executors import executors
+from . import take_from_database
+
+KEY_PREFIX = 'common.sessions.tiered'
+
+
+class LocalTier:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, dict]] = {}
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            self.delete(key)
+            return None
+        # Callers mutate the session dict in place
+        return copy.deepcopy(data)
+
+    def set(self, key: str, data: dict):
+        if settings.SESSION_L1_TTL <= 0:
+            return
+        entry = (time.monotonic() + settings.SESSION_L1_TTL, copy.deepcopy(data))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            # Oldest entries first in insertion order
+            while len(self._entries) > settings.SESSION_L1_MAX_ENTRIES:
+                del self._entries[next(iter(self._entries))]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tier = LocalTier()
+
+
+class SessionStore(CacheSessionStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def load(self):
+        key = self.cache_key
+        data = local_tier.get(key)
+        if data is None:
+            try:
+                data = self._cache.get(key)
+            except Exception:
+                data = None
+        if data is None and (moved := take_from_database(self.session_key)):
+            data, ttl = moved
+            self._cache.set(key, data, ttl)
+        if data is None:
+            self._session_key = None
+            return {}
+        local_tier.set(key, data)
+        return data
+
+    async def aload(self):
+        key = await self.acache_key()
+        data = local_tier.get(key)
+        if data is None:
+            try:
+                data = await self._cache.aget(key)
+            except Exception:
+                data = None
+        if data is None and (moved := await executors.arun('db', take_from_database, self.session_key)):
+            data, ttl = moved
+            await self._cache.aset(key, data, ttl)
+        if data is None:
+            self._session_key = None
+            return {}
+        local_tier.set(key, data)
+        return data
+
+    def save(self, must_create = False):
+        super().save(must_create)
+        local_tier.set(self.cache_key, self._get_session(no_load = True))
+
+    async def asave(self, must_create = False):
+        await super().asave(must_create)
+        local_tier.set(await self.acache_key(), await self._aget_session(no_load = True))
+
+    def delete(self, session_key = None):
+        session_key = session_key or self.session_key
+        super().delete(session_key)
+        if session_key:
+            local_tier.delete(self.cache_key_prefix + session_key)
+
+    async def adelete(self, session_key = None):
+        session_key = session_key or self.session_key
+        await super().adelete(session_key)
+        if session_key:
+            local_tier.delete(self.cache_key_prefix + session_key)
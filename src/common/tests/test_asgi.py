@@ -0,0 +1,84 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from common import warmup
+from common.asgi import LifespanApplication
+
+
+class LifespanApplicationTests(SimpleTestCase):
+    def run_lifespan(self, events: list) -> list:
+        """Sends startup then shutdown; returns what was sent back, with `events` interleaved."""
+        messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            events.append(message['type'])
+
+        async def application(scope, receive, send):
+            raise AssertionError('Lifespan events reached the Django application')
+
+        asyncio.run(LifespanApplication(application)({'type': 'lifespan'}, receive, send))
+        return events
+
+    def test_startup_completes_after_warm_up(self):
+        events = []
+        with mock.patch('common.asgi.warm_up', lambda: events.append('warm_up')), \
+             mock.patch('common.asgi._shutdown', lambda: events.append('shutdown')):
+            self.run_lifespan(events)
+        self.assertEqual(
+            events,
+            ['warm_up', 'lifespan.startup.complete', 'shutdown', 'lifespan.shutdown.complete'],
+        )
+
+    def test_shutdown_completes_when_cleanup_fails(self):
+        events = []
+        with mock.patch('common.asgi.warm_up'), \
+             mock.patch('common.asgi._shutdown', side_effect = RuntimeError('boom')), \
+             self.assertLogs('common.asgi', 'ERROR'):
+            self.run_lifespan(events)
+        self.assertEqual(events, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_http_is_passed_through(self):
+        calls = []
+
+        async def application(scope, receive, send):
+            calls.append((scope, receive, send))
+            return 'response'
+
+        scope, receive, send = {'type': 'http', 'path': '/'}, object(), object()
+        with mock.patch('common.asgi.warm_up') as warm_up:
+            result = asyncio.run(LifespanApplication(application)(scope, receive, send))
+        self.assertEqual(result, 'response')
+        self.assertEqual(len(calls), 1)
+        self.assertIs(calls[0][0], scope)
+        self.assertIs(calls[0][1], receive)
+        self.assertIs(calls[0][2], send)
+        warm_up.assert_not_called()
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_failing_and_unknown_steps_are_logged_and_skipped(self):
+        ran = []
+        steps = {
+            'first': lambda: ran.append('first'),
+            'broken': mock.Mock(side_effect = RuntimeError('boom')),
+            'last': lambda: ran.append('last'),
+        }
+        with mock.patch.dict(warmup.WARMUP_STEPS, steps), \
+             override_settings(WARMUP_STEPS = ['first', 'broken', 'missing', 'last']), \
+             self.assertLogs('common.warmup') as logs:
+            timings = warmup.warm_up()
+        self.assertEqual(ran, ['first', 'last'])
+        self.assertEqual(list(timings), ['first', 'last'])
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+        output = '\n'.join(logs.output)
+        self.assertIn("Warm-up step 'broken' failed", output)
+        self.assertIn("Unknown warm-up step 'missing'", output)
+
+    def test_steps_can_be_chosen(self):
+        timings = warmup.warm_up(['urls', 'i18n', 'templates'])
+        self.assertEqual(list(timings), ['urls', 'i18n', 'templates'])
@@ -0,0 +1,127 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from account.models import CustomUser
+from common.auth import aclient_required, aget_user, alogin, alogout, aprofile_owner_required, aprofile_required
+from common.django_utils import alogout as alogout_and_flush
+from writer.models import Article
+
+USER_TABLE = CustomUser._meta.db_table
+
+
+def user_queries(queries: CaptureQueriesContext) -> int:
+    return sum(f'"{USER_TABLE}"' in query['sql'] for query in queries)
+
+
+def request_for(user: CustomUser | None = None):
+    """A request as AuthenticationMiddleware leaves it, logged in as `user`."""
+    request = RequestFactory().get('/')
+    request.session = SessionStore()
+    if user is not None:
+        request.session[SESSION_KEY] = str(user.pk)
+        request.session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        request.session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    AuthenticationMiddleware(lambda request: None).process_request(request)
+    return request
+
+
+class RequestUserTests(TestCase):
+    def setUp(self):
+        self.client_user = CustomUser.objects.create_user('reader@example.com', 'passwd')
+        self.writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+
+    def test_stacked_decorators_load_the_user_once(self):
+        seen = []
+
+        @aclient_required
+        @aprofile_required('client')
+        async def view(request):
+            seen.extend([await aget_user(request), await request.auser(), request.user])
+            return HttpResponse()
+
+        request = request_for(self.client_user)
+        with self.assertNumQueries(1):
+            response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(seen, [self.client_user] * 3)
+        self.assertIs(seen[0], seen[1])
+
+    def test_a_page_behind_the_decorators_loads_the_user_once(self):
+        article = Article.objects.create(title = 'Mine', content = 'Body', user = self.writer)
+        client = Client()
+        client.force_login(self.writer)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/writer/update-article/{article.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_queries(queries), 1)
+
+    def test_alogin_replaces_the_cached_user(self):
+        request = request_for()
+        self.assertFalse(async_to_sync(aget_user)(request).is_authenticated)
+        async_to_sync(alogin)(request, self.client_user)
+        self.assertIs(async_to_sync(aget_user)(request), self.client_user)
+        self.assertIs(async_to_sync(request.auser)(), self.client_user)
+        self.assertIs(request.user, self.client_user)
+
+    def test_alogout_replaces_the_cached_user(self):
+        for logout in (alogout, alogout_and_flush):
+            with self.subTest(logout.__module__):
+                request = request_for(self.client_user)
+                self.assertEqual(async_to_sync(aget_user)(request), self.client_user)
+                async_to_sync(logout)(request)
+                self.assertIsInstance(async_to_sync(aget_user)(request), AnonymousUser)
+                self.assertIsInstance(async_to_sync(request.auser)(), AnonymousUser)
+                self.assertIsInstance(request.user, AnonymousUser)
+
+
+class ProfileOwnerRequiredTests(TestCase):
+    def setUp(self):
+        self.writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        self.other_writer = CustomUser.objects.create_user('other@example.com', 'passwd', is_writer = True)
+        self.reader = CustomUser.objects.create_user('reader@example.com', 'passwd')
+        self.article = Article.objects.create(title = 'Mine', content = 'Body', user = self.writer)
+
+    def get(self, user: CustomUser | None, article_id: int):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        return client.get(f'/writer/update-article/{article_id}')
+
+    def test_owner_gets_the_object(self):
+        seen = []
+
+        @aprofile_owner_required('writer', Article, redirect_if_missing = 'my-articles')
+        async def view(request, article):
+            seen.append(article)
+            return HttpResponse()
+
+        request = request_for(self.writer)
+        with self.assertNumQueries(2):
+            async_to_sync(view)(request, id = self.article.id)
+        self.assertEqual(seen, [self.article])
+        self.assertContains(self.get(self.writer, self.article.id), 'Mine')
+
+    def test_other_profile_is_forbidden(self):
+        self.assertEqual(self.get(self.reader, self.article.id).status_code, 403)
+
+    def test_other_users_object_is_treated_as_missing(self):
+        self.assertRedirects(
+            self.get(self.other_writer, self.article.id), '/writer/my-articles/', fetch_redirect_response = False,
+        )
+
+    def test_missing_object_redirects(self):
+        self.assertRedirects(
+            self.get(self.writer, self.article.id + 1000), '/writer/my-articles/', fetch_redirect_response = False,
+        )
+
+    def test_anonymous_is_sent_to_login(self):
+        response = self.get(None, self.article.id)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/account/login', response['Location'])
@@ -0,0 +1,212 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from common.db.mysql import base as pooled_mysql
+from common.db.pool import ConnectionPool, PoolTimeout, close_pools
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeConnection:
+    def __init__(self, number: int):
+        self.number = number
+        self.encoders = {}
+        self.pings = 0
+        self.alive = True
+        self.closed = False
+
+    def ping(self, reconnect = True):
+        self.pings += 1
+        if not self.alive:
+            raise OSError('server has gone away')
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDriver:
+    """Stands in for pymysql.connect, counting handshakes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections: list[FakeConnection] = []
+
+    def connect(self, **params) -> FakeConnection:
+        with self.lock:
+            connection = FakeConnection(len(self.connections))
+            self.connections.append(connection)
+            return connection
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.driver = FakeDriver()
+        self.clock = FakeClock()
+
+    def make_pool(self, **options) -> ConnectionPool:
+        options = {'min_size': 0, 'max_size': 2, 'recycle': 600, 'health_check_after': 30, 'timeout': 0.05, **options}
+        return ConnectionPool(self.driver.connect, clock = self.clock, **options)
+
+    def test_fills_min_size_and_reuses_connections(self):
+        pool = self.make_pool(min_size = 2, max_size = 4)
+        connection = pool.acquire()
+        self.assertEqual(len(self.driver.connections), 2)
+        pool.release(connection)
+        for _ in range(10):
+            pool.release(pool.acquire())
+        self.assertEqual(len(self.driver.connections), 2)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['idle'], stats['in_use'], stats['checkouts']), (2, 2, 0, 11))
+
+    def test_waits_then_times_out_at_max_size(self):
+        pool = ConnectionPool(self.driver.connect, max_size = 1, timeout = 0.05)
+        connection = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+        # A borrower waiting for a connection gets the one released meanwhile
+        threading.Timer(0.02, pool.release, [connection]).start()
+        pool.timeout = 1
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(len(self.driver.connections), 1)
+
+    def test_idle_connection_is_pinged_and_replaced_if_dead(self):
+        pool = self.make_pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        self.clock.now += 5
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(connection.pings, 0)
+        pool.release(connection)
+        self.clock.now += 60
+        connection.alive = False
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['health_failures'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_old_connections_are_recycled(self):
+        pool = self.make_pool(recycle = 100)
+        first = pool.acquire()
+        self.clock.now += 150
+        pool.release(first)
+        self.assertTrue(first.closed)
+        second = pool.acquire()
+        pool.release(second)
+        self.clock.now += 150
+        self.assertIsNot(pool.acquire(), second)
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.stats()['recycled'], 2)
+
+    def test_discarded_connection_frees_its_slot(self):
+        pool = self.make_pool(max_size = 1)
+        connection = pool.acquire()
+        pool.release(connection, discard = True)
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.acquire(), connection)
+
+    def test_shared_by_threads_within_max_size(self):
+        pool = ConnectionPool(self.driver.connect, min_size = 1, max_size = 3, timeout = 5)
+        lent = set()
+        lock = threading.Lock()
+        errors = []
+
+        def borrow():
+            try:
+                for _ in range(50):
+                    connection = pool.acquire()
+                    with lock:
+                        if id(connection) in lent:
+                            errors.append('connection lent twice')
+                        lent.add(id(connection))
+                    time.sleep(0.0005)
+                    with lock:
+                        lent.discard(id(connection))
+                    pool.release(connection)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target = borrow) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(self.driver.connections), 3)
+        self.assertEqual(pool.stats()['checkouts'], 400)
+
+
+class PooledMySQLBackendTests(SimpleTestCase):
+    """common.db.mysql against a fake driver: no MySQL server needed."""
+
+    def setUp(self):
+        self.driver = FakeDriver()
+        patcher = mock.patch.object(pooled_mysql.Database, 'connect', self.driver.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(close_pools)
+        self.handler = self.make_handler({'min_size': 1, 'max_size': 2, 'timeout': 0.05})
+
+    @staticmethod
+    def make_handler(pool_options, conn_max_age: int = 0) -> ConnectionHandler:
+        return ConnectionHandler({
+            'default': {'ENGINE': 'django.db.backends.dummy'},
+            'pooled': {
+                'ENGINE': 'common.db.mysql',
+                'NAME': 'contra', 'USER': 'contra', 'HOST': '127.0.0.1',
+                'OPTIONS': {'pool': pool_options},
+                'CONN_MAX_AGE': conn_max_age,
+            },
+        })
+
+    def open(self, wrapper):
+        # connect() without init_connection_state's queries
+        wrapper.connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        wrapper.autocommit = True
+        return wrapper.connection
+
+    def test_threads_share_one_pool(self):
+        # One wrapper per thread, as django.db.connections would hand out
+        first = self.handler.create_connection('pooled')
+        second = self.handler.create_connection('pooled')
+        self.assertIs(first.pool, second.pool)
+        self.assertNotIn('pool', first.get_connection_params())
+        connection = self.open(first)
+        first.close()
+        self.assertIsNone(first.connection)
+        self.assertIs(self.open(second), connection)
+        self.assertFalse(connection.closed)
+        self.assertEqual(len(self.driver.connections), 1)
+
+    def test_exhausted_pool_raises_operational_error(self):
+        wrappers = [self.handler.create_connection('pooled') for _ in range(3)]
+        self.open(wrappers[0])
+        self.open(wrappers[1])
+        with self.assertRaises(OperationalError):
+            wrappers[2].ensure_connection()
+
+    def test_connection_left_in_transaction_is_discarded(self):
+        wrapper = self.handler.create_connection('pooled')
+        connection = self.open(wrapper)
+        wrapper.autocommit = False
+        wrapper.close()
+        self.assertTrue(connection.closed)
+        self.assertEqual(wrapper.pool.stats()['discarded'], 1)
+
+    def test_pool_requires_conn_max_age_zero(self):
+        handler = self.make_handler(True, conn_max_age = 60)
+        with self.assertRaises(ImproperlyConfigured):
+            handler.create_connection('pooled')
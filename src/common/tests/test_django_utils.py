@@ -0,0 +1,154 @@
+import threading
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.shortcuts import render
+from django.test import RequestFactory, TestCase, override_settings
+
+from account.models import CustomUser
+from common.django_utils import _arun_template, astream_render
+from writer.models import Article
+
+LOCMEM_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {
+        'loaders': [('django.template.loaders.locmem.Loader', {
+            'page.html': '<head>{% if items %}{{ streamed_items }}{% else %}empty{% endif %}<tail>',
+            'item.html': '[{{ item }}]',
+            'user.html': '{{ user.email }}',
+        })],
+        'context_processors': ['django.contrib.auth.context_processors.auth'],
+    },
+}]
+
+
+class Consumption:
+    """Items that log when they're read."""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.read: list[int] = []
+
+    def __iter__(self):
+        for i in range(self.count):
+            self.read.append(i)
+            yield i
+
+
+async def stream_chunks(response) -> list[str]:
+    return [chunk.decode() async for chunk in response.streaming_content]
+
+
+@override_settings(TEMPLATES = LOCMEM_TEMPLATES, RENDER_MODE = 'shared')
+class StreamRenderTests(TestCase):
+    def render(self, items, has_items: bool = True, **kwargs):
+        return async_to_sync(astream_render)(
+            RequestFactory().get('/'), 'page.html', {'items': has_items},
+            items = items, item_template = 'item.html', item_name = 'item', **kwargs,
+        )
+
+    def test_items_are_sent_in_chunks(self):
+        response = self.render(range(45), chunk_size = 20)
+        chunks = async_to_sync(stream_chunks)(response)
+        self.assertEqual(chunks[0], '<head>')
+        self.assertEqual([chunk.count('[') for chunk in chunks[1:-1]], [20, 20, 5])
+        self.assertEqual(chunks[-1], '<tail>')
+        self.assertEqual(''.join(chunks[1:-1]), ''.join(f'[{i}]' for i in range(45)))
+
+    def test_page_head_comes_before_any_item_is_read(self):
+        items = Consumption(3)
+        response = self.render(items, chunk_size = 2)
+
+        async def first_then_rest():
+            stream = aiter(response.streaming_content)
+            head = await anext(stream)
+            read_before = list(items.read)
+            return head, read_before, [chunk async for chunk in stream]
+
+        head, read_before, rest = async_to_sync(first_then_rest)()
+        self.assertEqual((head, read_before), (b'<head>', []))
+        self.assertEqual(rest, [b'[0][1]', b'[2]', b'<tail>'])
+
+    def test_empty_state_never_touches_the_items(self):
+        items = Consumption(3)
+        chunks = async_to_sync(stream_chunks)(self.render(items, has_items = False))
+        self.assertEqual(''.join(chunks), '<head>empty<tail>')
+        self.assertEqual(items.read, [])
+
+        queryset = Article.objects.all()
+        with self.assertNumQueries(0):
+            chunks = async_to_sync(stream_chunks)(self.render(queryset, has_items = False))
+        self.assertEqual(''.join(chunks), '<head>empty<tail>')
+        self.assertIsNone(queryset._result_cache)
+
+    def test_querysets_are_read_in_chunks(self):
+        writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        for i in range(3):
+            Article.objects.create(title = f'T{i}', content = 'Body', user = writer)
+        queryset = Article.objects.order_by('id').values_list('title', flat = True)
+        chunks = async_to_sync(stream_chunks)(self.render(queryset, chunk_size = 2))
+        self.assertEqual(chunks, ['<head>', '[T0][T1]', '[T2]', '<tail>'])
+
+
+@override_settings(TEMPLATES = LOCMEM_TEMPLATES)
+class RenderModeTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('reader@example.com', 'passwd')
+        self.request = RequestFactory().get('/')
+        self.request.session = SessionStore()
+        self.request.session[SESSION_KEY] = str(self.user.pk)
+        self.request.session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        self.request.session[HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+        AuthenticationMiddleware(lambda request: None).process_request(self.request)
+
+    def render_in(self, mode: str) -> tuple[dict, dict]:
+        """Renders user.html in `mode`; returns where the event loop and the render ran."""
+        loop, rendered = {}, {}
+
+        def render_fn(request):
+            rendered['thread'] = threading.current_thread()
+            rendered['queries'] = []
+            with connection.execute_wrapper(
+                lambda execute, sql, *args: rendered['queries'].append(sql) or execute(sql, *args),
+            ):
+                response = render(request, 'user.html')
+            rendered['content'] = response.content
+            return response
+
+        async def run():
+            loop['thread'] = threading.current_thread()
+            return await _arun_template(render_fn, self.request, render_mode = mode)
+
+        async_to_sync(run)()
+        return loop, rendered
+
+    def test_unknown_mode_raises(self):
+        with self.assertRaises(ValueError):
+            async_to_sync(_arun_template)(render, self.request, 'user.html', render_mode = 'threads')
+        with override_settings(RENDER_MODE = 'threads'), self.assertRaises(ValueError):
+            async_to_sync(_arun_template)(render, self.request, 'user.html')
+
+    def test_shared_renders_on_the_sync_to_async_thread(self):
+        loop, rendered = self.render_in('shared')
+        self.assertIs(rendered['thread'], threading.main_thread())
+        self.assertEqual(rendered['content'], self.user.email.encode())
+
+    def test_pool_renders_on_the_render_executor_with_the_user_loaded(self):
+        loop, rendered = self.render_in('pool')
+        self.assertTrue(rendered['thread'].name.startswith('render'))
+        self.assertEqual(rendered['queries'], [])
+        self.assertEqual(rendered['content'], self.user.email.encode())
+
+    def test_inline_renders_on_the_event_loop(self):
+        loop, rendered = self.render_in('inline')
+        self.assertIs(rendered['thread'], loop['thread'])
+        self.assertEqual(rendered['queries'], [])
+        self.assertEqual(rendered['content'], self.user.email.encode())
+
+    def test_setting_picks_the_mode(self):
+        with override_settings(RENDER_MODE = 'inline'):
+            loop, rendered = self.render_in(None)
+        self.assertIs(rendered['thread'], loop['thread'])
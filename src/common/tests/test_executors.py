@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase
+from django.utils import translation
+
+from common.executors import BoundedExecutor
+
+
+class CancelledJobTests(SimpleTestCase):
+    """A caller that goes away while its job is queued must free the slot."""
+
+    def test_cancelled_queued_jobs_give_back_their_slots(self):
+        executor = BoundedExecutor('test', workers = 1, queue_limit = 2)
+        self.addCleanup(executor.shutdown)
+        ran = []
+
+        async def scenario():
+            for attempt in range(3):
+                busy = threading.Event()
+                started = threading.Event()
+                blocker = asyncio.ensure_future(executor.run(lambda: (started.set(), busy.wait(5))))
+                await asyncio.to_thread(started.wait, 5)
+                waiting = asyncio.ensure_future(executor.run(ran.append, attempt))
+                await asyncio.sleep(0.01)
+                waiting.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await waiting
+                busy.set()
+                await blocker
+            # Still admits jobs after more cancellations than queue_limit
+            return await executor.run(lambda: 'ok')
+
+        self.assertEqual(asyncio.run(scenario()), 'ok')
+        self.assertEqual(ran, [])
+        stats = executor.stats()
+        self.assertEqual((stats['queued'], stats['running'], stats['cancelled']), (0, 0, 3))
+
+    def test_cancelled_job_on_the_shared_thread_gives_back_its_slot(self):
+        executor = BoundedExecutor('test', workers = 0, queue_limit = 1)
+        ran = []
+
+        async def scenario():
+            busy = threading.Event()
+            started = threading.Event()
+            blocker = asyncio.ensure_future(sync_to_async(lambda: (started.set(), busy.wait(5)))())
+            await asyncio.to_thread(started.wait, 5)
+            waiting = asyncio.ensure_future(executor.run(ran.append, 1))
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            busy.set()
+            await blocker
+            return await executor.run(lambda: 'ok')
+
+        self.assertEqual(asyncio.run(scenario()), 'ok')
+        self.assertEqual(ran, [])
+        self.assertEqual(executor.stats()['queued'], 0)
+
+
+class JobContextTests(SimpleTestCase):
+    def test_job_runs_under_the_callers_language(self):
+        executor = BoundedExecutor('test', workers = 1, queue_limit = 4)
+        self.addCleanup(executor.shutdown)
+
+        async def scenario():
+            with translation.override('pt'):
+                return await executor.run(translation.get_language)
+
+        self.assertEqual(asyncio.run(scenario()), 'pt')
@@ -0,0 +1,82 @@
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.messages.storage import default_storage
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from account.models import CustomUser
+from common.django_utils import add_message
+
+
+class CookieFirstMessagesTests(TestCase):
+    """MESSAGE_STORAGE keeps messages in a cookie, spilling to the session."""
+
+    def setUp(self):
+        self.session = SessionStore()
+
+    def request(self, cookies: dict | None = None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        request.session = self.session
+        request._messages = default_storage(request)
+        return request
+
+    def redirect_with(self, *texts: str) -> dict:
+        """Adds `texts` as messages and stores them; returns the cookies set."""
+        request = self.request()
+        for text in texts:
+            async_to_sync(add_message)(request, messages.INFO, text)
+        response = HttpResponse(status = 302)
+        request._messages.update(response)
+        return {name: morsel.value for name, morsel in response.cookies.items()}
+
+    def shown(self, cookies: dict) -> list[str]:
+        return [message.message for message in self.request(cookies)._messages]
+
+    def test_message_storage_is_cookie_first(self):
+        self.assertEqual(settings.MESSAGE_STORAGE, 'django.contrib.messages.storage.fallback.FallbackStorage')
+
+    def test_messages_that_fit_stay_out_of_the_session(self):
+        cookies = self.redirect_with('Saved', 'Also saved')
+        self.assertIn(CookieStorage.cookie_name, cookies)
+        self.assertFalse(self.session.accessed)
+        self.assertEqual(self.shown(cookies), ['Saved', 'Also saved'])
+
+    def test_messages_that_dont_fit_go_to_the_session(self):
+        # Digits of an LCG: long and incompressible, unlike repeated text
+        texts = [''.join(str((i * 7919 + j * 104729) % 10007) for j in range(1000)) for i in range(3)]
+        cookies = self.redirect_with(*texts)
+        self.assertTrue(self.session.modified)
+        self.assertIn('_messages', self.session)
+        self.assertEqual(self.shown(cookies), texts)
+
+    def test_add_message_only_queues(self):
+        request = self.request()
+        async_to_sync(add_message)(request, messages.WARNING, 'Queued', extra_tags = 'note')
+        (message,) = request._messages._queued_messages
+        self.assertEqual((message.level, message.message, message.extra_tags), (messages.WARNING, 'Queued', 'note'))
+        self.assertFalse(self.session.accessed)
+
+
+class MessagesAcrossRedirectTests(TestCase):
+    def test_form_message_survives_the_redirect_without_session_writes(self):
+        user = CustomUser.objects.create_user('reader@example.com', 'passwd', first_name = 'Ann', last_name = 'Reader')
+        self.client.force_login(user)
+        # Stores what the page keeps in the session (the entitlement claim)
+        self.client.get(reverse('update-client'))
+        form = {'email': user.email, 'first_name': 'Anne', 'last_name': user.last_name}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('update-client'), form, follow = True)
+        self.assertContains(response, 'User updated successfully')
+        session_writes = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('UPDATE', 'INSERT')) and 'django_session' in query['sql']
+        ]
+        self.assertEqual(session_writes, [])
+        self.assertNotContains(self.client.get(reverse('update-client')), 'User updated successfully')
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import secrets
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.middleware import csrf
+from django.shortcuts import redirect
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.urls import path
+
+from account.models import CustomUser
+from common.auth import aget_user
+from common.django_utils import add_message
+from contra.middleware import SessionManagementMiddleware
+
+STYLES = Path(settings.BASE_DIR) / 'static' / 'css' / 'styles.css'
+
+
+async def form_view(request):
+    # Sets the CSRF cookie
+    csrf.get_token(request)
+    return HttpResponse(f"{request.method} {request.POST.get('name', '')}")
+
+
+async def flash_view(request):
+    for i in range(int(request.GET.get('count', 1))):
+        # Random, so the cookie storage can't compress it away
+        await add_message(request, messages.INFO, f'{i}:' + secrets.token_hex(int(request.GET.get('size', 5))))
+    return redirect('/show/')
+
+
+async def show_view(request):
+    return HttpResponse('\n'.join(message.message for message in messages.get_messages(request)))
+
+
+urlpatterns = [
+    path('form/', form_view),
+    path('flash/', flash_view),
+    path('show/', show_view),
+]
+
+
+@override_settings(ROOT_URLCONF = __name__)
+class AsyncMiddlewareChainTests(TestCase):
+    """The common.middleware classes, in async mode behind an ASGI handler."""
+
+    def test_chain_runs_without_adapters(self):
+        logger = logging.getLogger('django.request')
+        with self.assertLogs(logger, 'DEBUG') as logs:
+            logger.debug('loaded')
+            ASGIHandler()
+        self.assertFalse([line for line in logs.output if 'adapted for middleware' in line])
+
+    async def test_post_without_csrf_token_is_forbidden(self):
+        client = AsyncClient(enforce_csrf_checks = True)
+        response = await client.post('/form/', {'name': 'a'})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_post_with_csrf_token_is_accepted(self):
+        client = AsyncClient(enforce_csrf_checks = True)
+        await client.get('/form/')
+        token = client.cookies[settings.CSRF_COOKIE_NAME].value
+        response = await client.post('/form/', {'name': 'a', 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.content, b'POST a')
+
+    async def test_multipart_token_is_parsed_off_the_event_loop(self):
+        client = AsyncClient(enforce_csrf_checks = True)
+        await client.get('/form/')
+        token = client.cookies[settings.CSRF_COOKIE_NAME].value
+        on_loop = []
+        original = csrf.CsrfViewMiddleware._check_token
+
+        def check_token(middleware, request):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(request.content_type)
+            except RuntimeError:
+                pass
+            return original(middleware, request)
+
+        with mock.patch.object(csrf.CsrfViewMiddleware, '_check_token', check_token):
+            # AsyncClient posts multipart by default
+            response = await client.post('/form/', {'name': 'a', 'csrfmiddlewaretoken': token})
+            self.assertEqual(response.content, b'POST a')
+            response = await client.post(
+                '/form/', f'name=b&csrfmiddlewaretoken={token}',
+                content_type = 'application/x-www-form-urlencoded',
+            )
+            self.assertEqual(response.content, b'POST b')
+        self.assertEqual(on_loop, ['application/x-www-form-urlencoded'])
+
+    async def test_messages_in_the_cookie_survive_a_redirect(self):
+        client = AsyncClient()
+        response = await client.get('/flash/?count=2')
+        self.assertIn('messages', response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        response = await client.get(response['Location'])
+        self.assertEqual([line[:2] for line in response.content.decode().split('\n')], ['0:', '1:'])
+        # Shown once
+        self.assertEqual((await client.get('/show/')).content, b'')
+
+    async def test_messages_overflowing_to_the_session_survive_a_redirect(self):
+        client = AsyncClient()
+        response = await client.get('/flash/?count=3&size=1000')
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        response = await client.get(response['Location'])
+        self.assertEqual(
+            [line[:2] for line in response.content.decode().split('\n')],
+            ['0:', '1:', '2:'],
+        )
+        self.assertEqual((await client.get('/show/')).content, b'')
+
+    async def test_append_slash_redirect(self):
+        response = await AsyncClient().get('/show')
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], '/show/')
+
+    async def test_security_headers(self):
+        response = await AsyncClient().get('/show/')
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+
+@override_settings(ROOT_URLCONF = __name__, WHITENOISE_USE_FINDERS = True)
+class WhiteNoiseMiddlewareTests(TestCase):
+    async def assert_serves_styles(self):
+        response = await AsyncClient().get('/static/css/styles.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), STYLES.read_bytes())
+        # Anything else goes on down the chain
+        self.assertEqual((await AsyncClient().get('/show/')).status_code, 200)
+
+    @override_settings(WHITENOISE_AUTOREFRESH = False)
+    async def test_serves_files_known_at_startup(self):
+        await self.assert_serves_styles()
+
+    @override_settings(WHITENOISE_AUTOREFRESH = True)
+    async def test_serves_files_looked_up_on_disk(self):
+        await self.assert_serves_styles()
+
+
+class SessionManagementMiddlewareTests(TestCase):
+    """A user left on the request by a session that no longer has it is logged out."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('reader@example.com', 'passwd')
+
+    def orphaned_request(self):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        request.session['plan'] = 'ST'
+        request.user = request._cached_user = self.user
+        return request
+
+    def test_sync(self):
+        seen = []
+        middleware = SessionManagementMiddleware(lambda request: seen.append(request.user) or HttpResponse())
+        request = self.orphaned_request()
+        response = middleware(request)
+        self.assertIsInstance(seen[0], AnonymousUser)
+        self.assertNotIn('plan', request.session)
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+    async def test_async(self):
+        seen = []
+
+        async def view(request):
+            seen.extend([request.user, await aget_user(request)])
+            return HttpResponse()
+
+        middleware = SessionManagementMiddleware(view)
+        request = self.orphaned_request()
+        response = await middleware(request)
+        self.assertIsInstance(seen[0], AnonymousUser)
+        self.assertIsInstance(seen[1], AnonymousUser)
+        self.assertFalse(await request.session.ahas_key('plan'))
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+    async def test_valid_session_is_left_alone(self):
+        request = self.orphaned_request()
+        await request.session.aset('_auth_user_id', str(self.user.pk))
+
+        async def view(request):
+            return HttpResponse()
+
+        await SessionManagementMiddleware(view)(request)
+        self.assertIs(request.user, self.user)
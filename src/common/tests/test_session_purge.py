@@ -0,0 +1,122 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from common.sessions.purge import PurgeResult, SessionPurger, purge_expired_sessions
+
+
+class PurgeExpiredSessionsTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(
+                session_key = f'expired{i}', session_data = '', expire_date = now - timedelta(minutes = i + 1),
+            )
+        for i in range(2):
+            Session.objects.create(
+                session_key = f'live{i}', session_data = '', expire_date = now + timedelta(hours = 1),
+            )
+
+    def remaining(self) -> set[str]:
+        return set(Session.objects.values_list('session_key', flat = True))
+
+    def test_deletes_expired_rows_in_batches(self):
+        batches = []
+        result = purge_expired_sessions(2, 0, on_batch = lambda progress: batches.append(progress.rows))
+        self.assertEqual((result.rows, result.batches), (5, 3))
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertEqual(self.remaining(), {'live0', 'live1'})
+
+    def test_stops_after_max_batches(self):
+        result = purge_expired_sessions(2, 0, max_batches = 2)
+        self.assertEqual((result.rows, result.batches), (4, 2))
+        self.assertEqual(len(self.remaining() - {'live0', 'live1'}), 1)
+
+    def test_a_full_last_batch_checks_for_more(self):
+        result = purge_expired_sessions(5, 0)
+        # The second batch finds nothing and isn't counted
+        self.assertEqual((result.rows, result.batches), (5, 1))
+        self.assertEqual(self.remaining(), {'live0', 'live1'})
+
+    def test_pauses_between_batches_only(self):
+        with mock.patch('common.sessions.purge.time.sleep') as sleep:
+            purge_expired_sessions(2, 0.5)
+        self.assertEqual(sleep.call_args_list, [mock.call(0.5)] * 2)
+
+    def test_nothing_to_delete(self):
+        Session.objects.filter(session_key__startswith = 'expired').delete()
+        self.assertEqual(purge_expired_sessions(2, 0), PurgeResult(seconds = mock.ANY))
+        self.assertEqual(self.remaining(), {'live0', 'live1'})
+
+    def test_clearsessions_command(self):
+        out = StringIO()
+        call_command('clearsessions', batch_size = 2, pause = 0, max_batches = 1, stdout = out)
+        self.assertIn('Deleted 2 expired sessions in 1 batches', out.getvalue())
+        call_command('clearsessions', batch_size = 2, pause = 0, stdout = out)
+        self.assertEqual(self.remaining(), {'live0', 'live1'})
+
+
+class SessionPurgerTests(TestCase):
+    def setUp(self):
+        self.purger = SessionPurger()
+        self.clock = 1000.0
+        patches = (
+            mock.patch('common.sessions.purge.time.monotonic', lambda: self.clock),
+            mock.patch('common.sessions.purge.threading.Thread'),
+        )
+        self.thread = patches[1].start()
+        patches[0].start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def finish(self):
+        """Runs the purge the last maybe_start handed to a thread."""
+        self.thread.call_args.kwargs['target']()
+
+    @override_settings(SESSION_PURGE_INTERVAL = 0)
+    def test_off_by_default_setting(self):
+        self.assertFalse(self.purger.maybe_start())
+        self.thread.assert_not_called()
+
+    @override_settings(SESSION_PURGE_INTERVAL = 60)
+    def test_starts_at_most_once_per_interval(self):
+        with mock.patch('common.sessions.purge.purge_expired_sessions', return_value = PurgeResult()) as purge:
+            self.assertTrue(self.purger.maybe_start())
+            self.finish()
+            self.clock += 59
+            self.assertFalse(self.purger.maybe_start())
+            self.clock += 1
+            self.assertTrue(self.purger.maybe_start())
+            self.finish()
+        self.assertEqual(self.thread.call_count, 2)
+        self.assertEqual(purge.call_count, 2)
+
+    @override_settings(SESSION_PURGE_INTERVAL = 60)
+    def test_no_second_purge_while_one_runs(self):
+        self.assertTrue(self.purger.maybe_start())
+        self.clock += 120
+        self.assertFalse(self.purger.maybe_start())
+        with mock.patch('common.sessions.purge.purge_expired_sessions', side_effect = RuntimeError):
+            with self.assertLogs('common.sessions.purge', 'ERROR'):
+                self.finish()
+        # A failed purge doesn't keep later ones from starting
+        self.clock += 60
+        self.assertTrue(self.purger.maybe_start())
+
+    @override_settings(
+        SESSION_PURGE_INTERVAL = 60, SESSION_PURGE_BATCH_SIZE = 2,
+        SESSION_PURGE_PAUSE = 0, SESSION_PURGE_MAX_BATCHES = 1,
+    )
+    def test_background_purge_is_bounded(self):
+        now = timezone.now()
+        for i in range(3):
+            Session.objects.create(session_key = f'expired{i}', session_data = '', expire_date = now - timedelta(1))
+        self.purger.maybe_start()
+        with mock.patch('common.sessions.purge.close_old_connections'):
+            self.finish()
+        self.assertEqual(Session.objects.count(), 1)
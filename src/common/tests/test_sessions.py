@@ -0,0 +1,216 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from common.sessions import middleware, signed_cookies, tiered
+
+
+@override_settings(SESSION_L1_TTL = 60, SESSION_L1_MAX_ENTRIES = 100, SESSION_DATABASE_FALLBACK = True)
+class TieredSessionTests(TestCase):
+    def setUp(self):
+        self.shared = caches[settings.SESSION_CACHE_ALIAS]
+        self.shared.clear()
+        tiered.local_tier.clear()
+        self.addCleanup(tiered.local_tier.clear)
+
+    def saved_session(self, **data) -> tiered.SessionStore:
+        session = tiered.SessionStore()
+        session.update(data)
+        session.save()
+        return session
+
+    def test_reads_come_from_the_local_tier_first(self):
+        session = self.saved_session(plan = 'ST')
+        # Gone from the shared cache, still in this process
+        self.shared.delete(session.cache_key)
+        self.assertEqual(tiered.SessionStore(session.session_key)['plan'], 'ST')
+
+    def test_local_miss_falls_through_to_the_shared_cache(self):
+        session = self.saved_session(plan = 'ST')
+        tiered.local_tier.clear()
+        self.assertEqual(tiered.SessionStore(session.session_key)['plan'], 'ST')
+        # ... and refills the local tier
+        self.shared.delete(session.cache_key)
+        self.assertEqual(tiered.SessionStore(session.session_key)['plan'], 'ST')
+
+    def test_local_entries_expire(self):
+        session = self.saved_session(plan = 'ST')
+        self.shared.delete(session.cache_key)
+        # An entry past its expiry time is neither served nor kept
+        tiered.local_tier._entries[session.cache_key] = (0, {'plan': 'ST'})
+        self.assertNotIn('plan', tiered.SessionStore(session.session_key))
+        self.assertNotIn(session.cache_key, tiered.local_tier._entries)
+
+    def test_loaded_data_is_a_copy(self):
+        session = self.saved_session(tags = ['a'])
+        loaded = tiered.SessionStore(session.session_key)
+        loaded['tags'].append('b')
+        self.assertEqual(tiered.SessionStore(session.session_key)['tags'], ['a'])
+
+    def test_flush_invalidates_both_tiers(self):
+        session = self.saved_session(plan = 'ST')
+        key, cache_key = session.session_key, session.cache_key
+        session.flush()
+        self.assertIsNone(tiered.local_tier.get(cache_key))
+        self.assertIsNone(self.shared.get(cache_key))
+        self.assertEqual(dict(tiered.SessionStore(key).items()), {})
+
+    def test_async_flush_invalidates_both_tiers(self):
+        @async_to_sync
+        async def scenario():
+            session = tiered.SessionStore()
+            await session.aset('plan', 'ST')
+            await session.asave()
+            key, cache_key = session.session_key, await session.acache_key()
+            await session.aflush()
+            return key, cache_key
+
+        key, cache_key = scenario()
+        self.assertIsNone(tiered.local_tier.get(cache_key))
+        self.assertIsNone(self.shared.get(cache_key))
+        self.assertEqual(dict(tiered.SessionStore(key).items()), {})
+
+    def test_database_session_is_moved_over(self):
+        old = DatabaseSessionStore()
+        old['plan'] = 'PR'
+        old.create()
+        session = tiered.SessionStore(old.session_key)
+        self.assertEqual(session['plan'], 'PR')
+        self.assertFalse(Session.objects.filter(session_key = old.session_key).exists())
+        self.assertEqual(self.shared.get(session.cache_key), {'plan': 'PR'})
+
+    def test_local_tier_is_bounded(self):
+        with override_settings(SESSION_L1_MAX_ENTRIES = 2):
+            for i in range(3):
+                tiered.local_tier.set(f'key{i}', {'i': i})
+        self.assertIsNone(tiered.local_tier.get('key0'))
+        self.assertEqual(tiered.local_tier.get('key2'), {'i': 2})
+
+
+@override_settings(SESSION_DATABASE_FALLBACK = True)
+class SignedCookieSessionTests(TestCase):
+    def saved_session(self, **data) -> signed_cookies.SessionStore:
+        session = signed_cookies.SessionStore()
+        session.update(data)
+        session.save()
+        return session
+
+    def test_round_trip(self):
+        session = self.saved_session(plan = 'ST')
+        self.assertEqual(signed_cookies.SessionStore(session.session_key)['plan'], 'ST')
+
+    def test_tampered_cookie_is_rejected(self):
+        cookie = self.saved_session(plan = 'ST').session_key
+        payload, _, signature = cookie.rpartition(':')
+        tampered = {
+            'payload': payload[:-1] + ('A' if payload[-1] != 'A' else 'B') + ':' + signature,
+            'signature': payload + ':' + signature[:-1] + ('A' if signature[-1] != 'A' else 'B'),
+            'unsigned': payload,
+        }
+        for name, key in tampered.items():
+            with self.subTest(name):
+                self.assertEqual(dict(signed_cookies.SessionStore(key).items()), {})
+
+    def test_database_session_is_moved_over_and_reissued(self):
+        old = DatabaseSessionStore()
+        old['plan'] = 'PR'
+        old.create()
+        session = signed_cookies.SessionStore(old.session_key)
+        self.assertEqual(session['plan'], 'PR')
+        self.assertTrue(session.modified)
+        self.assertFalse(Session.objects.filter(session_key = old.session_key).exists())
+
+    @override_settings(SESSION_DATABASE_FALLBACK = False)
+    def test_database_fallback_can_be_turned_off(self):
+        old = DatabaseSessionStore()
+        old['plan'] = 'PR'
+        old.create()
+        self.assertEqual(dict(signed_cookies.SessionStore(old.session_key).items()), {})
+        self.assertTrue(Session.objects.filter(session_key = old.session_key).exists())
+
+
+@override_settings(
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db', SESSION_SAVE_EVERY_REQUEST = False,
+    SESSION_COOKIE_AGE = 1000, SESSION_REFRESH_FRACTION = 0.5,
+)
+class CoalescedSessionMiddlewareTests(TestCase):
+    STORED_AT = 1_000_000
+
+    def setUp(self):
+        session = DatabaseSessionStore()
+        session.update({'plan': 'ST', middleware.REFRESHED_AT_KEY: self.STORED_AT})
+        session.create()
+        self.session_key = session.session_key
+
+    def request(self, action: str, seconds_later: int, async_mode: bool = False) -> int:
+        """Runs a view that does `action` to the session; returns how often the session was written."""
+        def view(request):
+            if action == 'read':
+                request.session.get('plan')
+            elif action == 'change':
+                request.session['plan'] = 'PR'
+            return HttpResponse()
+
+        async def aview(request):
+            if action == 'read':
+                await request.session.aget('plan')
+            elif action == 'change':
+                await request.session.aset('plan', 'PR')
+            return HttpResponse()
+
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = self.session_key
+        handler = middleware.CoalescedSessionMiddleware(aview if async_mode else view)
+        clock = mock.patch('common.sessions.middleware.time.time', return_value = self.STORED_AT + seconds_later)
+        with clock, CaptureQueriesContext(connection) as queries:
+            async_to_sync(handler)(request) if async_mode else handler(request)
+        return sum(
+            query['sql'].startswith(('UPDATE', 'INSERT')) and 'django_session' in query['sql']
+            for query in queries
+        )
+
+    def stored(self) -> dict:
+        return DatabaseSessionStore(self.session_key).load()
+
+    def test_read_within_the_fraction_is_not_saved(self):
+        for async_mode in (False, True):
+            with self.subTest(async_mode = async_mode):
+                self.assertEqual(self.request('read', 499, async_mode), 0)
+                self.assertEqual(self.stored()[middleware.REFRESHED_AT_KEY], self.STORED_AT)
+
+    def test_read_after_the_fraction_is_saved(self):
+        for async_mode in (False, True):
+            with self.subTest(async_mode = async_mode):
+                self.setUp()
+                self.assertEqual(self.request('read', 500, async_mode), 1)
+                self.assertEqual(self.stored()[middleware.REFRESHED_AT_KEY], self.STORED_AT + 500)
+                # The window starts over
+                self.assertEqual(self.request('read', 600, async_mode), 0)
+
+    def test_change_is_saved_right_away(self):
+        for async_mode in (False, True):
+            with self.subTest(async_mode = async_mode):
+                self.setUp()
+                self.assertEqual(self.request('change', 1, async_mode), 1)
+                self.assertEqual(self.stored()['plan'], 'PR')
+                self.assertEqual(self.stored()[middleware.REFRESHED_AT_KEY], self.STORED_AT + 1)
+
+    def test_untouched_session_is_not_saved(self):
+        for async_mode in (False, True):
+            with self.subTest(async_mode = async_mode):
+                self.assertEqual(self.request('nothing', 999, async_mode), 0)
+
+    def test_refresh_is_decided_once_per_request(self):
+        for async_mode in (False, True):
+            with self.subTest(async_mode = async_mode):
+                with mock.patch.object(middleware, 'refresh_if_due', wraps = middleware.refresh_if_due) as refresh:
+                    self.request('read', 500, async_mode)
+                self.assertEqual(refresh.call_count, 1)
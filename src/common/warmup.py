@@ -0,0 +1,117 @@
+"""
+Work every process would otherwise do lazily on its first requests.
+
+`warm_up()` runs the steps named in WARMUP_STEPS, in order:
+
+- 'urls': imports every URLconf and view module and builds the resolver's
+  reverse lookup tables;
+- 'i18n': loads the translation catalogs of LANGUAGE_CODE;
+- 'templates': compiles the project's own templates (kept compiled by the
+  cached template loader, which Django uses whenever DEBUG is off);
+- 'plans': loads the subscription plan registry;
+- 'feed': loads the in-memory article feed and search index;
+- 'database': fills the connection pool of every pooled database
+  (common.db.mysql) to its min_size. Databases without a pool are
+  skipped: a connection opened here would belong to this thread, and
+  requests run on their own threads, so none of them would reuse it.
+
+A step that fails, or a name that isn't a step, is logged and skipped:
+whatever it would have loaded is still loaded on first use, as before.
+"""
+
+__all__ = (
+    'WARMUP_STEPS',
+    'warm_up',
+)
+
+import logging
+import time
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # Both properties populate the resolver's (and nested resolvers') caches
+    resolver.reverse_dict
+    resolver.app_dict
+
+
+def warm_i18n():
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('')
+
+
+def warm_templates():
+    base_dir = Path(settings.BASE_DIR).resolve()
+    for engine in engines.all():
+        dirs = [Path(d) for d in engine.dirs]
+        if getattr(engine, 'app_dirs', False):
+            dirs += [Path(d) for d in get_app_template_dirs(engine.app_dirname)]
+        for directory in dirs:
+            # Third-party templates are compiled when (and if) they're used
+            if not directory.resolve().is_relative_to(base_dir):
+                continue
+            for path in directory.rglob('*.html'):
+                engine.get_template(path.relative_to(directory).as_posix())
+
+
+def warm_plans():
+    from client.plans import plan_registry
+    plan_registry.load()
+
+
+def warm_feed():
+    from writer.feed_cache import feed_cache
+    from writer.search import search_index
+    feed_cache.load()
+    search_index.load()
+
+
+def warm_database():
+    for connection in connections.all():
+        if getattr(connection, 'pool', None) is None:
+            continue
+        connection.ensure_connection()
+        # Back to the pool, for the request threads
+        connection.close()
+
+
+WARMUP_STEPS: dict[str, Callable[[], None]] = {
+    'urls': warm_urls,
+    'i18n': warm_i18n,
+    'templates': warm_templates,
+    'plans': warm_plans,
+    'feed': warm_feed,
+    'database': warm_database,
+}
+
+
+def warm_up(steps: list[str] | None = None) -> dict[str, float]:
+    """Runs `steps` (WARMUP_STEPS by default); returns the seconds each took."""
+    timings = {}
+    for name in settings.WARMUP_STEPS if steps is None else steps:
+        if name not in WARMUP_STEPS:
+            logger.error("Unknown warm-up step '%s'", name)
+            continue
+        started = time.perf_counter()
+        try:
+            WARMUP_STEPS[name]()
+        except Exception:
+            logger.exception("Warm-up step '%s' failed", name)
+            continue
+        timings[name] = time.perf_counter() - started
+    logger.info(
+        'Warm-up done: %s',
+        ', '.join(f'{name} {seconds * 1000:.0f}ms' for name, seconds in timings.items()),
+    )
+    return timings
@@ -2,6 +2,8 @@
 ASGI config for contra project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is the production entry point (see README, "Production (ASGI)"): the
+Django application wrapped so that each worker warms up on lifespan startup.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -17,4 +19,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'contra.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importado depois do setup do Django (get_asgi_application)
+from common.asgi import LifespanApplication  # noqa: E402
+
+application = LifespanApplication(django_application)
@@ -6,9 +6,13 @@ import os
 import sys
 import traceback
 import pymysql
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.db import connections
 from django.conf import settings
 
+from common.auth import aget_user, alogout, logout
+from common.sessions.purge import session_purger
+
 # Mapeamento básico das tabelas e colunas necessárias
 REQUIRED_COLUMNS = {
     "django_session": [
@@ -121,35 +125,89 @@ def check_and_fix_database():
     _database_checked = True
 
 class DatabaseFixMiddleware:
-    """Middleware para verificar e corrigir o banco de dados"""
+    """
+    Middleware para verificar e corrigir o banco de dados.
+
+    Funciona em modo síncrono e assíncrono (sem mudança de thread por pedido
+    sob ASGI); depois da primeira verificação é apenas uma passagem.
+    """
+    sync_capable = True
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
     
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
         # Verificar e corrigir o banco de dados antes de processar a requisição
         check_and_fix_database()
         
         # Continuar com o processamento normal
         return self.get_response(request)
 
+    async def __acall__(self, request):
+        # Só a primeira requisição precisa de sair do event loop
+        if not _database_checked:
+            await sync_to_async(check_and_fix_database)()
+        return await self.get_response(request)
+
 class SessionManagementMiddleware:
     """
     Middleware para gerenciar sessões e garantir que o logout seja completo.
     
     Este middleware:
     1. Verifica se a sessão está válida
-    2. Limpa sessões expiradas periodicamente
+    2. Limpa sessões expiradas periodicamente, se SESSION_PURGE_INTERVAL > 0
+       (em segundo plano, em lotes; ver common.sessions.purge)
     3. Garante que os cabeçalhos de segurança sejam aplicados em todas as respostas
+
+    Funciona em modo síncrono e assíncrono. A verificação da sessão é feita
+    antes de chamar a view (e não num process_view síncrono, que sob ASGI
+    obrigaria a mudar de thread em cada pedido); em modo assíncrono usa o
+    utilizador já carregado por `common.auth.aget_user`, que as views reutilizam.
     """
+    sync_capable = True
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
     
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        # Lançar a limpeza de sessões expiradas, se ativa e já estiver na hora
+        session_purger.maybe_start()
+
+        # Verificar se o usuário está autenticado mas a sessão está inválida
+        if request.user.is_authenticated and not request.session.get('_auth_user_id'):
+            # Forçar logout se a sessão estiver inválida
+            logout(request)
+
         # Processar a requisição
         response = self.get_response(request)
-        
+        return self.add_headers(request, response)
+
+    async def __acall__(self, request):
+        session_purger.maybe_start()
+
+        user = await aget_user(request)
+        if user.is_authenticated and not await request.session.aget('_auth_user_id'):
+            await alogout(request)
+
+        response = await self.get_response(request)
+        return self.add_headers(request, response)
+
+    @staticmethod
+    def add_headers(request, response):
         # Adicionar cabeçalhos de segurança a todas as respostas
         response['X-Content-Type-Options'] = 'nosniff'
         response['X-XSS-Protection'] = '1; mode=block'
@@ -163,11 +221,3 @@ class SessionManagementMiddleware:
             response['Expires'] = '0'
         
         return response
-    
-    def process_view(self, request, view_func, view_args, view_kwargs):
-        # Verificar se o usuário está autenticado mas a sessão está inválida
-        if request.user.is_authenticated and not request.session.get('_auth_user_id'):
-            # Forçar logout se a sessão estiver inválida
-            from django.contrib.auth import logout
-            logout(request)
-        return None 
\ No newline at end of file
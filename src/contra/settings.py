@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'account.apps.AccountConfig', # poderia ser apenas 'account'
     'client.apps.ClientConfig', # poderia ser apenas 'client'
     'writer.apps.WriterConfig', # poderia ser apenas 'writer'
+    'common.apps.CommonConfig', # comandos de gestão e motores de sessão partilhados
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -71,14 +72,16 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 AUTH_USER_MODEL = 'account.CustomUser'
 
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Middleware do Django (e WhiteNoise) com hooks assíncronos que não mudam
+    # de thread; sob ASGI toda a cadeia corre no event loop (ver common.middleware)
+    'common.middleware.SecurityMiddleware',
+    'common.middleware.WhiteNoiseMiddleware',
+    'common.sessions.middleware.CoalescedSessionMiddleware',  # SessionMiddleware que só renova a expiração de vez em quando
+    'common.middleware.CommonMiddleware',
+    'common.middleware.CsrfViewMiddleware',
+    'common.middleware.AuthenticationMiddleware',
+    'common.middleware.MessageMiddleware',
+    'common.middleware.XFrameOptionsMiddleware',
     'contra.middleware.DatabaseFixMiddleware',  # Middleware para corrigir o banco de dados
     'contra.middleware.SessionManagementMiddleware',  # Middleware para gerenciar sessões
 ]
@@ -87,7 +90,9 @@ SECURE_CROSS_ORIGIN_OPENER_POLICY = 'same-origin-allow-popups'
 
 ROOT_URLCONF = 'contra.urls'
 
-MESSAGE_STORAGE = 'django.contrib.messages.storage.session.SessionStorage'
+# Mensagens flash primeiro num cookie assinado; só as que não cabem no cookie
+# vão para a sessão (evita uma gravação da sessão por mensagem)
+MESSAGE_STORAGE = 'django.contrib.messages.storage.fallback.FallbackStorage'
 
 TEMPLATES = [
     {
@@ -114,12 +119,30 @@ WSGI_APPLICATION = 'contra.wsgi.application'
 # Configurações de banco de dados
 USE_MYSQL = config('USE_MYSQL', default=False, cast=bool)
 
+# Pool de ligações MySQL partilhado por todas as threads do processo
+# (common.db.mysql): cada pedido ou trabalho de um executor pede uma ligação
+# emprestada e devolve-a no fim, em vez de cada thread abrir a sua
+MYSQL_POOL = config('MYSQL_POOL', default=True, cast=bool)
+MYSQL_POOL_OPTIONS = {
+    # Ligações abertas no arranque (warm-up) e mantidas
+    'min_size': config('MYSQL_POOL_MIN_SIZE', default=1, cast=int),
+    # Máximo de ligações abertas ao mesmo tempo neste processo
+    'max_size': config('MYSQL_POOL_MAX_SIZE', default=10, cast=int),
+    # Segundos até uma ligação ser fechada e substituída (abaixo do
+    # wait_timeout do servidor)
+    'recycle': config('MYSQL_POOL_RECYCLE', default=1800, cast=int),
+    # Uma ligação parada há mais destes segundos leva um ping antes de ser usada
+    'health_check_after': config('MYSQL_POOL_HEALTH_CHECK_AFTER', default=30, cast=int),
+    # Segundos à espera de uma ligação livre antes de dar erro
+    'timeout': config('MYSQL_POOL_TIMEOUT', default=5, cast=float),
+}
+
 # Configuração de bancos de dados
 if USE_MYSQL:
     print("Usando banco de dados MySQL")
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.mysql',
+            'ENGINE': 'common.db.mysql' if MYSQL_POOL else 'django.db.backends.mysql',
             'NAME': config('MYSQL_DATABASE'),
             'USER': config('MYSQL_USER'),
             'PASSWORD': config('MYSQL_PASSWORD'),
@@ -130,8 +153,10 @@ if USE_MYSQL:
                 'use_unicode': True,
                 'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
                 'connect_timeout': 60,
+                **({'pool': MYSQL_POOL_OPTIONS} if MYSQL_POOL else {}),
             },
-            'CONN_MAX_AGE': 60,
+            # Com o pool, as ligações são devolvidas no fim de cada pedido
+            'CONN_MAX_AGE': 0 if MYSQL_POOL else 60,
             'CONN_HEALTH_CHECKS': True,
         }
     }
@@ -213,6 +238,125 @@ PAYPAL_SECRET_ID : str = config('PAYPAL_SECRET_ID')
 PAYPAL_AUTH_URL : str = config('PAYPAL_AUTH_URL')
 PAYPAL_BILLING_SUBSCRIPTIONS_URL: str = config('PAYPAL_BILLING_SUBSCRIPTIONS_URL')
 
+########## ARTICLE FEED SETTINGS ##########
+
+# Número de artigos por página nas listagens (paginação por cursor)
+ARTICLES_PER_PAGE = config('ARTICLES_PER_PAGE', default=10, cast=int)
+
+# Tempo máximo (em segundos) que cada processo serve o feed em memória sem o
+# recarregar; cobre alterações feitas por outros workers
+FEED_CACHE_TTL = config('FEED_CACHE_TTL', default=60, cast=int)
+
+# Pesquisa de artigos: índice invertido em memória (BM25)
+SEARCH_INDEX_TTL = config('SEARCH_INDEX_TTL', default=300, cast=int)
+SEARCH_MAX_RESULTS = config('SEARCH_MAX_RESULTS', default=20, cast=int)
+
+# Corpo renderizado de cada artigo (a chave inclui a data de atualização)
+ARTICLE_BODY_CACHE_TIMEOUT = config('ARTICLE_BODY_CACHE_TIMEOUT', default=24 * 3600, cast=int)
+
+# Tamanho máximo de página pedido através de ?limit= na API JSON
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=100, cast=int)
+
+# Feeds RSS/Atom por plano de assinatura
+FEEDS_MAX_ITEMS = config('FEEDS_MAX_ITEMS', default=50, cast=int)
+FEED_XML_CACHE_TIMEOUT = config('FEED_XML_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Totais por escritor no dashboard (invalidados ao criar/alterar/apagar artigos)
+WRITER_TOTALS_CACHE_TIMEOUT = config('WRITER_TOTALS_CACHE_TIMEOUT', default=600, cast=int)
+
+########## TEMPLATE RENDERING SETTINGS ##########
+
+# Onde o arender corre os templates:
+#   'shared' -> thread partilhada do sync_to_async (um render de cada vez)
+#   'pool'   -> RENDER_WORKERS threads próprias; com a fila cheia volta à
+#               thread partilhada
+#   'inline' -> no próprio event loop (só templates sem acesso à base de dados)
+RENDER_MODE = config('RENDER_MODE', default='shared')
+RENDER_WORKERS = config('RENDER_WORKERS', default=4, cast=int)
+RENDER_QUEUE_LIMIT = config('RENDER_QUEUE_LIMIT', default=128, cast=int)
+
+########## ASGI WARM-UP SETTINGS ##########
+
+# Passos do warm-up corrido no arranque de cada worker ASGI (lifespan), ver
+# common.warmup: urls, i18n, templates, plans, feed, database
+WARMUP_STEPS = config('WARMUP_STEPS', default='urls,i18n,templates,plans,feed,database', cast=Csv())
+
+########## PASSWORD HASHING SETTINGS ##########
+
+# O hashing de palavras-passe (login, registo, alteração de palavra-passe)
+# corre num conjunto próprio de threads, para não bloquear a thread partilhada
+# do sync_to_async; pedidos além do limite da fila são recusados com um erro
+HASHING_WORKERS = config('HASHING_WORKERS', default=min(4, os.cpu_count() or 1), cast=int)
+HASHING_QUEUE_LIMIT = config('HASHING_QUEUE_LIMIT', default=64, cast=int)
+
+########## EXECUTOR SETTINGS ##########
+
+# Conjuntos de threads com nome (common.executors.executors), cada um com o
+# seu limite de fila, para que um tipo de trabalho lento não atrase os outros:
+#   'db'      -> ORM fora das chamadas assíncronas do Django (formulários,
+#                logout, recarregar planos/feed/pesquisa); com 0 threads usa
+#                a thread partilhada do sync_to_async. Com threads próprias,
+#                cada uma tem a sua ligação à base de dados e não vê
+#                transações ainda abertas noutras threads
+#   'render'  -> templates com RENDER_MODE='pool'
+#   'cpu'     -> trabalho só de CPU, sem base de dados (ex.: corpo dos artigos)
+#   'hashing' -> palavras-passe (ver acima)
+EXECUTOR_POOLS = {
+    'db': {
+        'workers': config('DB_EXECUTOR_WORKERS', default=0, cast=int),
+        'queue_limit': config('DB_EXECUTOR_QUEUE_LIMIT', default=256, cast=int),
+        'close_connections': True,
+    },
+    'render': {
+        'workers': RENDER_WORKERS,
+        'queue_limit': RENDER_QUEUE_LIMIT,
+        'close_connections': True,
+    },
+    'cpu': {
+        'workers': config('CPU_EXECUTOR_WORKERS', default=2, cast=int),
+        'queue_limit': config('CPU_EXECUTOR_QUEUE_LIMIT', default=64, cast=int),
+    },
+    'hashing': {
+        'workers': HASHING_WORKERS,
+        'queue_limit': HASHING_QUEUE_LIMIT,
+    },
+}
+
+########## LOGIN THROTTLING SETTINGS ##########
+
+# Limite de tentativas de login numa janela deslizante (em segundos), por IP
+# e por email; acima do limite o pedido é recusado antes de qualquer hashing
+LOGIN_THROTTLE_ENABLED = config('LOGIN_THROTTLE_ENABLED', default=True, cast=bool)
+LOGIN_THROTTLE_IP_LIMIT = config('LOGIN_THROTTLE_IP_LIMIT', default=20, cast=int)
+LOGIN_THROTTLE_IP_WINDOW = config('LOGIN_THROTTLE_IP_WINDOW', default=60, cast=int)
+LOGIN_THROTTLE_EMAIL_LIMIT = config('LOGIN_THROTTLE_EMAIL_LIMIT', default=5, cast=int)
+LOGIN_THROTTLE_EMAIL_WINDOW = config('LOGIN_THROTTLE_EMAIL_WINDOW', default=300, cast=int)
+
+# Cabeçalho de onde vem o IP do cliente (ex.: HTTP_X_FORWARDED_FOR atrás de
+# um proxy de confiança, como no Vercel)
+LOGIN_THROTTLE_IP_HEADER = config('LOGIN_THROTTLE_IP_HEADER', default='REMOTE_ADDR')
+# Número de proxies de confiança à frente da aplicação: o IP do cliente é a
+# entrada nesta posição a contar da direita do X-Forwarded-For (as entradas
+# mais à esquerda vêm do próprio cliente e podem ser forjadas)
+LOGIN_THROTTLE_TRUSTED_PROXIES = config('LOGIN_THROTTLE_TRUSTED_PROXIES', default=1, cast=int)
+
+# Vazio: contagens na memória de cada processo. Com o nome de uma cache
+# (ex.: 'default' com Redis) as contagens são partilhadas entre processos
+LOGIN_THROTTLE_CACHE_ALIAS = config('LOGIN_THROTTLE_CACHE_ALIAS', default='')
+
+########## SUBSCRIPTION PLAN SETTINGS ##########
+
+# Os planos ficam em memória em cada processo; são recarregados quando um
+# plano é alterado e, no máximo, após este tempo (em segundos)
+PLAN_REGISTRY_TTL = config('PLAN_REGISTRY_TTL', default=900, cast=int)
+# Um código de plano desconhecido só volta a ler a tabela se a última leitura
+# tiver mais de tantos segundos (o código vem do URL de create-subscription)
+PLAN_REGISTRY_MISS_RELOAD = config('PLAN_REGISTRY_MISS_RELOAD', default=10, cast=int)
+
+# Validade (em segundos) do plano/estado da assinatura guardado, assinado,
+# na sessão; depois disso é confirmado de novo na base de dados
+ENTITLEMENT_CLAIM_MAX_AGE = config('ENTITLEMENT_CLAIM_MAX_AGE', default=300, cast=int)
+
 ########## SESSION SETTINGS ##########
 
 # Configurações de sessão para melhorar a segurança
@@ -222,6 +366,50 @@ SESSION_COOKIE_SAMESITE = 'Lax'  # Proteção contra CSRF em navegadores moderno
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # Sessão expira ao fechar o navegador
 SESSION_COOKIE_AGE = 3600  # Sessão expira após 1 hora de inatividade (em segundos)
 
-# Configuração para armazenamento de sessão
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # Armazenar sessões no banco de dados
-SESSION_SAVE_EVERY_REQUEST = True  # Atualizar o cookie de sessão a cada requisição
\ No newline at end of file
+# Configuração para armazenamento de sessão:
+#   'db'             -> tabela django_session (um SELECT e um UPDATE por pedido)
+#   'cache'          -> memória do processo + cache partilhada (SESSION_CACHE_*)
+#   'signed_cookies' -> dados assinados no próprio cookie, sem armazenamento
+# Ao mudar de 'db' para outro motor as sessões ainda na base de dados são
+# migradas no primeiro acesso (SESSION_DATABASE_FALLBACK)
+SESSION_BACKEND = config('SESSION_BACKEND', default='db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'common.sessions.tiered',
+    'signed_cookies': 'common.sessions.signed_cookies',
+}[SESSION_BACKEND]
+SESSION_DATABASE_FALLBACK = config('SESSION_DATABASE_FALLBACK', default=True, cast=bool)
+
+# Cache partilhada das sessões (ex.: django.core.cache.backends.redis.RedisCache
+# com SESSION_CACHE_LOCATION=redis://host:6379/1); a LocMemCache por omissão
+# só serve para um único processo
+SESSION_CACHE_ALIAS = 'sessions'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    SESSION_CACHE_ALIAS: {
+        'BACKEND': config('SESSION_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('SESSION_CACHE_LOCATION', default='sessions'),
+    },
+}
+
+# Camada local (por processo) à frente da cache partilhada: quanto tempo (em
+# segundos) uma sessão lida pode ser reutilizada sem voltar à cache partilhada
+SESSION_L1_TTL = config('SESSION_L1_TTL', default=2, cast=float)
+SESSION_L1_MAX_ENTRIES = config('SESSION_L1_MAX_ENTRIES', default=10000, cast=int)
+# Em vez de gravar a sessão a cada requisição, a expiração só é renovada
+# quando já passou esta fração de SESSION_COOKIE_AGE desde a última gravação
+# (alterações aos dados da sessão continuam a ser gravadas de imediato)
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_FRACTION = config('SESSION_REFRESH_FRACTION', default=0.1, cast=float)
+
+# Limpeza de sessões expiradas na tabela django_session, em lotes pequenos com
+# pausas entre eles. A limpeza agendada é o comando clearsessions (cronjob);
+# com SESSION_PURGE_INTERVAL > 0 cada processo também a lança em segundo plano
+# a partir de um pedido, no máximo a cada SESSION_PURGE_INTERVAL segundos (só
+# para servidores de longa duração: nunca em serverless como a Vercel)
+SESSION_PURGE_INTERVAL = config('SESSION_PURGE_INTERVAL', default=0, cast=int)
+SESSION_PURGE_BATCH_SIZE = config('SESSION_PURGE_BATCH_SIZE', default=500, cast=int)
+SESSION_PURGE_PAUSE = config('SESSION_PURGE_PAUSE', default=0.05, cast=float)
+SESSION_PURGE_MAX_BATCHES = config('SESSION_PURGE_MAX_BATCHES', default=200, cast=int)
\ No newline at end of file
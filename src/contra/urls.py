@@ -23,7 +23,7 @@ import account.views
 from common.views import custom_logout
 
 # Importar a view de diagnóstico
-from .views import diagnose_db
+from .views import diagnose_db, executor_stats
 
 # View de fallback para a home page para caso as outras rotas falhem
 def home_fallback(request):
@@ -96,7 +96,9 @@ urlpatterns = [
     path('account/', include('account.urls')),
     path('client/', include('client.urls')),
     path('writer/', include('writer.urls')),
+    path('api/v1/', include('client.api_urls')),
     path('db-diagnose/', diagnose_db, name='db_diagnose'),  # URL para diagnóstico do banco
     path('admin/diagnose-db/', diagnose_db, name='diagnose_db'),
+    path('executor-stats/', executor_stats, name='executor_stats'),  # Filas e esperas dos executores (staff)
     path('', include('contra.main_urls')),  # Incluir as URLs principais
 ]
@@ -107,4 +107,19 @@ def diagnose_db(request):
             'env_info': env_info,
             'db_diagnosis': db_diagnosis
         }, default=str, indent=2)
-    }) 
\ No newline at end of file
+    }) 
+
+@staff_member_required
+def executor_stats(request):
+    """
+    Estado dos conjuntos de threads deste processo (common.executors): fila,
+    trabalhos em curso, rejeições e tempo de espera por uma thread. Inclui
+    os pools de ligações MySQL (common.db.pool), se houver.
+    """
+    from common.db.pool import pool_stats
+    from common.executors import executors
+    return JsonResponse({
+        'pid': os.getpid(),
+        'executors': executors.stats(),
+        'database_pools': pool_stats(),
+    })
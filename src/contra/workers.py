@@ -0,0 +1,17 @@
+"""
+Worker de gunicorn para servir contra.asgi com uvicorn (ver gunicorn.conf.py).
+"""
+
+from uvicorn.workers import UvicornWorker
+
+
+class ContraUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        # Sem lifespan o worker começaria a aceitar pedidos antes do warm-up
+        'lifespan': 'on',
+        'loop': 'auto',   # uvloop, se instalado (uvicorn[standard])
+        'http': 'auto',   # httptools, se instalado
+        # O access_log do uvicorn fica ligado: é através do logger
+        # uvicorn.access que o gunicorn escreve o seu accesslog (para o
+        # desligar, GUNICORN_ACCESSLOG vazio em gunicorn.conf.py)
+    }
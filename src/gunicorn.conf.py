@@ -0,0 +1,43 @@
+"""
+Configuração do gunicorn para produção em ASGI (correr a partir de src/):
+
+    gunicorn -c gunicorn.conf.py
+
+Cada worker é um processo com um event loop uvicorn; as views são todas
+assíncronas, por isso um worker por núcleo chega. O warm-up (common.warmup)
+corre no arranque de cada worker, antes de aceitar pedidos.
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'contra.asgi:application'
+worker_class = 'contra.workers.ContraUvicornWorker'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# O Django é importado uma vez no processo principal e partilhado pelos
+# workers (copy-on-write); ligações à base de dados só abrem depois do fork
+preload_app = True
+
+# Ligações keep-alive atrás de um proxy/balanceador
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Um worker sem responder durante este tempo é reiniciado; o warm-up do
+# arranque tem de caber aqui
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Reciclar workers de vez em quando (com jitter, para não reiniciarem todos
+# ao mesmo tempo) limita o crescimento de memória das caches por processo
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 20000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 2000))
+
+# Heartbeat dos workers em memória em vez de no disco
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Vazio desliga os logs de acesso (poupa o custo por pedido)
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
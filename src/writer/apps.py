@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WriterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'writer'
+
+    def ready(self):
+        from . import signals # noqa: F401
@@ -0,0 +1,153 @@
+"""
+Process-local cache of the two article feeds readers can see: the
+standard feed (non-premium articles only) and the premium feed (every
+article).
+
+Both feeds are kept as sorted lists of `(date_posted, id)` keys over a
+single id -> Article map, loaded with one query and then kept current
+from the Article signals in `writer.signals`. Serving a page is a bisect
+plus a slice, O(log n + page), with no database round trip.
+
+Every process keeps its own copy, so changes made by another worker only
+show up after FEED_CACHE_TTL seconds, when the copy is reloaded.
+"""
+
+__all__ = (
+    'TierFeedCache',
+    'feed_cache',
+)
+
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from django.conf import settings
+
+from common.executors import executors
+from common.pagination import KeysetPage, KeysetPaginator
+
+from .models import Article
+
+
+class TierFeedCache:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._articles: dict[int, Article] = {}
+        self._keys: dict[bool, list[tuple]] = {}
+        self._loaded_at: float | None = None
+        self._generation = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return (
+            self._loaded_at is not None and
+            time.monotonic() - self._loaded_at < settings.FEED_CACHE_TTL
+        )
+
+    def get_page(
+        self,
+        include_premium: bool,
+        per_page: int,
+        after: str | None = None,
+        before: str | None = None,
+    ) -> KeysetPage:
+        if not self.is_loaded:
+            self.load()
+        return self._page(include_premium, per_page, after, before)
+
+    async def aget_page(
+        self,
+        include_premium: bool,
+        per_page: int,
+        after: str | None = None,
+        before: str | None = None,
+    ) -> KeysetPage:
+        if not self.is_loaded:
+            await executors.arun('db', self.load)
+        return self._page(include_premium, per_page, after, before)
+
+    def load(self):
+        with self._lock:
+            generation = self._generation
+        articles = {a.id: a for a in Article.objects.for_tier(include_premium = True)}
+        keys = sorted((a.date_posted, a.id) for a in articles.values())
+        with self._lock:
+            if generation != self._generation:
+                # The feed changed while it was being read: serve this copy to
+                # the caller but leave the cache cold so the next hit reloads.
+                self._install(articles, keys, loaded_at = None)
+                return
+            self._install(articles, keys, loaded_at = time.monotonic())
+
+    def article_saved(self, article: Article):
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                return
+            self._remove(article.id)
+            self._articles[article.id] = article
+            key = (article.date_posted, article.id)
+            insort(self._keys[True], key)
+            if not article.is_premium:
+                insort(self._keys[False], key)
+
+    def article_deleted(self, article_id: int):
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is not None:
+                self._remove(article_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._install({}, [], loaded_at = None)
+
+    def _install(self, articles: dict, keys: list, loaded_at: float | None):
+        self._articles = articles
+        self._keys = {
+            True: keys,
+            False: [k for k in keys if not articles[k[1]].is_premium],
+        }
+        self._loaded_at = loaded_at
+
+    def _remove(self, article_id: int):
+        old = self._articles.pop(article_id, None)
+        if old is None:
+            return
+        key = (old.date_posted, old.id)
+        for keys in self._keys.values():
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def _page(
+        self,
+        include_premium: bool,
+        per_page: int,
+        after: str | None,
+        before: str | None,
+    ) -> KeysetPage:
+        paginator = KeysetPaginator(Article.objects.for_tier(include_premium), per_page)
+        with self._lock:
+            keys = self._keys.get(include_premium, [])
+            if before:
+                start = bisect_right(keys, tuple(paginator.decode(before)))
+                end = min(len(keys), start + per_page)
+                has_newer, has_older = end < len(keys), True
+            else:
+                end = bisect_left(keys, tuple(paginator.decode(after))) if after else len(keys)
+                start = max(0, end - per_page)
+                has_newer, has_older = bool(after), start > 0
+            rows = [self._articles[key[1]] for key in reversed(keys[start:end])]
+
+        if not rows:
+            return KeysetPage([], per_page = per_page)
+        return KeysetPage(
+            rows,
+            paginator.cursor_for(rows[-1]) if has_older else None,
+            paginator.cursor_for(rows[0]) if has_newer else None,
+            per_page,
+        )
+
+
+feed_cache = TierFeedCache()
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['is_premium', 'date_posted', 'id'], name='article_tier_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['date_posted', 'id'], name='article_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['user', 'date_posted', 'id'], name='article_writer_feed_idx'),
+        ),
+    ]
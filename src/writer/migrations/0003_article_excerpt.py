@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:44
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+EXCERPT_MAXLEN = 300
+
+
+def fill_excerpts(apps, schema_editor):
+    Article = apps.get_model('writer', 'Article')
+    articles = Article.objects.only('id', 'content')
+    for article in articles.iterator(chunk_size=500):
+        article.excerpt = Truncator(' '.join(article.content.split())).chars(EXCERPT_MAXLEN)
+        article.save(update_fields=['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0002_article_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300, verbose_name='Excerpt'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
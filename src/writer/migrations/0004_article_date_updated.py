@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('writer', '0003_article_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='date_updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,17 +1,62 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils import timezone
+from django.utils.text import Truncator
 from django.utils.translation import gettext_lazy as _t
 
 from account.models import CustomUser
 
 TITLE_MAXLEN = 150
 CONTENT_MAXLEN = 10_000
+EXCERPT_MAXLEN = 300
+
+def make_excerpt(content: str) -> str:
+    return Truncator(' '.join(content.split())).chars(EXCERPT_MAXLEN)
+
+class ArticleQuerySet(models.QuerySet):
+    def newest_first(self) -> 'ArticleQuerySet':
+        return self.order_by('-date_posted', '-id')
+
+    def listing(self) -> 'ArticleQuerySet':
+        """Rows for list pages: author preloaded, full body left in the table."""
+        return self.select_related('user').defer('content')
+
+    def for_tier(self, include_premium: bool) -> 'ArticleQuerySet':
+        # `is_premium = False` compiles to `NOT is_premium`, which no index
+        # can seek on; the one-element IN keeps article_tier_feed_idx usable.
+        articles = self if include_premium else self.filter(is_premium__in = [False])
+        return articles.listing().newest_first()
+
+    def by_writer(self, user: CustomUser) -> 'ArticleQuerySet':
+        return self.filter(user = user).defer('content').newest_first()
 
 class Article(models.Model):
     title = models.CharField(max_length=TITLE_MAXLEN, verbose_name=_t('Title'))
     content = models.TextField(max_length=CONTENT_MAXLEN, verbose_name=_t('Content'))
+    excerpt = models.CharField(max_length=EXCERPT_MAXLEN, blank=True, editable=False, verbose_name=_t('Excerpt'))
     date_posted = models.DateTimeField(default=timezone.now)
+    date_updated = models.DateTimeField(auto_now=True)
     is_premium = models.BooleanField(default=False, verbose_name=_t('Is this a premium article?'))
 
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
\ No newline at end of file
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+
+    objects = ArticleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Feed of a standard reader: WHERE is_premium ORDER BY date_posted, id
+            models.Index(fields=['is_premium', 'date_posted', 'id'], name='article_tier_feed_idx'),
+            # Feed of a premium reader: ORDER BY date_posted, id
+            models.Index(fields=['date_posted', 'id'], name='article_feed_idx'),
+            # Writer archive: WHERE user ORDER BY date_posted, id
+            models.Index(fields=['user', 'date_posted', 'id'], name='article_writer_feed_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and 'content' not in self.get_deferred_fields():
+            self.excerpt = make_excerpt(self.content)
+        elif update_fields is not None and 'content' in update_fields:
+            self.excerpt = make_excerpt(self.content)
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
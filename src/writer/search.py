@@ -0,0 +1,189 @@
+"""
+In-process full-text search over article titles and contents.
+
+The index is a plain inverted index (term -> {article id: term frequency})
+ranked with Okapi BM25. It is built with one pass over the article table
+the first time it is queried and then kept current from the Article
+signals in `writer.signals`, so searching never scans `content`.
+
+Like the feed cache, every process holds its own copy and rebuilds it
+after SEARCH_INDEX_TTL seconds to pick up changes made by other workers.
+"""
+
+__all__ = (
+    'tokenize',
+    'stem',
+    'SearchIndex',
+    'search_index',
+)
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+
+from common.executors import executors
+
+from .models import Article
+
+TOKEN_RE = re.compile(r'\w+')
+MIN_STEM_LEN = 3
+TITLE_WEIGHT = 3
+
+STOPWORDS = frozenset('''
+    a about after all also an and any are as at be because been but by can
+    could did do does for from had has have he her his how i if in into is it
+    its just more most no not of on or our out over she so such than that the
+    their them then there these they this those to up was we were what when
+    which who will with would you your
+'''.split())
+
+# Longest suffix first; each entry is (suffix, replacement)
+SUFFIXES = (
+    ('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'),
+    ('ousness', 'ous'), ('iveness', 'ive'), ('ations', 'ate'),
+    ('ation', 'ate'), ('ments', ''), ('ment', ''), ('ness', ''),
+    ('ings', ''), ('sses', 'ss'), ('ies', 'y'), ('ing', ''),
+    ('ers', ''), ('ed', ''), ('er', ''), ('ly', ''), ('s', ''),
+)
+
+
+def stem(word: str) -> str:
+    """
+    A light suffix-stripping stemmer: enough to make 'markets', 'market'
+    and 'marketing' meet, without the full Porter rule set.
+    """
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) >= MIN_STEM_LEN:
+            if suffix == 's' and word.endswith('ss'):
+                return word
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    return [
+        stem(token)
+        for token in TOKEN_RE.findall(_fold(text))
+        if token not in STOPWORDS
+    ]
+
+
+class SearchIndex:
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at: float | None = None
+        self._generation = 0
+        self._reset()
+
+    @property
+    def is_loaded(self) -> bool:
+        return (
+            self._loaded_at is not None and
+            time.monotonic() - self._loaded_at < settings.SEARCH_INDEX_TTL
+        )
+
+    def search(self, query: str, include_premium: bool, limit: int) -> list[int]:
+        """Ids of the best `limit` matches, best first."""
+        if not self.is_loaded:
+            self.load()
+        return self._search(query, include_premium, limit)
+
+    async def asearch(self, query: str, include_premium: bool, limit: int) -> list[int]:
+        if not self.is_loaded:
+            await executors.arun('db', self.load)
+        # Not search(): the load may end stale (an article saved meanwhile,
+        # or SEARCH_INDEX_TTL=0) and loading again here would hit the ORM
+        # on the event loop
+        return self._search(query, include_premium, limit)
+
+    def _search(self, query: str, include_premium: bool, limit: int) -> list[int]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self._doc_lens)
+            avg_len = self._total_len / doc_count if doc_count else 0
+            scores: Counter = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if not include_premium and self._premium[doc_id]:
+                        continue
+                    norm = 1 - self.b + self.b * self._doc_lens[doc_id] / avg_len
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return [doc_id for doc_id, _ in scores.most_common(limit)]
+
+    def load(self):
+        with self._lock:
+            generation = self._generation
+        fresh = SearchIndex()
+        rows = Article.objects.values_list('id', 'title', 'content', 'is_premium')
+        for article_id, title, content, is_premium in rows.iterator(chunk_size = 500):
+            fresh._add(article_id, title, content, is_premium)
+        with self._lock:
+            self._postings = fresh._postings
+            self._doc_terms = fresh._doc_terms
+            self._doc_lens = fresh._doc_lens
+            self._premium = fresh._premium
+            self._total_len = fresh._total_len
+            changed_meanwhile = generation != self._generation
+            self._loaded_at = None if changed_meanwhile else time.monotonic()
+
+    def article_saved(self, article: Article):
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is not None:
+                self._remove(article.id)
+                self._add(article.id, article.title, article.content, article.is_premium)
+
+    def article_deleted(self, article_id: int):
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is not None:
+                self._remove(article_id)
+
+    def _reset(self):
+        self._postings: dict[str, dict[int, int]] = {}
+        self._doc_terms: dict[int, tuple[str, ...]] = {}
+        self._doc_lens: dict[int, int] = {}
+        self._premium: dict[int, bool] = {}
+        self._total_len = 0
+
+    def _add(self, article_id: int, title: str, content: str, is_premium: bool):
+        tokens = tokenize(title) * TITLE_WEIGHT + tokenize(content)
+        frequencies = Counter(tokens)
+        for term, tf in frequencies.items():
+            self._postings.setdefault(term, {})[article_id] = tf
+        self._doc_terms[article_id] = tuple(frequencies)
+        self._doc_lens[article_id] = len(tokens)
+        self._premium[article_id] = is_premium
+        self._total_len += len(tokens)
+
+    def _remove(self, article_id: int):
+        for term in self._doc_terms.pop(article_id, ()):
+            postings = self._postings[term]
+            del postings[article_id]
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_lens.pop(article_id, 0)
+        self._premium.pop(article_id, None)
+
+
+search_index = SearchIndex()
@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from account.models import CustomUser
+
+from .feed_cache import feed_cache
+from .models import Article
+from .search import search_index
+from .stats import invalidate_writer_totals
+
+AUTHOR_FIELDS = {'first_name', 'last_name'}
+
+
+@receiver(post_save, sender = Article)
+def article_saved(sender, instance: Article, **kwargs):
+    def update_indexes():
+        invalidate_writer_totals(instance.user_id)
+        search_index.article_saved(instance)
+        # Re-read the row the way the feeds hold it: author preloaded, no body
+        article = Article.objects.listing().filter(pk = instance.pk).first()
+        if article is not None:
+            feed_cache.article_saved(article)
+    transaction.on_commit(update_indexes)
+
+
+@receiver(post_delete, sender = Article)
+def article_deleted(sender, instance: Article, **kwargs):
+    article_id, user_id = instance.pk, instance.user_id
+    def update_indexes():
+        invalidate_writer_totals(user_id)
+        feed_cache.article_deleted(article_id)
+        search_index.article_deleted(article_id)
+    transaction.on_commit(update_indexes)
+
+
+@receiver(post_save, sender = CustomUser)
+def author_saved(sender, instance: CustomUser, update_fields = None, **kwargs):
+    # Logins only touch last_login; skip them so they don't drop the feeds
+    if instance.is_writer and (update_fields is None or AUTHOR_FIELDS & set(update_fields)):
+        transaction.on_commit(feed_cache.clear)
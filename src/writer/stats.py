@@ -0,0 +1,42 @@
+"""
+Per-writer article totals for the writer dashboard.
+
+They come from one aggregate query and are cached until the writer
+creates, updates or deletes an article (see `writer.signals`), with
+WRITER_TOTALS_CACHE_TIMEOUT as a safety net for per-process caches.
+"""
+
+__all__ = (
+    'awriter_totals',
+    'invalidate_writer_totals',
+)
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+from account.models import CustomUser
+
+from .models import Article
+
+
+def _cache_key(user_id: int) -> str:
+    return f'writer-totals:{user_id}'
+
+
+async def awriter_totals(user: CustomUser) -> dict:
+    key = _cache_key(user.pk)
+    totals = await cache.aget(key)
+    if totals is None:
+        totals = await Article.objects.filter(user = user).aaggregate(
+            total = Count('id'),
+            premium = Count('id', filter = Q(is_premium = True)),
+            latest = Max('date_posted'),
+        )
+        totals['standard'] = totals['total'] - totals['premium']
+        await cache.aset(key, totals, settings.WRITER_TOTALS_CACHE_TIMEOUT)
+    return totals
+
+
+def invalidate_writer_totals(user_id: int):
+    cache.delete(_cache_key(user_id))
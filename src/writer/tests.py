@@ -1,3 +1,455 @@
-from django.test import TestCase
+import base64
+import re
+import time
+import unittest
+import unittest.mock
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from account.models import CustomUser
+from common.pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from writer.feed_cache import TierFeedCache
+from writer.models import EXCERPT_MAXLEN, Article, make_excerpt
+from writer.search import SearchIndex, stem, tokenize
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked against SQLite')
+class ArticleFeedQueryPlanTests(TestCase):
+    """
+    Runs EXPLAIN QUERY PLAN on every feed query and fails when one of them
+    falls back to a full table scan or to sorting in a temporary B-tree.
+    Cursor pages must also seek into the index, so that a deep page costs
+    the same as the first one.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        cls.article = Article.objects.create(title = 'Title', content = 'Content', user = cls.writer)
+        cls.cursor = KeysetPaginator(Article.objects.all(), per_page = 10).cursor_for(cls.article)
+
+    def assertUsesIndex(self, queryset, index_name, seek = False):
+        plan = queryset.explain()
+        self.assertNotIn('TEMP B-TREE', plan, msg = plan)
+        self.assertIsNone(re.search(r'\bSCAN \w+$', plan, re.MULTILINE), msg = plan)
+        article_steps = [line for line in plan.splitlines() if 'writer_article' in line]
+        self.assertTrue(article_steps, msg = plan)
+        for step in article_steps:
+            self.assertIn(f'USING INDEX {index_name}', step, msg = plan)
+            if seek:
+                self.assertRegex(step, r'SEARCH writer_article .*date_posted[<>]', msg = plan)
+
+    def assertFeedUsesIndex(self, queryset, index_name):
+        paginator = KeysetPaginator(queryset, per_page = 10)
+        with self.subTest(page = 'first'):
+            self.assertUsesIndex(paginator.page_queryset(), index_name)
+        with self.subTest(page = 'after'):
+            self.assertUsesIndex(paginator.page_queryset(after = self.cursor), index_name, seek = True)
+        with self.subTest(page = 'before'):
+            self.assertUsesIndex(paginator.page_queryset(before = self.cursor), index_name, seek = True)
+
+    def test_standard_feed(self):
+        self.assertFeedUsesIndex(Article.objects.for_tier(include_premium = False), 'article_tier_feed_idx')
+
+    def test_premium_feed(self):
+        self.assertFeedUsesIndex(Article.objects.for_tier(include_premium = True), 'article_feed_idx')
+
+    def test_writer_archive(self):
+        self.assertFeedUsesIndex(Article.objects.by_writer(self.writer), 'article_writer_feed_idx')
+
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        posted = timezone.now() - timedelta(days = 1)
+        # Two pairs share a date_posted, so ties must be broken by id
+        cls.articles = [
+            Article.objects.create(
+                title = f'Article {i}', content = 'Content', user = writer,
+                date_posted = posted + timedelta(hours = i // 2),
+            )
+            for i in range(5)
+        ]
+        cls.newest_first = [a.id for a in sorted(cls.articles, key = lambda a: (a.date_posted, a.id), reverse = True)]
+
+    def paginator(self, per_page: int = 2) -> KeysetPaginator:
+        return KeysetPaginator(Article.objects.all(), per_page = per_page)
+
+    def ids(self, page) -> list[int]:
+        return [article.id for article in page]
+
+    def test_cursor_round_trip(self):
+        paginator = self.paginator()
+        article = self.articles[3]
+        self.assertEqual(paginator.decode(paginator.cursor_for(article)), [article.date_posted, article.id])
+        self.assertEqual(decode_cursor(encode_cursor(['x', 1, None])), ['x', 1, None])
+        self.assertNotIn('=', encode_cursor([1]))
+
+    def test_walks_forward_then_back(self):
+        paginator = self.paginator()
+        first = paginator.get_page()
+        self.assertEqual(self.ids(first), self.newest_first[:2])
+        self.assertEqual((first.has_previous, first.has_next), (False, True))
+        second = paginator.get_page(after = first.next_cursor)
+        last = paginator.get_page(after = second.next_cursor)
+        self.assertEqual(self.ids(second) + self.ids(last), self.newest_first[2:])
+        self.assertEqual((last.has_previous, last.has_next), (True, False))
+        back = paginator.get_page(before = last.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertTrue(back.has_previous)
+        self.assertEqual(self.ids(paginator.get_page(before = back.previous_cursor)), self.ids(first))
+        self.assertFalse(paginator.get_page(before = back.previous_cursor).has_previous)
+
+    def test_boundaries_exclude_the_cursor_row(self):
+        paginator = self.paginator(per_page = 10)
+        for position, article_id in enumerate(self.newest_first):
+            cursor = paginator.cursor_for(Article.objects.get(pk = article_id))
+            with self.subTest(position = position):
+                self.assertEqual(self.ids(paginator.get_page(after = cursor)), self.newest_first[position + 1:])
+                self.assertEqual(self.ids(paginator.get_page(before = cursor)), self.newest_first[:position])
+
+    def test_past_the_end_is_an_empty_page(self):
+        paginator = self.paginator()
+        oldest = Article.objects.get(pk = self.newest_first[-1])
+        page = paginator.get_page(after = paginator.cursor_for(oldest))
+        self.assertEqual((page.items, page.has_next, page.has_previous), ([], False, False))
+
+    def test_tampered_cursors_are_invalid(self):
+        paginator = self.paginator()
+        valid = paginator.cursor_for(self.articles[0])
+        tampered = {
+            'not base64': '!!!',
+            'not json': 'bm90IGpzb24',
+            'not a list': base64.urlsafe_b64encode(b'{"id":1}').decode(),
+            'too short': encode_cursor([1]),
+            'wrong type': encode_cursor(['yesterday', 1]),
+            'null': encode_cursor([None, 1]),
+        }
+        for name, cursor in tampered.items():
+            with self.subTest(name), self.assertRaises(InvalidCursor):
+                paginator.get_page(after = cursor)
+        with self.assertRaises(InvalidCursor):
+            paginator.get_page(after = valid, before = valid)
+
+    def test_values_rows_with_a_key_function(self):
+        paginator = KeysetPaginator(
+            Article.objects.values_list('date_posted', 'id'), per_page = 2, key = lambda row: row,
+        )
+        first = paginator.get_page()
+        self.assertEqual([row[1] for row in first], self.newest_first[:2])
+        self.assertEqual([row[1] for row in paginator.get_page(after = first.next_cursor)], self.newest_first[2:4])
+
+class SearchTokenizerTests(SimpleTestCase):
+    def test_stem_makes_word_forms_meet(self):
+        self.assertEqual({stem('markets'), stem('market'), stem('marketing')}, {'market'})
+        self.assertEqual(stem('classes'), 'class')
+        self.assertEqual(stem('valuation'), 'valuate')
+
+    def test_stem_leaves_short_and_double_s_words(self):
+        self.assertEqual(stem('glass'), 'glass')
+        self.assertEqual(stem('bus'), 'bus')
+        self.assertEqual(stem('red'), 'red')
+
+    def test_tokenize_folds_case_and_accents_and_drops_stopwords(self):
+        self.assertEqual(tokenize('The Café of Markets!'), ['cafe', 'market'])
+        self.assertEqual(tokenize('it is and the'), [])
+
+
+@override_settings(SEARCH_INDEX_TTL = 300)
+class SearchRankingTests(SimpleTestCase):
+    def make_index(self, *articles) -> SearchIndex:
+        index = SearchIndex()
+        for article_id, title, content, is_premium in articles:
+            index._add(article_id, title, content, is_premium)
+        index._loaded_at = time.monotonic()
+        return index
+
+    def test_bm25_ranks_by_frequency_title_and_rarity(self):
+        index = self.make_index(
+            (1, 'Bonds', 'Bond yields and one mention of gold.', False),
+            (2, 'Gold', 'Gold, gold and more gold.', False),
+            (3, 'Notes', 'Gold is mentioned once among many other words here.', False),
+            (4, 'Equities', 'Nothing relevant.', False),
+        )
+        self.assertEqual(index.search('gold', False, 10), [2, 1, 3])
+        # 'yields' is rarer than 'gold', so it decides the order
+        self.assertEqual(index.search('gold yield', False, 10)[0], 1)
+        self.assertEqual(index.search('gold', False, 1), [2])
+        self.assertEqual(index.search('the', False, 10), [])
+
+    def test_premium_articles_need_premium(self):
+        index = self.make_index((1, 'Gold', 'gold', True), (2, 'Gold', 'gold', False))
+        self.assertEqual(index.search('gold', False, 10), [2])
+        self.assertCountEqual(index.search('gold', True, 10), [1, 2])
+
+    def test_saved_and_deleted_articles_update_the_index(self):
+        index = self.make_index((1, 'Gold', 'gold', False))
+        index.article_saved(Article(id = 1, title = 'Silver', content = 'silver', is_premium = False))
+        self.assertEqual(index.search('gold', False, 10), [])
+        self.assertEqual(index.search('silver', False, 10), [1])
+        index.article_deleted(1)
+        self.assertEqual(index.search('silver', False, 10), [])
+
+
+@override_settings(SEARCH_INDEX_TTL = 0)
+class AsyncSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        cls.article = Article.objects.create(title = 'Contrarian gold', content = 'Gold', user = writer)
+
+    async def test_asearch_never_loads_on_the_event_loop(self):
+        # With a TTL of 0 the index is stale right after loading
+        self.assertEqual(await SearchIndex().asearch('gold', False, 10), [self.article.id])
+
+
+@override_settings(FEED_CACHE_TTL = 300)
+class TierFeedCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        start = timezone.now() - timedelta(days = 30)
+        # Oldest first; every third one is premium
+        cls.articles = [
+            Article.objects.create(
+                title = f'Article {i}', content = 'Content', user = cls.writer,
+                is_premium = i % 3 == 0, date_posted = start + timedelta(days = i),
+            )
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        self.cache = TierFeedCache()
+        self.cache.load()
+
+    def ids(self, page) -> list[int]:
+        return [article.id for article in page]
+
+    def newest_first(self, include_premium: bool) -> list[int]:
+        return [a.id for a in reversed(self.articles) if include_premium or not a.is_premium]
+
+    def test_pages_forward_and_back(self):
+        for include_premium in (True, False):
+            expected = self.newest_first(include_premium)
+            first = self.cache.get_page(include_premium, 2)
+            self.assertEqual(self.ids(first), expected[:2])
+            self.assertFalse(first.has_previous)
+            seen, page = self.ids(first), first
+            while page.has_next:
+                page = self.cache.get_page(include_premium, 2, after = page.next_cursor)
+                seen += self.ids(page)
+            self.assertEqual(seen, expected)
+            back = self.cache.get_page(include_premium, 2, before = page.previous_cursor)
+            self.assertEqual(self.ids(back), expected[-len(page) - 2:-len(page)])
+
+    def test_pages_match_the_database(self):
+        paginator = KeysetPaginator(Article.objects.for_tier(include_premium = False), 3)
+        cached = self.cache.get_page(False, 3)
+        self.assertEqual(self.ids(cached), self.ids(paginator.get_page()))
+        cursor = cached.next_cursor
+        self.assertEqual(
+            self.ids(self.cache.get_page(False, 3, after = cursor)),
+            self.ids(paginator.get_page(after = cursor)),
+        )
+
+    def test_tampered_cursors_are_invalid(self):
+        for cursor in (encode_cursor([None, 5]), encode_cursor(['soon', 5]), 'garbage', encode_cursor([1])):
+            with self.subTest(cursor = cursor), self.assertRaises(InvalidCursor):
+                self.cache.get_page(True, 2, after = cursor)
+
+    def test_naive_cursor_date_is_read_as_local_time(self):
+        cursor = encode_cursor([(timezone.now() - timedelta(days = 26.5)).replace(tzinfo = None).isoformat(), 0])
+        self.assertEqual(self.ids(self.cache.get_page(True, 10, after = cursor)), self.newest_first(True)[-4:])
+        self.assertEqual(self.ids(self.cache.get_page(True, 10, after = encode_cursor(['2024-01-01', 5]))), [])
+
+    def test_saved_and_deleted_articles_update_the_feeds(self):
+        newest = Article.objects.create(title = 'Newest', content = 'Content', user = self.writer)
+        self.cache.article_saved(newest)
+        self.assertEqual(self.ids(self.cache.get_page(False, 1)), [newest.id])
+        newest.is_premium = True
+        self.cache.article_saved(newest)
+        self.assertNotIn(newest.id, self.ids(self.cache.get_page(False, 10)))
+        self.assertEqual(self.ids(self.cache.get_page(True, 1)), [newest.id])
+        self.cache.article_deleted(newest.id)
+        self.assertEqual(self.ids(self.cache.get_page(True, 10)), self.newest_first(True))
+
+    def test_change_during_load_leaves_the_cache_cold(self):
+        cache = TierFeedCache()
+        real_filter = Article.objects.for_tier
+
+        def for_tier_then_save(include_premium):
+            cache.article_saved(self.articles[0])
+            return real_filter(include_premium)
+
+        with unittest.mock.patch.object(Article.objects, 'for_tier', for_tier_then_save):
+            cache.load()
+        self.assertFalse(cache.is_loaded)
+        cache.clear()
+        self.assertFalse(cache.is_loaded)
+
+
+class MyArticlesTests(TestCase):
+    EMPTY_STATE = "You still haven't written any article"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+
+    async def get(self, **params) -> str:
+        await self.async_client.aforce_login(self.writer)
+        response = await self.async_client.get(reverse('my-articles'), params)
+        return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_empty_state_only_without_articles(self):
+        self.assertIn(self.EMPTY_STATE, await self.get())
+        await Article.objects.acreate(title = 'First', content = 'Content', user = self.writer)
+        self.assertNotIn(self.EMPTY_STATE, await self.get())
+
+    async def test_stale_cursor_past_the_end_shows_the_first_page(self):
+        article = await Article.objects.acreate(title = 'Only article', content = 'Content', user = self.writer)
+        cursor = KeysetPaginator(Article.objects.all(), per_page = 10).cursor_for(article)
+        html = await self.get(after = cursor)
+        self.assertNotIn(self.EMPTY_STATE, html)
+        self.assertIn('Only article', html)
+
+
+# my-articles.html's article loop before the cards moved to a partial
+INLINE_ARTICLE_LOOP = """{% load i18n %}
+    {% for article in my_articles %}
+        <div class="container bg-white shadow p-5 mt-5 form-layout-article {% if article.is_premium %}premium-article{% endif %}">
+            <h3>{{ article.title }}</h3>
+            <p>
+                <strong>
+                    {% if article.is_premium %}
+                        <span class="text-article-premium">🌟 {% translate 'Premium Article' %}</span>
+                    {% else %}
+                        🗑️ {% translate 'Standard Article' %}
+                    {% endif %}
+                </strong>
+            </p>
+            <p>
+                {{ article.excerpt }}
+            </p>
+            <hr>
+            <div class="d-flex justify-content-between align-items-center no-wrap">
+                <em>{{ article.date_posted }}</em>
+                <div class="d-flex align-items-center no-wrap" style="gap: 20px;">
+                    <a href="{% url 'update-article' article.id %}" class="btn-home" style="width: 200px; margin: 0;">
+                        {% translate 'Update' %}
+                    </a>
+                    <a href="{% url 'delete-article' article.id %}" class="btn-danger" style="width: 200px; margin: 0; ">
+                        {% translate 'Delete' %}
+                    </a>
+                </div>
+            </div>
+        </div>
+    {% endfor %}
+"""
+
+
+class ArticleCardTests(TestCase):
+    def test_card_partial_matches_the_inline_loop(self):
+        writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+        Article.objects.create(title = 'Free <b>', content = 'Body & more', user = writer)
+        Article.objects.create(title = 'Paid', content = 'Secret', user = writer, is_premium = True)
+        articles = list(Article.objects.filter(user = writer).newest_first())
+        inline = Template(INLINE_ARTICLE_LOOP).render(Context({'my_articles': articles}))
+        cards = ''.join(render_to_string('writer/_article-card.html', {'article': a}) for a in articles)
+        self.assertEqual(cards.split(), inline.split())
+
+
+def content_reads(queries: CaptureQueriesContext) -> list[str]:
+    """The captured SELECTs that read the article body."""
+    column = f'"{Article._meta.db_table}"."content"'
+    return [query['sql'] for query in queries if query['sql'].startswith('SELECT') and column in query['sql']]
+
+
+class MakeExcerptTests(SimpleTestCase):
+    def test_whitespace_is_collapsed(self):
+        self.assertEqual(make_excerpt('  First line\n\n\tsecond   line  '), 'First line second line')
+
+    def test_short_content_is_kept_whole(self):
+        content = 'x' * EXCERPT_MAXLEN
+        self.assertEqual(make_excerpt(content), content)
+
+    def test_long_content_is_truncated(self):
+        excerpt = make_excerpt('word ' * 200)
+        self.assertEqual(len(excerpt), EXCERPT_MAXLEN)
+        self.assertTrue(excerpt.endswith('…'))
+        self.assertTrue(('word ' * 200).startswith(excerpt[:-1]))
+
+
+class ArticleExcerptTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.writer = CustomUser.objects.create_user('writer@example.com', 'passwd', is_writer = True)
+
+    def setUp(self):
+        self.article = Article.objects.create(title = 'Title', content = 'First   body', user = self.writer)
+
+    def stored_excerpt(self) -> str:
+        return Article.objects.values_list('excerpt', flat = True).get(pk = self.article.pk)
+
+    def test_full_save_sets_the_excerpt(self):
+        self.assertEqual(self.stored_excerpt(), 'First body')
+        self.article.content = 'Second body'
+        self.article.save()
+        self.assertEqual(self.stored_excerpt(), 'Second body')
+
+    def test_saving_content_with_update_fields_saves_the_excerpt(self):
+        self.article.content = 'Second body'
+        self.article.title = 'Not saved'
+        self.article.save(update_fields = ['content'])
+        self.assertEqual(self.stored_excerpt(), 'Second body')
+        self.assertEqual(Article.objects.get(pk = self.article.pk).title, 'Title')
+
+    def test_update_fields_without_content_leave_the_excerpt(self):
+        self.article.excerpt = 'Changed by hand'
+        self.article.title = 'New title'
+        self.article.save(update_fields = ['title'])
+        self.assertEqual(self.stored_excerpt(), 'First body')
+
+    def test_deferred_content_is_neither_loaded_nor_overwritten(self):
+        article = Article.objects.defer('content').get(pk = self.article.pk)
+        article.title = 'New title'
+        with CaptureQueriesContext(connection) as queries:
+            article.save()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(content_reads(queries), [])
+        self.assertIn('content', article.get_deferred_fields())
+        self.assertEqual(self.stored_excerpt(), 'First body')
+        self.assertEqual(Article.objects.get(pk = self.article.pk).title, 'New title')
+
+    def test_list_querysets_leave_the_content_out(self):
+        for name, queryset in [
+            ('listing', Article.objects.listing()),
+            ('for_tier', Article.objects.for_tier(include_premium = False)),
+            ('by_writer', Article.objects.by_writer(self.writer)),
+        ]:
+            with self.subTest(name):
+                (article,) = queryset
+                self.assertIn('content', article.get_deferred_fields())
+                self.assertEqual(article.excerpt, 'First body')
+
+    def test_my_articles_does_not_load_the_content(self):
+        async def get() -> str:
+            response = await self.async_client.get(reverse('my-articles'))
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.async_client.force_login(self.writer)
+        # Sync, so the queries stay on this thread's connection
+        with CaptureQueriesContext(connection) as queries:
+            html = async_to_sync(get)()
+        self.assertIn('First body', html)
+        self.assertTrue([query for query in queries if '"writer_article"' in query['sql']])
+        self.assertEqual(content_reads(queries), [])
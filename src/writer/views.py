@@ -1,21 +1,20 @@
+from django.conf import settings
 from django.http import HttpResponse, HttpRequest
-from common.auth import awriter_required, aget_user, ensure_for_current_user # type: ignore
-from common.django_utils import arender, add_message, alogout
+from common.auth import awriter_required, aget_user, aprofile_owner_required # type: ignore
+from common.django_utils import arender, astream_render, add_message, alogout, aupdate_session_auth_hash
 from django.shortcuts import redirect
 from .forms import ArticleForm, UpdateUserForm
 from common.forms import CustomPasswordChangeForm
 from .models import Article
+from .stats import awriter_totals
+from common.pagination import KeysetPaginator, InvalidCursor
 from django.contrib import messages
 from django.utils.translation import gettext as _
-from django.contrib.auth import update_session_auth_hash
-from asgiref.sync import sync_to_async  # Adicionar esta importação
-
-# Criar uma versão assíncrona da função update_session_auth_hash
-async_update_session_auth_hash = sync_to_async(update_session_auth_hash)
 
 @awriter_required
 async def dashboard(request: HttpRequest) -> HttpResponse:
-    return await arender(request, 'writer/dashboard.html')
+    context = {'totals': await awriter_totals(await aget_user(request))}
+    return await arender(request, 'writer/dashboard.html', context)
 
 @awriter_required
 async def create_article(request: HttpRequest) -> HttpResponse:
@@ -39,13 +38,26 @@ async def create_article(request: HttpRequest) -> HttpResponse:
 @awriter_required
 async def my_articles(request: HttpRequest) -> HttpResponse:
     current_user = await aget_user(request)
-    articles = Article.objects.filter(user=current_user)
-    context = {'my_articles': articles}
-    return await arender(request, 'writer/my-articles.html', context)
+    paginator = KeysetPaginator(Article.objects.by_writer(current_user), per_page = settings.ARTICLES_PER_PAGE)
+    try:
+        page = await paginator.aget_page(
+            after = request.GET.get('after'),
+            before = request.GET.get('before'),
+        )
+    except InvalidCursor:
+        page = await paginator.aget_page()
+    has_articles = bool(page) or await Article.objects.by_writer(current_user).aexists()
+    if has_articles and not page:
+        # A stale cursor ran past the end (e.g. articles deleted since)
+        page = await paginator.aget_page()
+    context = {'has_articles': has_articles, 'page': page}
+    return await astream_render(
+        request, 'writer/my-articles.html', context,
+        items = page.items, item_template = 'writer/_article-card.html', item_name = 'article',
+    )
 
 
-@awriter_required
-@ensure_for_current_user(Article, redirect_if_missing = 'my-articles')
+@aprofile_owner_required('writer', Article, redirect_if_missing = 'my-articles')
 async def update_article(request: HttpRequest, article: Article) -> HttpResponse:
     if request.method == 'POST':
         form = ArticleForm(request.POST, instance = article)
@@ -60,8 +72,7 @@ async def update_article(request: HttpRequest, article: Article) -> HttpResponse
     context = {'update_article_form': form}
     return await arender(request, 'writer/update-article.html', context)
 
-@awriter_required
-@ensure_for_current_user(Article, redirect_if_missing = 'my-articles')
+@aprofile_owner_required('writer', Article, redirect_if_missing = 'my-articles')
 async def delete_article(request: HttpRequest, article: Article) -> HttpResponse:
     if request.method == 'POST':
         await article.adelete()
@@ -117,7 +128,7 @@ async def update_password(request: HttpRequest) -> HttpResponse:
         if await form.ais_valid():
             user = await form.asave()
             # Usar a versão assíncrona da função
-            await async_update_session_auth_hash(request, user)
+            await aupdate_session_auth_hash(request, user)
             
             # Adiciona mensagem de sucesso
             await add_message(request, messages.SUCCESS, _('Your password has been updated successfully'))